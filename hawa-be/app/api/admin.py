@@ -12,8 +12,17 @@ from app.db.postgres import get_db
 from app.db.models.user import User, RoleEnum
 from app.services.auth.schemas import UserResponse, PromoteToIndustryRequest, CreateIndustryUserRequest
 from app.services.auth.service import AuthService
+from app.services.weather.heatmap_index import parse_bbox
 from app.services.weather.heatmap_processor import HeatmapProcessor
-from app.services.weather.sheets_cache_service import get_cached_sheets_data
+from app.services.weather.readings_store import READING_FIELDS, ReadingsStore, sheets_source
+from app.services.weather.sheets_cache_service import (
+    get_cached_sheets_data,
+    get_sheets_cache_stats,
+    get_sheets_freshness,
+    refresh_sheets_batch
+)
+from app.services.weather.sheets_client_pool import get_sheets_client_pool
+from app.services.weather.sheets_quota import SheetsPriority, get_sheets_quota_budgeter
 from app.services.weather.spreadsheet_service import SpreadsheetService
 from app.services.feedback.service import FeedbackService
 from app.services.feedback.schemas import (
@@ -111,11 +120,12 @@ def get_spreadsheet_data(
         raw_data = get_cached_sheets_data(
             spreadsheet_id=spreadsheet_id,
             worksheet_name=worksheet_name,
-            force_refresh=force_refresh
+            force_refresh=force_refresh,
+            priority=SheetsPriority.ADMIN
         )
         service = SpreadsheetService()
 
-        # Apply pagination jika ada limit
+        # Apply pagination jika ada limit (slice SheetTable = view, rows dibuat saat serialize)
         total_records = len(raw_data)
         if limit:
             paginated_data = raw_data[offset:offset + limit]
@@ -139,9 +149,10 @@ def get_spreadsheet_data(
             "total_records": total_records,
             "limit": limit,
             "offset": offset,
-            "data": paginated_data,
+            "data": list(paginated_data),
             "processed_data": processed_data,
-            "columns": list(paginated_data[0].keys()) if paginated_data else []
+            "columns": list(paginated_data[0].keys()) if paginated_data else [],
+            "freshness": get_sheets_freshness(spreadsheet_id, worksheet_name)
         }
     except ValueError as e:
         raise HTTPException(
@@ -182,7 +193,8 @@ def get_latest_spreadsheet_data(
 
         raw_data = get_cached_sheets_data(
             spreadsheet_id=spreadsheet_id,
-            worksheet_name=worksheet_name
+            worksheet_name=worksheet_name,
+            priority=SheetsPriority.ADMIN
         )
 
         if not raw_data:
@@ -192,7 +204,8 @@ def get_latest_spreadsheet_data(
                 "worksheet_name": worksheet_name,
                 "data": None,
                 "processed_data": None,
-                "message": "No data found in spreadsheet"
+                "message": "No data found in spreadsheet",
+                "freshness": get_sheets_freshness(spreadsheet_id, worksheet_name)
             }
 
         # Get latest record (baris terakhir)
@@ -218,7 +231,8 @@ def get_latest_spreadsheet_data(
                 latest_raw.get("timestamp") or
                 latest_raw.get("Date") or
                 latest_raw.get("date")
-            )
+            ),
+            "freshness": get_sheets_freshness(spreadsheet_id, worksheet_name)
         }
     except ValueError as e:
         raise HTTPException(
@@ -232,6 +246,7 @@ def get_latest_spreadsheet_data(
 @router.get("/spreadsheet/stats")
 def get_spreadsheet_stats(
     current_admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db),
     worksheet_name: str = Query(
         default="Sheet1",
         description="Nama worksheet"
@@ -241,6 +256,9 @@ def get_spreadsheet_stats(
     Get statistics dari spreadsheet data.
     Berguna untuk menampilkan summary di dashboard.
 
+    Statistik dihitung dari tabel sensor_readings (mirror spreadsheet),
+    Google Sheets hanya dipakai untuk sync baris baru.
+
     Returns:
         Statistics summary dari data spreadsheet
     """
@@ -259,9 +277,29 @@ def get_spreadsheet_stats(
                 detail="GOOGLE_SHEETS_ID not configured in environment variables"
             )
 
+        numeric_fields = ['pm25', 'pm10', 'temperature', 'humidity', 'o3', 'no2', 'so2', 'co']
+
+        # Query local readings store (indexed, mirrored by the scheduler ingest job) instead of re-parsing every sheet row;
+        # read the sheet when the mirror is stale (ingest job not running)
+        store = ReadingsStore(db)
+        source = sheets_source(spreadsheet_id, worksheet_name)
+        if not store.is_mirror_stale(source):
+            stored_count = store.count(source=source)
+            return {
+                "success": True,
+                "spreadsheet_id": spreadsheet_id,
+                "worksheet_name": worksheet_name,
+                "total_records": stored_count,
+                "processed_records": stored_count,
+                "columns": ["timestamp", "device_id", "location", "air_quality_level", *READING_FIELDS],
+                "stats": store.field_stats(numeric_fields, source=source),
+                "source": "readings_store"
+            }
+
         raw_data = get_cached_sheets_data(
             spreadsheet_id=spreadsheet_id,
-            worksheet_name=worksheet_name
+            worksheet_name=worksheet_name,
+            priority=SheetsPriority.ADMIN
         )
 
         if not raw_data:
@@ -272,36 +310,27 @@ def get_spreadsheet_stats(
                 "stats": {}
             }
 
-        service = SpreadsheetService()
-        processed_records = []
-        for record in raw_data:
-            try:
-                processed = service.process_bmkg_data(record)
-                if processed:
-                    processed_records.append(processed)
-            except Exception:
-                continue
+        # Parse whole snapshot column-wise, statistics computed vectorized
+        frame = SpreadsheetService().to_frame(raw_data)
 
         # Calculate statistics
         stats = {}
-        if processed_records:
-            numeric_fields = ['pm25', 'pm10', 'temperature', 'humidity', 'o3', 'no2', 'so2', 'co']
-            for field in numeric_fields:
-                values = [r.get(field) for r in processed_records if r.get(field) is not None]
-                if values:
-                    stats[field] = {
-                        "min": min(values),
-                        "max": max(values),
-                        "avg": sum(values) / len(values),
-                        "latest": values[-1] if values else None
-                    }
+        for field in numeric_fields:
+            values = frame[field].dropna()
+            if not values.empty:
+                stats[field] = {
+                    "min": float(values.min()),
+                    "max": float(values.max()),
+                    "avg": float(values.mean()),
+                    "latest": float(values.iloc[-1])
+                }
 
         return {
             "success": True,
             "spreadsheet_id": spreadsheet_id,
             "worksheet_name": worksheet_name,
             "total_records": len(raw_data),
-            "processed_records": len(processed_records),
+            "processed_records": len(frame),
             "columns": list(raw_data[0].keys()) if raw_data else [],
             "stats": stats
         }
@@ -321,30 +350,53 @@ def get_heatmap_data(
     force_refresh: bool = Query(
         default=False,
         description="Force refresh dari Google Sheets (bypass cache)"
+    ),
+    bbox: Optional[str] = Query(
+        default=None,
+        description="Viewport minLng,minLat,maxLng,maxLat (hanya points di dalam viewport)"
+    ),
+    zoom: Optional[int] = Query(
+        default=None,
+        ge=0,
+        le=22,
+        description="Map zoom level; di bawah zoom 13 points yang berdekatan di-cluster"
     )
 ) -> Dict[str, Any]:
     """
     Get heatmap data dari Google Sheets untuk visualisasi peta.
     Data diambil dari spreadsheet heatmap dengan format:
     - Location, Latitude, Longitude, PM2.5, PM10, Air Quality, Risk Score, Color, Device ID
+    Dengan bbox/zoom hanya points di viewport yang dikirim, plus clusters pada zoom rendah.
 
     Returns:
         Array of heatmap points dengan format siap untuk frontend map visualization
     """
-    heatmap_spreadsheet_id = "1p69Ae67JGlScrMlSDnebuZMghXYMY7IykiT1gQwello"
+    heatmap_spreadsheet_id = get_settings().heatmap_sheets_id
 
     try:
         raw_data = get_cached_sheets_data(
             spreadsheet_id=heatmap_spreadsheet_id,
             worksheet_name=worksheet_name,
-            force_refresh=force_refresh
+            force_refresh=force_refresh,
+            priority=SheetsPriority.ADMIN
         )
 
-        return HeatmapProcessor.process_heatmap_points(
-            raw_data=raw_data,
-            spreadsheet_id=heatmap_spreadsheet_id,
-            worksheet_name=worksheet_name
-        )
+        if bbox is not None or zoom is not None:
+            response = HeatmapProcessor.query_viewport(
+                raw_data=raw_data,
+                spreadsheet_id=heatmap_spreadsheet_id,
+                worksheet_name=worksheet_name,
+                bbox=parse_bbox(bbox) if bbox is not None else None,
+                zoom=zoom
+            )
+        else:
+            response = HeatmapProcessor.process_heatmap_points(
+                raw_data=raw_data,
+                spreadsheet_id=heatmap_spreadsheet_id,
+                worksheet_name=worksheet_name
+            )
+        response["freshness"] = get_sheets_freshness(heatmap_spreadsheet_id, worksheet_name)
+        return response
 
     except ValueError as e:
         raise HTTPException(
@@ -355,6 +407,57 @@ def get_heatmap_data(
         raise handle_google_sheets_error(e)
 
 
+@router.get("/sheets/quota")
+def get_sheets_quota(
+    current_admin: User = Depends(get_current_admin)
+) -> Dict[str, Any]:
+    """
+    Google Sheets API budget usage (token bucket per priority class) dan client pool stats.
+    Berguna untuk memantau apakah force refresh admin menghabiskan quota scheduler.
+    """
+    return {
+        "success": True,
+        "quota": get_sheets_quota_budgeter().get_stats(),
+        "client_pool": get_sheets_client_pool().get_stats()
+    }
+
+
+@router.get("/sheets/cache")
+def get_sheets_cache(
+    current_admin: User = Depends(get_current_admin)
+) -> Dict[str, Any]:
+    """
+    Sheets cache stats: entries, estimated bytes per cached sheet, byte budget, hits/misses.
+    Berguna untuk melihat sheet mana yang memakan memory worker.
+    """
+    return {
+        "success": True,
+        "cache": get_sheets_cache_stats()
+    }
+
+
+@router.post("/sheets/refresh")
+def refresh_dashboard_sheets(
+    current_admin: User = Depends(get_current_admin)
+) -> Dict[str, Any]:
+    """
+    Refresh semua sheet dashboard (IoT + heatmap) sekaligus.
+    Satu values.batchGet request per spreadsheet, hasilnya langsung mengisi cache.
+    """
+    try:
+        results = refresh_sheets_batch(priority=SheetsPriority.ADMIN)
+    except Exception as e:
+        raise handle_google_sheets_error(e)
+
+    return {
+        "success": True,
+        "sheets": [
+            {"spreadsheet_id": spreadsheet_id, "worksheet_name": worksheet_name, "total_records": len(records)}
+            for (spreadsheet_id, worksheet_name), records in results.items()
+        ]
+    }
+
+
 @router.post("/users/promote-industry", response_model=UserResponse)
 def promote_to_industry(
     payload: PromoteToIndustryRequest,
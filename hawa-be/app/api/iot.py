@@ -0,0 +1,99 @@
+"""IoT routes - direct device upload (bypass Apps Script / Google Sheets)"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.dependencies import get_current_user
+from app.db.models.user import User
+from app.db.postgres import get_db
+from app.services.iot.schemas import IoTIngestResponse
+from app.services.iot.service import IoTIngestService, PayloadTooLargeError
+
+router = APIRouter(prefix="/iot", tags=["iot"])
+
+
+async def _read_body(request: Request, max_bytes: int) -> bytes:
+    """Read the request body, rejecting (413) more than max_bytes on the wire without buffering it all"""
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Body exceeds {max_bytes} bytes"
+    )
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise too_large
+
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@router.post("/readings", response_model=IoTIngestResponse)
+async def ingest_readings(
+    request: Request,
+    x_device_id: Optional[str] = Header(None, alias="X-Device-Id"),
+    x_device_key: Optional[str] = Header(None, alias="X-Device-Key"),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload batch readings langsung dari device.
+
+    Body: JSON array, single JSON object, `{"device_id": ..., "readings": [...]}`,
+    atau NDJSON (`Content-Type: application/x-ndjson`). Boleh gzip (`Content-Encoding: gzip`).
+    Setiap reading di batch > 1 wajib punya `timestamp`; duplikat (device_id, timestamp) di-skip.
+    """
+    service = IoTIngestService(db)
+    device = await run_in_threadpool(service.authenticate_device, x_device_id, x_device_key)
+    if device is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid device credentials"
+        )
+
+    # Gzip bodies are capped again after decoding (decode_body)
+    body = await _read_body(request, get_settings().iot_max_body_bytes)
+    try:
+        # Gzip inflate + JSON parse of up to IOT_MAX_BODY_BYTES, off the event loop
+        items = await run_in_threadpool(
+            service.decode_body,
+            body,
+            content_type=request.headers.get("content-type"),
+            content_encoding=request.headers.get("content-encoding")
+        )
+    except PayloadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    try:
+        return await run_in_threadpool(service.ingest, device, items)
+    except Exception as e:
+        db.rollback()
+        print(f"[iot] Ingest failed for {device.device_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to store readings: {str(e)}"
+        )
+
+
+@router.get("/readings/latest")
+def get_latest_readings(
+    device_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Latest reading per device (last-value cache, fallback ke database)"""
+    readings = IoTIngestService(db).latest(device_id)
+    if device_id and not readings:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No readings for device {device_id}"
+        )
+    return {"devices": readings, "count": len(readings)}
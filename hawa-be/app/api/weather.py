@@ -2,24 +2,30 @@
 Weather API Endpoints
 Endpoints for weather recommendations and knowledge management
 """
+import asyncio
 import os
 import tempfile
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Any, Awaitable, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Query
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Query, Header, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
+from app.core.config import get_settings
 from app.core.dependencies import get_current_user
 from app.core.exceptions import handle_google_sheets_error
 from app.db.postgres import get_db
 from app.services.notification.whatsapp_service import WhatsAppService
 from app.services.weather.groq_heatmap_tips_service import GroqHeatmapTipsService
+from app.services.weather.heatmap_index import parse_bbox
 from app.services.weather.heatmap_processor import HeatmapProcessor
+from app.services.weather.heatmap_tiles import get_heatmap_tile_service, validate_tile
 from app.services.weather.recommendation_service import WeatherRecommendationService
 from app.services.weather.sheets_cache_service import (
     get_cached_sheets_data,
-    get_realtime_sheets_data
+    get_realtime_sheets_data,
+    get_sheets_freshness
 )
 from app.services.weather.spreadsheet_service import SpreadsheetService
 from app.services.weather.openmeteo_service import OpenMeteoService
@@ -252,14 +258,40 @@ def get_recommendation_from_spreadsheet(
             os.unlink(tmp_path)
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for GET)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
 @router.get("/heatmap", status_code=status.HTTP_200_OK)
 def get_heatmap_data(
+    response: Response,
     current_user: "User" = Depends(get_current_user),
     worksheet_name: str = Query(default="Sheet1", description="Worksheet name"),
     force_refresh: bool = Query(
         default=False,
         description="Force refresh from Google Sheets (bypass cache)"
-    )
+    ),
+    bbox: Optional[str] = Query(
+        default=None,
+        description="Viewport minLng,minLat,maxLng,maxLat (only points inside are returned)"
+    ),
+    zoom: Optional[int] = Query(
+        default=None,
+        ge=0,
+        le=22,
+        description="Map zoom level; below zoom 13 nearby points are clustered"
+    ),
+    since: Optional[str] = Query(
+        default=None,
+        description="Version from a previous response; only added/changed/removed points are returned"
+    ),
+    if_none_match: Optional[str] = Header(default=None)
 ):
     """
     Get heatmap data from Google Sheets for map visualization.
@@ -267,13 +299,21 @@ def get_heatmap_data(
 
     Data is taken from heatmap spreadsheet with format:
     - Location, Latitude, Longitude, PM2.5, PM10, Air Quality, Risk Score, Color, Device ID
+    A device that reported many times appears once, with its latest row.
+    With bbox/zoom only points in the viewport are returned, plus clusters at low zooms.
+
+    Every response carries the snapshot "version" (also sent as ETag). Pollers can send
+    If-None-Match (304 while unchanged) or ?since=<version> to get only the changes.
 
     Returns:
         Array of heatmap points with format ready for frontend map visualization
     """
-    heatmap_spreadsheet_id = "1p69Ae67JGlScrMlSDnebuZMghXYMY7IykiT1gQwello"
+    heatmap_spreadsheet_id = get_settings().heatmap_sheets_id
 
     try:
+        if since is not None and (bbox is not None or zoom is not None):
+            raise ValueError("since cannot be combined with bbox/zoom")
+
         # Use realtime cache (1 second) for heatmap data
         raw_data = get_realtime_sheets_data(
             spreadsheet_id=heatmap_spreadsheet_id,
@@ -281,11 +321,86 @@ def get_heatmap_data(
             force_refresh=force_refresh
         )
 
-        return HeatmapProcessor.process_heatmap_points(
-            raw_data=raw_data,
+        if since is not None:
+            response_data = HeatmapProcessor.process_heatmap_delta(
+                raw_data=raw_data,
+                spreadsheet_id=heatmap_spreadsheet_id,
+                worksheet_name=worksheet_name,
+                since=since
+            )
+        elif bbox is not None or zoom is not None:
+            response_data = HeatmapProcessor.query_viewport(
+                raw_data=raw_data,
+                spreadsheet_id=heatmap_spreadsheet_id,
+                worksheet_name=worksheet_name,
+                bbox=parse_bbox(bbox) if bbox is not None else None,
+                zoom=zoom
+            )
+        else:
+            response_data = HeatmapProcessor.process_heatmap_points(
+                raw_data=raw_data,
+                spreadsheet_id=heatmap_spreadsheet_id,
+                worksheet_name=worksheet_name
+            )
+
+        # Weak: freshness metadata changes while the points stay the same
+        etag = f'W/"{response_data["version"]}"'
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+        response_data["freshness"] = get_sheets_freshness(heatmap_spreadsheet_id, worksheet_name, realtime=True)
+        return response_data
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        ) from e
+    except Exception as e:
+        raise handle_google_sheets_error(e)
+
+
+@router.get("/heatmap/tiles/{z}/{x}/{y}.png", status_code=status.HTTP_200_OK)
+def get_heatmap_tile(
+    z: int,
+    x: int,
+    y: int,
+    current_user: "User" = Depends(get_current_user),
+    worksheet_name: str = Query(default="Sheet1", description="Worksheet name"),
+    if_none_match: Optional[str] = Header(default=None)
+):
+    """
+    Interpolated PM2.5 heatmap tile (XYZ / Web Mercator, 256x256 PNG).
+    Surface is computed with inverse-distance weighting from the heatmap points and
+    cached per points fingerprint, so tiles are rendered again only when data changes.
+
+    Returns:
+        PNG image; 304 when If-None-Match matches the current tile ETag
+    """
+    heatmap_spreadsheet_id = get_settings().heatmap_sheets_id
+    tile_service = get_heatmap_tile_service()
+
+    try:
+        validate_tile(z, x, y)
+        raw_data = get_realtime_sheets_data(
             spreadsheet_id=heatmap_spreadsheet_id,
             worksheet_name=worksheet_name
         )
+        index = HeatmapProcessor.get_spatial_index(raw_data)
+        etag = tile_service.tile_etag(index, z, x, y)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"private, max-age={get_settings().heatmap_tile_max_age_seconds}"
+        }
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response(
+            content=tile_service.get_tile(index, z, x, y),
+            media_type="image/png",
+            headers=headers
+        )
 
     except ValueError as e:
         raise HTTPException(
@@ -555,8 +670,16 @@ def health_check():
     }
 
 
+async def _with_timeout(call: Awaitable[Dict[str, Any]], seconds: float, label: str) -> Dict[str, Any]:
+    """Await an OpenMeteoService call; on timeout return its error shape so siblings still respond"""
+    try:
+        return await asyncio.wait_for(call, seconds)
+    except asyncio.TimeoutError:
+        return {"error": f"Timed out fetching {label} after {seconds}s", "data": None}
+
+
 @router.get("/analytics/current", status_code=status.HTTP_200_OK)
-def get_current_weather_analytics(
+async def get_current_weather_analytics(
     current_user: "User" = Depends(get_current_user),
     city: str = Query(default="Bandung", description="City name"),
     country_code: str = Query(default="ID", description="Country code")
@@ -568,7 +691,7 @@ def get_current_weather_analytics(
     """
     try:
         weather_service = OpenMeteoService()
-        result = weather_service.get_current_weather(city=city, country_code=country_code)
+        result = await weather_service.get_current_weather_async(city=city, country_code=country_code)
         
         if result.get("error"):
             raise HTTPException(
@@ -593,8 +716,34 @@ def get_current_weather_analytics(
         )
 
 
+@router.get("/analytics/current/batch", status_code=status.HTTP_200_OK)
+async def get_current_weather_batch_analytics(
+    current_user: "User" = Depends(get_current_user),
+    cities: str = Query(..., description="Comma-separated city names (max 100)")
+):
+    """
+    Current weather for many cities in one request (dashboards, city comparison)
+
+    Served from the pre-warmed forecast cache; misses are fetched in batched upstream calls.
+    """
+    names = [name.strip() for name in cities.split(",") if name.strip()]
+    if not names or len(names) > 100:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cities must contain between 1 and 100 names"
+        )
+
+    results = await OpenMeteoService().get_current_weather_batch_async(names)
+    return {
+        "success": True,
+        "data": {city: result.get("data") for city, result in results.items()},
+        "errors": {city: result["error"] for city, result in results.items() if result.get("error")},
+        "source": "open-meteo"
+    }
+
+
 @router.get("/analytics/forecast", status_code=status.HTTP_200_OK)
-def get_weather_forecast_analytics(
+async def get_weather_forecast_analytics(
     current_user: "User" = Depends(get_current_user),
     city: str = Query(default="Bandung", description="City name"),
     country_code: str = Query(default="ID", description="Country code"),
@@ -607,7 +756,7 @@ def get_weather_forecast_analytics(
     """
     try:
         weather_service = OpenMeteoService()
-        result = weather_service.get_forecast(city=city, country_code=country_code, days=days)
+        result = await weather_service.get_forecast_async(city=city, country_code=country_code, days=days)
         
         if result.get("error"):
             raise HTTPException(
@@ -633,7 +782,7 @@ def get_weather_forecast_analytics(
 
 
 @router.get("/analytics/hourly", status_code=status.HTTP_200_OK)
-def get_hourly_weather_forecast(
+async def get_hourly_weather_forecast(
     current_user: "User" = Depends(get_current_user),
     city: str = Query(default="Bandung", description="City name"),
     country_code: str = Query(default="ID", description="Country code"),
@@ -646,7 +795,7 @@ def get_hourly_weather_forecast(
     """
     try:
         weather_service = OpenMeteoService()
-        result = weather_service.get_hourly_forecast(city=city, country_code=country_code, hours=hours)
+        result = await weather_service.get_hourly_forecast_async(city=city, country_code=country_code, hours=hours)
         
         if result.get("error"):
             raise HTTPException(
@@ -672,7 +821,7 @@ def get_hourly_weather_forecast(
 
 
 @router.get("/analytics/summary", status_code=status.HTTP_200_OK)
-def get_weather_analytics_summary(
+async def get_weather_analytics_summary(
     current_user: "User" = Depends(get_current_user),
     city: str = Query(default="Bandung", description="City name"),
     country_code: str = Query(default="ID", description="Country code")
@@ -684,32 +833,57 @@ def get_weather_analytics_summary(
     """
     try:
         weather_service = OpenMeteoService()
-        
-        # Get current weather
-        current_result = weather_service.get_current_weather(city=city, country_code=country_code)
-        forecast_result = weather_service.get_forecast(city=city, country_code=country_code, days=5)
-        
-        # Get air quality recommendation if available
-        db = next(get_db())
-        recommendation_service = WeatherRecommendationService(db)
-        
-        # Build weather data for recommendation
-        current_data = current_result.get("data", {}).get("current", {}) if current_result.get("data") else {}
-        weather_data = {
-            "temperature": current_data.get("temperature"),
-            "humidity": current_data.get("humidity"),
-            "pressure": current_data.get("pressure"),
-            "wind_speed": current_data.get("wind_speed"),
-            "location": city
-        }
-        
-        try:
-            recommendation = recommendation_service.get_personalized_recommendation(
-                user=current_user,
-                weather_data=weather_data
+        settings = get_settings()
+
+        # Get air quality recommendation if available (database + LLM, blocking: run in threadpool)
+        def recommend(weather_data: Dict[str, Any]):
+            sessions = get_db()
+            try:
+                return WeatherRecommendationService(next(sessions)).get_personalized_recommendation(
+                    user=current_user,
+                    weather_data=weather_data
+                )
+            finally:
+                sessions.close()
+
+        async def current_with_recommendation():
+            current_result = await _with_timeout(
+                weather_service.get_current_weather_async(city=city, country_code=country_code),
+                settings.analytics_upstream_timeout_seconds,
+                "current weather"
             )
-        except Exception:
-            recommendation = None
+
+            # Build weather data for recommendation
+            current_data = current_result.get("data", {}).get("current", {}) if current_result.get("data") else {}
+            weather_data = {
+                "temperature": current_data.get("temperature"),
+                "humidity": current_data.get("humidity"),
+                "pressure": current_data.get("pressure"),
+                "wind_speed": current_data.get("wind_speed"),
+                "location": city
+            }
+            try:
+                recommendation = await asyncio.wait_for(
+                    run_in_threadpool(recommend, weather_data),
+                    settings.analytics_recommendation_timeout_seconds
+                )
+                recommendation_error = None
+            except asyncio.TimeoutError:
+                recommendation = None
+                recommendation_error = f"Timed out after {settings.analytics_recommendation_timeout_seconds}s"
+            except Exception:
+                recommendation, recommendation_error = None, None
+            return current_result, recommendation, recommendation_error
+
+        # The recommendation needs current conditions; the forecast does not, so it runs alongside
+        (current_result, recommendation, recommendation_error), forecast_result = await asyncio.gather(
+            current_with_recommendation(),
+            _with_timeout(
+                weather_service.get_forecast_async(city=city, country_code=country_code, days=5),
+                settings.analytics_upstream_timeout_seconds,
+                "forecast"
+            )
+        )
         
         summary = {
             "current": current_result.get("data") if not current_result.get("error") else None,
@@ -717,7 +891,8 @@ def get_weather_analytics_summary(
             "recommendation": recommendation,
             "errors": {
                 "current": current_result.get("error"),
-                "forecast": forecast_result.get("error")
+                "forecast": forecast_result.get("error"),
+                "recommendation": recommendation_error
             }
         }
         
@@ -739,7 +914,7 @@ def get_weather_analytics_summary(
 
 
 @router.get("/analytics/compare", status_code=status.HTTP_200_OK)
-def compare_air_quality_trends(
+async def compare_air_quality_trends(
     current_user: "User" = Depends(get_current_user),
     primary_city: str = Query(default="Bandung", description="Primary city to analyze"),
     secondary_city: str | None = Query(default=None, description="Optional comparison city"),
@@ -753,28 +928,36 @@ def compare_air_quality_trends(
     weather_service = OpenMeteoService()
 
     try:
-        primary = weather_service.get_air_quality_history(city=primary_city, hours=hours)
+        timeout = get_settings().analytics_upstream_timeout_seconds
+        branches = [_with_timeout(
+            weather_service.get_air_quality_history_async(city=primary_city, hours=hours),
+            timeout,
+            "primary city"
+        )]
+        if secondary_city:
+            branches.append(_with_timeout(
+                weather_service.get_air_quality_history_async(city=secondary_city, hours=hours),
+                timeout,
+                "secondary city"
+            ))
+        primary, *rest = await asyncio.gather(*branches)
         if primary.get("error"):
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=primary.get("error", "Failed to fetch primary city data")
             )
 
-        secondary_data = None
-        if secondary_city:
-            secondary = weather_service.get_air_quality_history(city=secondary_city, hours=hours)
-            if secondary.get("error"):
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=secondary.get("error", "Failed to fetch secondary city data")
-                )
-            secondary_data = secondary.get("data")
+        # A failed comparison city still returns the primary series
+        secondary = rest[0] if rest else {"data": None, "error": None}
 
         return {
             "success": True,
             "data": {
                 "primary": primary.get("data"),
-                "secondary": secondary_data
+                "secondary": secondary.get("data") if not secondary.get("error") else None
+            },
+            "errors": {
+                "secondary": secondary.get("error")
             },
             "source": "open-meteo"
         }
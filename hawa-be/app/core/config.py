@@ -11,16 +11,93 @@ class Settings(BaseModel):
     algorithm: str = "HS256"
     groq_api_key: str | None = os.getenv("GROQ_API_KEY")
     google_sheets_id: str | None = os.getenv("GOOGLE_SHEETS_ID", "1Cv0PPUtZjIFlVSprD-FfvQDkUV4thy5qsH4IOMl3cyA")
+    heatmap_sheets_id: str = os.getenv("HEATMAP_SHEETS_ID", "1p69Ae67JGlScrMlSDnebuZMghXYMY7IykiT1gQwello")
     openweather_api_key: str | None = os.getenv("OPENWEATHER_API_KEY")
     
     # Rate Limiting Configuration
     iot_data_rate_limit: int = int(os.getenv("IOT_DATA_RATE_LIMIT", "50"))  # requests per minute
     ai_recommendation_rate_limit: int = int(os.getenv("AI_RECOMMENDATION_RATE_LIMIT", "30"))  # requests per minute
+    heatmap_tile_rate_limit: int = int(os.getenv("HEATMAP_TILE_RATE_LIMIT", "600"))  # requests per minute (a map view loads many tiles)
     
     # Cache Configuration
     cache_ttl_seconds: int = int(os.getenv("CACHE_TTL_SECONDS", "1"))  # 1 second for realtime
     realtime_window_seconds: int = int(os.getenv("REALTIME_WINDOW_SECONDS", "60"))  # 60 second window
 
+    # Append-only IoT sheets (comma-separated IDs) read incrementally instead of full downloads
+    # GOOGLE_SHEETS_ID is always treated as append-only
+    append_only_sheet_ids: str = os.getenv("APPEND_ONLY_SHEET_IDS", "")
+    sheets_full_resync_seconds: int = int(os.getenv("SHEETS_FULL_RESYNC_SECONDS", "900"))  # safety full re-download
+
+    # Stale-while-revalidate: serve cached sheet snapshot, refresh in background
+    sheets_stale_while_revalidate: bool = os.getenv("SHEETS_STALE_WHILE_REVALIDATE", "true").lower() == "true"
+    sheets_max_staleness_seconds: int = int(os.getenv("SHEETS_MAX_STALENESS_SECONDS", "300"))  # standard cache
+    realtime_max_staleness_seconds: int = int(os.getenv("REALTIME_MAX_STALENESS_SECONDS", "15"))  # realtime cache
+    # Per-sheet refresh interval (standard cache TTL, default 30s): "<spreadsheet_id>[:<worksheet>]=<seconds>,..."
+    sheets_refresh_intervals: str = os.getenv("SHEETS_REFRESH_INTERVALS", "")
+    # Revalidate expired sheet snapshots with a Drive revision probe instead of re-downloading
+    sheets_change_detection: bool = os.getenv("SHEETS_CHANGE_DETECTION", "true").lower() == "true"
+
+    # Durable last-good sheet snapshots (cold start / Google Sheets outage)
+    sheets_snapshots_enabled: bool = os.getenv("SHEETS_SNAPSHOTS", "true").lower() == "true"
+    sheets_snapshot_dir: str | None = os.getenv("SHEETS_SNAPSHOT_DIR")  # default: <tmp>/hawa-snapshots
+    sheets_snapshot_interval_seconds: int = int(os.getenv("SHEETS_SNAPSHOT_INTERVAL_SECONDS", "30"))  # min seconds between writes
+    sheets_snapshot_max_age_seconds: int = int(os.getenv("SHEETS_SNAPSHOT_MAX_AGE_SECONDS", "86400"))  # served on cold start if younger
+
+    # Google Sheets quota budget per process (Google default: 60 read requests/min per service account)
+    # With several workers set this to quota / workers; 0 disables the local budget (429 backoff still applies)
+    sheets_quota_requests_per_minute: float = float(os.getenv("SHEETS_QUOTA_REQUESTS_PER_MINUTE", "60"))
+    sheets_quota_burst: float | None = float(os.getenv("SHEETS_QUOTA_BURST")) if os.getenv("SHEETS_QUOTA_BURST") else None
+
+    # Local readings store (sensor_readings mirror of the IoT sheet)
+    # Only writer of sensor_readings from Sheets (request handlers just read), keep it well below REALTIME_WINDOW_SECONDS
+    readings_ingest_interval_seconds: int = int(os.getenv("READINGS_INGEST_INTERVAL_SECONDS", "15"))
+    device_ring_capacity: int = int(os.getenv("DEVICE_RING_CAPACITY", "256"))  # recent readings kept in memory per device (>= realtime warnings limit)
+
+    # Heatmap: one point per Device ID (last sheet row wins) instead of one per row
+    heatmap_latest_per_device: bool = os.getenv("HEATMAP_LATEST_PER_DEVICE", "true").lower() in ("1", "true", "yes")
+
+    # Byte budget per sheets cache (standard / realtime) per process, LRU eviction by size; 0 = entry count only
+    sheets_cache_max_bytes: int = int(os.getenv("SHEETS_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+
+    # Interpolated heatmap tiles (IDW surface, cached per points fingerprint)
+    heatmap_tile_cache_bytes: int = int(os.getenv("HEATMAP_TILE_CACHE_BYTES", str(32 * 1024 * 1024)))
+    heatmap_idw_radius_km: float = float(os.getenv("HEATMAP_IDW_RADIUS_KM", "15"))
+    heatmap_idw_power: float = float(os.getenv("HEATMAP_IDW_POWER", "2"))
+    heatmap_tile_max_age_seconds: int = int(os.getenv("HEATMAP_TILE_MAX_AGE_SECONDS", "60"))
+
+    # Cache backend for sheets/AI caches: memory (per process), disk (shared dir, one host), redis
+    cache_backend: str = os.getenv("CACHE_BACKEND", "memory")
+    cache_dir: str | None = os.getenv("CACHE_DIR")  # disk backend, default /dev/shm/hawa-cache
+    redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")  # private instance only: entries are pickled
+    cache_key_prefix: str = os.getenv("CACHE_KEY_PREFIX", "hawa:")
+
+    # Shared outbound HTTP pool (Open-Meteo): keep-alive, HTTP/2 when h2 is installed
+    http_timeout_seconds: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+    http_max_connections: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    http_max_keepalive_connections: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    http_keepalive_expiry_seconds: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+
+    # Open-Meteo response cache: entries expire at the next upstream update boundary (+ grace)
+    openmeteo_current_ttl_seconds: int = int(os.getenv("OPENMETEO_CURRENT_TTL_SECONDS", "900"))  # current = 15-min data
+    openmeteo_forecast_ttl_seconds: int = int(os.getenv("OPENMETEO_FORECAST_TTL_SECONDS", "3600"))  # hourly/daily
+    openmeteo_air_quality_ttl_seconds: int = int(os.getenv("OPENMETEO_AIR_QUALITY_TTL_SECONDS", "3600"))
+    openmeteo_cache_grace_seconds: int = int(os.getenv("OPENMETEO_CACHE_GRACE_SECONDS", "60"))
+    openmeteo_batch_size: int = int(os.getenv("OPENMETEO_BATCH_SIZE", "50"))  # locations per upstream call
+    # Pre-warm job: these cities plus every distinct User.location (comma-separated); interval 0 disables
+    openmeteo_prewarm_locations: str = os.getenv(
+        "OPENMETEO_PREWARM_LOCATIONS",
+        "Bandung,Cimahi,Bogor,Depok,Bekasi,Sukabumi,Cirebon,Tasikmalaya,Banjar,Garut,Karawang,Purwakarta,Sumedang"
+    )
+    openmeteo_prewarm_interval_seconds: int = int(os.getenv("OPENMETEO_PREWARM_INTERVAL_SECONDS", "900"))
+
+    # Analytics fan-out: per-branch timeouts, a slow branch is reported in "errors" instead of failing the request
+    analytics_upstream_timeout_seconds: float = float(os.getenv("ANALYTICS_UPSTREAM_TIMEOUT_SECONDS", "8"))
+    analytics_recommendation_timeout_seconds: float = float(os.getenv("ANALYTICS_RECOMMENDATION_TIMEOUT_SECONDS", "20"))
+
+    # Direct IoT ingest (POST /iot/readings)
+    iot_max_batch_size: int = int(os.getenv("IOT_MAX_BATCH_SIZE", "5000"))  # readings per request
+    iot_max_body_bytes: int = int(os.getenv("IOT_MAX_BODY_BYTES", str(5 * 1024 * 1024)))  # after gzip decode
+
 
 @lru_cache
 def get_settings() -> Settings:
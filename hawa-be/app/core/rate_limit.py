@@ -100,6 +100,9 @@ iot_data_limiter = RateLimiter(max_requests=50, window_seconds=60)
 # AI Recommendation Endpoints: 30 requests/minute
 ai_recommendation_limiter = RateLimiter(max_requests=30, window_seconds=60)
 
+# Heatmap Tiles: 600 requests/minute (one map view = 10-30 tiles)
+heatmap_tile_limiter = RateLimiter(max_requests=600, window_seconds=60)
+
 
 def get_rate_limit_exception(limiter: RateLimiter, retry_after: int) -> HTTPException:
     """Create HTTPException for rate limit exceeded"""
@@ -1,3 +1,6 @@
+import hashlib
+import hmac
+import secrets
 from datetime import datetime, timedelta, timezone
 
 from jose import JWTError, jwt
@@ -17,6 +20,20 @@ def verify_password(plain_password: str, password_hash: str) -> bool:
     return pwd_context.verify(plain_password, password_hash)
 
 
+def generate_device_key() -> str:
+    """Generate random API key untuk IoT device (hanya ditampilkan sekali)"""
+    return secrets.token_urlsafe(32)
+
+
+def hash_device_key(device_key: str) -> str:
+    # Device keys are high-entropy random tokens, a fast hash is enough
+    return hashlib.sha256(device_key.encode("utf-8")).hexdigest()
+
+
+def verify_device_key(device_key: str, key_hash: str) -> bool:
+    return hmac.compare_digest(hash_device_key(device_key), key_hash)
+
+
 def create_access_token(subject: str) -> str:
     settings = get_settings()
     expire = datetime.now(timezone.utc) + timedelta(
@@ -6,6 +6,8 @@ from app.db.models.user import User  # noqa: F401
 from app.db.models.compliance import ComplianceRecord  # noqa: F401
 from app.db.models.feedback import CommunityFeedback, FeedbackVote  # noqa: F401
 from app.db.models.weather_knowledge import WeatherKnowledge  # noqa: F401
+from app.db.models.sensor_reading import SensorReading  # noqa: F401
+from app.db.models.iot_device import IoTDevice  # noqa: F401
 
 
 
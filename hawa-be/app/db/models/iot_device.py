@@ -0,0 +1,26 @@
+"""
+IoT Device Model
+Device yang boleh upload readings langsung ke backend (POST /iot/readings)
+"""
+from datetime import datetime
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, DateTime, Boolean
+from sqlalchemy.sql import func
+from app.db.postgres import Base
+
+
+class IoTDevice(Base):
+    """Registered IoT device dengan per-device API key"""
+    __tablename__ = "iot_devices"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    device_id: Mapped[str] = mapped_column(String(64), unique=True, nullable=False, index=True)
+    api_key_hash: Mapped[str] = mapped_column(String(64), nullable=False)  # sha256 hex of the device key
+
+    name: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    location: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+
+    last_seen_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
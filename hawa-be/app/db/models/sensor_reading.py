@@ -0,0 +1,45 @@
+"""
+Sensor Reading Model
+Typed time-series mirror of the IoT Google Sheet (satu baris per sample device)
+"""
+from datetime import datetime
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, DateTime, Float, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.postgres import Base
+
+
+class SensorReading(Base):
+    """Satu sample IoT (PM, cuaca) dari device tertentu"""
+    __tablename__ = "sensor_readings"
+    __table_args__ = (
+        UniqueConstraint("device_id", "timestamp", name="uq_sensor_readings_device_timestamp"),
+        Index("idx_sensor_readings_timestamp", "timestamp"),
+        Index("idx_sensor_readings_source_timestamp", "source", "timestamp"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    device_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    # Pollutants
+    pm25: Mapped[float | None] = mapped_column(Float, nullable=True)
+    pm10: Mapped[float | None] = mapped_column(Float, nullable=True)
+    o3: Mapped[float | None] = mapped_column(Float, nullable=True)
+    no2: Mapped[float | None] = mapped_column(Float, nullable=True)
+    so2: Mapped[float | None] = mapped_column(Float, nullable=True)
+    co: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+    # Weather
+    temperature: Mapped[float | None] = mapped_column(Float, nullable=True)
+    humidity: Mapped[float | None] = mapped_column(Float, nullable=True)
+    pressure: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+    # Metadata
+    air_quality_level: Mapped[str | None] = mapped_column(String(50), nullable=True)
+    location: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    source: Mapped[str | None] = mapped_column(String(100), nullable=True)  # "sheets:<spreadsheet_id>:<worksheet>"
+    source_row: Mapped[int | None] = mapped_column(Integer, nullable=True)  # 1-based data row in the source sheet
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -12,13 +12,19 @@ from app.db.models import user as user_models  # noqa: F401  # ensure model is r
 from app.db.models import weather_knowledge as weather_knowledge_models  # noqa: F401  # ensure model is registered
 from app.db.models import compliance as compliance_models  # noqa: F401  # ensure model is registered
 from app.db.models import feedback as feedback_models  # noqa: F401  # ensure model is registered
+from app.db.models import sensor_reading as sensor_reading_models  # noqa: F401  # ensure model is registered
+from app.db.models import iot_device as iot_device_models  # noqa: F401  # ensure model is registered
 from app.api.auth import router as auth_router
 from app.api.admin import router as admin_router
 from app.api.weather import router as weather_router
 from app.services.weather.scheduler import start_default_scheduler
+from app.services.weather.gazetteer import get_gazetteer
+from app.services.weather.http_client import close_http_clients, open_http_clients
+from app.services.weather.sheets_snapshot_store import get_sheet_snapshot_store
 from app.core.rate_limit import (
     iot_data_limiter,
     ai_recommendation_limiter,
+    heatmap_tile_limiter,
     get_rate_limit_exception
 )
 from app.core.config import get_settings
@@ -51,6 +57,9 @@ app.include_router(feedback_router)
 from app.api.admin_feedback import router as admin_feedback_router
 app.include_router(admin_feedback_router)
 
+from app.api.iot import router as iot_router
+app.include_router(iot_router)
+
 # Root endpoint
 @app.get("/")
 def root():
@@ -126,6 +135,7 @@ async def rate_limit_middleware(request: Request, call_next):
     # Update limiters with config from settings
     iot_data_limiter.max_requests = settings.iot_data_rate_limit
     ai_recommendation_limiter.max_requests = settings.ai_recommendation_rate_limit
+    heatmap_tile_limiter.max_requests = settings.heatmap_tile_rate_limit
     
     # Get client identifier (IP address or user_id if authenticated)
     client_ip = request.client.host if request.client else "unknown"
@@ -146,6 +156,21 @@ async def rate_limit_middleware(request: Request, call_next):
                 headers={"Retry-After": str(retry_after)}
             )
     
+    # Check rate limit for heatmap tiles (cached PNGs, many per map view)
+    elif "/weather/heatmap/tiles/" in path:
+        is_allowed, retry_after = heatmap_tile_limiter.check_rate_limit(client_key)
+        if not is_allowed:
+            return JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={
+                    "detail": "Too many heatmap tile requests. Please wait.",
+                    "retry_after": retry_after,
+                    "limit": heatmap_tile_limiter.max_requests,
+                    "window_seconds": heatmap_tile_limiter.window_seconds
+                },
+                headers={"Retry-After": str(retry_after)}
+            )
+
     # Check rate limit for IoT data endpoints
     elif "/weather/heatmap" in path or "/admin/spreadsheet" in path or "/weather/realtime" in path:
         is_allowed, retry_after = iot_data_limiter.check_rate_limit(client_key)
@@ -200,6 +225,17 @@ def on_startup() -> None:
     # Initialize database schema
     Base.metadata.create_all(bind=engine)
 
+    # Map last-good sheet snapshots so the first requests after a restart are served from disk
+    snapshot_store = get_sheet_snapshot_store()
+    if snapshot_store is not None:
+        print(f"[startup] Mapped {snapshot_store.preload()} sheet snapshot(s) from {snapshot_store.directory}")
+
+    # Offline location index, built once per worker instead of on the first weather request
+    print(f"[startup] Loaded gazetteer ({len(get_gazetteer())} places)")
+
+    # Pooled Open-Meteo client, reused by every request of this worker (closed on shutdown)
+    open_http_clients()
+
     # Start weather notification scheduler (06:00 daily, 12:00 if AQI bad)
     # Note: Scheduler might not work in serverless environment like Vercel
     # Consider using external cron service for production
@@ -210,6 +246,12 @@ def on_startup() -> None:
         print(f"Warning: Could not start scheduler: {e}")
 
 
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    """Close pooled outbound HTTP connections"""
+    await close_http_clients()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -2,6 +2,7 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 
+from app.core.config import get_settings
 from app.db.models.compliance import ComplianceRecord, ComplianceStatusEnum
 from app.services.compliance.schemas import ComplianceRecordCreate
 from app.services.weather.heatmap_processor import HeatmapProcessor
@@ -98,7 +99,7 @@ class ComplianceService:
         Auto-generate compliance records from heatmap data
         This creates compliance records based on real-time heatmap pollution data
         """
-        heatmap_spreadsheet_id = "1p69Ae67JGlScrMlSDnebuZMghXYMY7IykiT1gQwello"
+        heatmap_spreadsheet_id = get_settings().heatmap_sheets_id
         
         try:
             raw_data = get_cached_sheets_data(
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
+
+
+class IoTReadingIn(BaseModel):
+    """
+    Satu sample dari device.
+    Menerima nama field firmware (pm25density, temp, hum, air, device) maupun nama kanonik.
+    """
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
+
+    device_id: str | None = Field(None, validation_alias=AliasChoices("device_id", "device"))
+    timestamp: datetime | None = Field(None, validation_alias=AliasChoices("timestamp", "ts", "time"))
+
+    pm25: float | None = Field(None, validation_alias=AliasChoices("pm25", "pm25density", "pm2_5", "pm25raw"))
+    pm10: float | None = Field(None, validation_alias=AliasChoices("pm10", "pm10density"))
+    o3: float | None = None
+    no2: float | None = None
+    so2: float | None = None
+    co: float | None = None
+
+    temperature: float | None = Field(None, validation_alias=AliasChoices("temperature", "temp"))
+    humidity: float | None = Field(None, validation_alias=AliasChoices("humidity", "hum"))
+    pressure: float | None = None
+
+    air_quality_level: str | None = Field(None, validation_alias=AliasChoices("air_quality_level", "air"))
+    location: str | None = None
+
+
+class IoTIngestResponse(BaseModel):
+    received: int
+    inserted: int
+    duplicates: int
+    rejected: int
+    errors: List[str] = []  # first few rejection reasons (index: reason)
+    latest: Dict[str, Any] | None = None
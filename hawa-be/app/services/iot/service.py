@@ -0,0 +1,240 @@
+"""
+IoT ingest service
+Device upload readings langsung ke backend (batch JSON array / NDJSON, optional gzip),
+tanpa lewat Apps Script dan Google Sheets
+"""
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.security import verify_device_key
+from app.db.models.iot_device import IoTDevice
+from app.db.models.sensor_reading import SensorReading
+from app.services.iot.schemas import IoTIngestResponse, IoTReadingIn
+from app.services.weather.readings_store import READING_FIELDS, ReadingsStore, get_device_readings
+
+# Source key stored on every reading uploaded directly by a device
+IOT_DIRECT_SOURCE = "iot:direct"
+
+# Max rejection reasons echoed back to the device
+_MAX_ERRORS = 20
+
+
+class PayloadTooLargeError(ValueError):
+    """Body (setelah gzip decode) melebihi IOT_MAX_BODY_BYTES atau IOT_MAX_BATCH_SIZE"""
+
+
+def get_latest_readings(device_id: str | None = None) -> Dict[str, Dict[str, Any]]:
+    """Latest reading per directly uploading device (semua device atau satu device)"""
+    return get_device_readings().latest(IOT_DIRECT_SOURCE, device_id)
+
+
+class IoTIngestService:
+    """Service untuk autentikasi device dan ingest batch readings"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.settings = get_settings()
+        self.store = ReadingsStore(db)
+
+    def authenticate_device(self, device_id: str | None, device_key: str | None) -> Optional[IoTDevice]:
+        """
+        Verify per-device API key
+
+        Returns:
+            IoTDevice jika key valid dan device aktif, None jika tidak
+        """
+        if not device_id or not device_key:
+            return None
+        device = self.db.query(IoTDevice).filter(IoTDevice.device_id == device_id).first()
+        if not device or not device.is_active:
+            return None
+        if not verify_device_key(device_key, device.api_key_hash):
+            return None
+        return device
+
+    def decode_body(
+        self,
+        body: bytes,
+        content_type: str | None = None,
+        content_encoding: str | None = None
+    ) -> List[Any]:
+        """
+        Decode request body ke list of raw reading objects
+
+        Supported:
+        - JSON array: [{...}, {...}]
+        - JSON object: {...} (single reading) atau {"device_id": ..., "readings": [...]}
+        - NDJSON: satu JSON object per baris
+        - Content-Encoding: gzip (atau body diawali gzip magic bytes)
+
+        Raises:
+            PayloadTooLargeError: body / batch terlalu besar
+            ValueError: body tidak bisa di-parse
+        """
+        max_bytes = self.settings.iot_max_body_bytes
+        if (content_encoding and "gzip" in content_encoding.lower()) or body[:2] == b"\x1f\x8b":
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                body = decompressor.decompress(body, max_bytes + 1)
+            except zlib.error as e:
+                raise ValueError(f"Invalid gzip body: {e}")
+            if len(body) > max_bytes or decompressor.unconsumed_tail:
+                raise PayloadTooLargeError(f"Decoded body exceeds {max_bytes} bytes")
+        elif len(body) > max_bytes:
+            raise PayloadTooLargeError(f"Body exceeds {max_bytes} bytes")
+
+        try:
+            text = body.decode("utf-8").strip()
+        except UnicodeDecodeError:
+            raise ValueError("Body must be UTF-8 encoded JSON")
+        if not text:
+            raise ValueError("Empty body")
+
+        is_ndjson = bool(content_type and "ndjson" in content_type.lower())
+        items: List[Any]
+        if not is_ndjson:
+            try:
+                parsed = json.loads(text)
+            except json.JSONDecodeError:
+                # Fall back to NDJSON when Content-Type is missing or generic
+                is_ndjson = "\n" in text
+                if not is_ndjson:
+                    raise ValueError("Body is not valid JSON")
+            else:
+                items = self._unwrap(parsed)
+
+        if is_ndjson:
+            items = []
+            for line_no, line in enumerate(text.splitlines(), start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    items.append(json.loads(line))
+                except json.JSONDecodeError:
+                    raise ValueError(f"Invalid NDJSON at line {line_no}")
+
+        if len(items) > self.settings.iot_max_batch_size:
+            raise PayloadTooLargeError(
+                f"Batch has {len(items)} readings, max {self.settings.iot_max_batch_size}"
+            )
+        return items
+
+    @staticmethod
+    def _unwrap(parsed: Any) -> List[Any]:
+        """Normalize parsed JSON ke list of readings"""
+        if isinstance(parsed, list):
+            return parsed
+        if isinstance(parsed, dict) and isinstance(parsed.get("readings"), list):
+            # Envelope: batch-level device_id/location apply to every reading
+            defaults = {key: parsed[key] for key in ("device_id", "device", "location") if key in parsed}
+            return [{**defaults, **item} if isinstance(item, dict) else item for item in parsed["readings"]]
+        if isinstance(parsed, dict):
+            return [parsed]
+        raise ValueError("Body must be a JSON object, array, or NDJSON")
+
+    def ingest(self, device: IoTDevice, items: List[Any]) -> IoTIngestResponse:
+        """
+        Validate dan bulk-insert batch readings untuk satu device
+
+        Args:
+            device: Authenticated device
+            items: Raw reading objects (lihat decode_body)
+
+        Returns:
+            IoTIngestResponse dengan jumlah inserted/duplicates/rejected
+        """
+        received_at = datetime.now(timezone.utc)
+        rows: List[Dict[str, Any]] = []
+        errors: List[str] = []
+        rejected = 0
+
+        def reject(index: int, reason: str):
+            nonlocal rejected
+            rejected += 1
+            if len(errors) < _MAX_ERRORS:
+                errors.append(f"{index}: {reason}")
+
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                reject(index, "reading must be a JSON object")
+                continue
+            try:
+                reading = IoTReadingIn.model_validate(item)
+            except ValidationError as e:
+                first = e.errors()[0]
+                reject(index, f"{'.'.join(str(loc) for loc in first.get('loc', []))}: {first.get('msg')}")
+                continue
+
+            if reading.device_id and reading.device_id != device.device_id:
+                reject(index, f"device_id '{reading.device_id}' does not match authenticated device")
+                continue
+
+            timestamp = reading.timestamp
+            if timestamp is None:
+                if len(items) > 1:
+                    # Buffered bursts must carry their sample time, otherwise they collapse onto one key
+                    reject(index, "timestamp required in batched uploads")
+                    continue
+                timestamp = received_at
+
+            processed = {field: getattr(reading, field) for field in READING_FIELDS}
+            processed.update({
+                "timestamp": timestamp,
+                "air_quality_level": reading.air_quality_level,
+                "location": reading.location or device.location,
+                "device_id": device.device_id,
+            })
+            row = ReadingsStore.build_row(processed, source=IOT_DIRECT_SOURCE)
+            if row is None:
+                reject(index, "invalid timestamp")
+                continue
+            rows.append(row)
+
+        # Committed together with the readings by bulk_insert (which also updates the device index)
+        device.last_seen_at = received_at
+        inserted = self.store.bulk_insert(rows)
+        if not rows:
+            self.db.commit()
+
+        latest = get_latest_readings(device.device_id).get(device.device_id) if rows else None
+
+        return IoTIngestResponse(
+            received=len(items),
+            inserted=inserted,
+            duplicates=len(rows) - inserted,
+            rejected=rejected,
+            errors=errors,
+            latest=latest
+        )
+
+    def latest(self, device_id: str | None = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Latest reading per device dari per-device index.
+        Device yang belum ada di index (mis. setelah restart) diambil dari database.
+        """
+        cached = get_latest_readings(device_id)
+        if device_id is not None:
+            if cached:
+                return cached
+            readings = self.store.latest(1, source=IOT_DIRECT_SOURCE, device_id=device_id)
+            if not readings:
+                return {}
+            row = {
+                column: getattr(readings[0], column)
+                for column in SensorReading.__table__.columns.keys()
+                if column not in ("id", "created_at")
+            }
+            get_device_readings().ingest([row])
+            return get_latest_readings(device_id)
+
+        device_ids = [row[0] for row in self.db.query(IoTDevice.device_id).filter(IoTDevice.is_active.is_(True)).all()]
+        for missing in (d for d in device_ids if d not in cached):
+            cached.update(self.latest(missing))
+        return cached
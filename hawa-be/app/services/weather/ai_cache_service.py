@@ -7,8 +7,13 @@ import json
 import hashlib
 import threading
 import time
-from collections import OrderedDict
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Optional
+
+from app.services.weather.cache_backend import (
+    CacheBackend,
+    InProcessCacheBackend,
+    create_cache_backend
+)
 
 
 class AICacheService:
@@ -19,17 +24,19 @@ class AICacheService:
     - Auto cleanup expired entries (prevent memory leak)
     - Memory limit (prevent OOM)
     - TTL-based expiration
+    - Pluggable storage backend (shared across workers with disk/Redis backend)
     """
     
-    def __init__(self, ttl_seconds: int = 1, max_size: int = 1000):
+    def __init__(self, ttl_seconds: int = 1, max_size: int = 1000, backend: CacheBackend | None = None):
         """
         Initialize AI cache service
         
         Args:
             ttl_seconds: Time to live in seconds (default: 1 second for realtime)
             max_size: Maximum entries in cache (prevent memory overflow)
+            backend: Storage backend (default: in-process LRU with max_size entries)
         """
-        self._cache: OrderedDict[str, Tuple[Dict[str, Any], float]] = OrderedDict()
+        self._backend = backend or InProcessCacheBackend(max_size=max_size)
         self._lock = threading.RLock()  # Reentrant lock for nested calls
         self.ttl_seconds = ttl_seconds
         self.max_size = max_size
@@ -57,21 +64,16 @@ class AICacheService:
         with self._lock:
             # Periodic cleanup
             self._periodic_cleanup()
-            
-            if cache_key not in self._cache:
-                return None
-            
-            value, timestamp = self._cache[cache_key]
-            current_time = time.time()
-            
-            # Check if expired
-            if current_time - timestamp >= self.ttl_seconds:
-                del self._cache[cache_key]
-                return None
-            
-            # Move to end (LRU - Least Recently Used)
-            self._cache.move_to_end(cache_key)
-            return value
+        
+        entry = self._backend.get(cache_key)
+        if entry is None:
+            return None
+        
+        # Check if expired
+        if time.time() - entry.stored_at >= self.ttl_seconds:
+            self._backend.delete(cache_key)
+            return None
+        return entry.value
     
     def set_cached_recommendation(
         self,
@@ -85,12 +87,8 @@ class AICacheService:
             cache_key: Cache key for recommendation
             recommendation: Recommendation data to cache
         """
-        with self._lock:
-            # Remove oldest if at max size
-            if len(self._cache) >= self.max_size:
-                self._cache.popitem(last=False)  # Remove oldest (FIFO)
-            
-            self._cache[cache_key] = (recommendation, time.time())
+        # Backend evicts the least recently used entry at max_size
+        self._backend.set(cache_key, recommendation, ttl_seconds=self.ttl_seconds)
     
     def _periodic_cleanup(self):
         """Periodic cleanup expired entries"""
@@ -105,37 +103,33 @@ class AICacheService:
     
     def cleanup_expired(self):
         """Remove expired entries"""
-        with self._lock:
-            current_time = time.time()
-            expired_keys = [
-                key for key, (_, timestamp) in self._cache.items()
-                if current_time - timestamp >= self.ttl_seconds
-            ]
-            for key in expired_keys:
-                del self._cache[key]
+        try:
+            self._backend.cleanup_expired()
+        except Exception as e:
+            print(f"[ai_cache] Cleanup failed: {e}")
     
     def clear(self):
         """Clear all cache"""
-        with self._lock:
-            self._cache.clear()
+        self._backend.clear()
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        with self._lock:
-            current_time = time.time()
-            total_entries = len(self._cache)
-            expired_count = sum(
-                1 for _, (_, timestamp) in self._cache.items()
-                if current_time - timestamp >= self.ttl_seconds
-            )
-            
-            return {
-                "total_entries": total_entries,
-                "valid_entries": total_entries - expired_count,
-                "expired_entries": expired_count,
-                "max_size": self.max_size,
-                "ttl_seconds": self.ttl_seconds
-            }
+        entries = self._backend.entries()
+        current_time = time.time()
+        total_entries = len(entries)
+        expired_count = sum(
+            1 for timestamp in entries.values()
+            if current_time - timestamp >= self.ttl_seconds
+        )
+        
+        return {
+            "total_entries": total_entries,
+            "valid_entries": total_entries - expired_count,
+            "expired_entries": expired_count,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "backend": self._backend.get_stats()
+        }
 
 
 def generate_cache_key(user_id: int, weather_data: Dict[str, Any]) -> str:
@@ -156,7 +150,11 @@ def generate_cache_key(user_id: int, weather_data: Dict[str, Any]) -> str:
 
 
 # Global instance for shared cache
-_ai_cache_service = AICacheService(ttl_seconds=1, max_size=1000)
+_ai_cache_service = AICacheService(
+    ttl_seconds=1,
+    max_size=1000,
+    backend=create_cache_backend("ai_recommendations", max_size=1000)
+)
 
 
 def get_ai_cache_service() -> AICacheService:
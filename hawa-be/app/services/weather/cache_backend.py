@@ -0,0 +1,736 @@
+"""
+Pluggable cache backends untuk SheetsCacheService dan AICacheService
+- memory: per-process OrderedDict (default, no serialization)
+- disk: shared directory (default /dev/shm) untuk banyak worker di satu host
+- redis: Redis protocol (Redis/Valkey/KeyDB), shared antar host
+
+Shared backends serialize entries dengan pickle protocol 5, jadi cache dir / Redis harus private
+(hanya app ini yang bisa menulis).
+Memory and disk backends can also be bounded by bytes (LRU eviction by size).
+"""
+import hashlib
+import os
+import pickle
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from app.core.config import get_settings
+
+PICKLE_PROTOCOL = 5
+
+# Containers longer than this are measured on an evenly spaced sample and extrapolated
+_SIZE_SAMPLE = 256
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate deep memory footprint of a cached value in bytes
+
+    Objects shared between rows (header strings used as dict keys) are counted once.
+    Long lists are sampled, so a whole sheet is measured in roughly constant time.
+    """
+    seen = set()
+
+    def sizeof(obj: Any) -> int:
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        size = sys.getsizeof(obj)
+        if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+            return size
+        if isinstance(obj, dict):
+            items = list(obj.keys()) + list(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            items = obj if isinstance(obj, (list, tuple)) else list(obj)
+        elif hasattr(obj, "__dict__"):
+            return size + sizeof(vars(obj))
+        else:
+            return size
+
+        count = len(items)
+        if count <= _SIZE_SAMPLE:
+            return size + sum(sizeof(item) for item in items)
+        step = count / _SIZE_SAMPLE
+        sampled = sum(sizeof(items[int(i * step)]) for i in range(_SIZE_SAMPLE))
+        return size + int(sampled * count / _SIZE_SAMPLE)
+
+    return sizeof(value)
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    stored_at: float
+
+
+class CacheBackend(ABC):
+    """
+    Key-value store untuk cache entries (value + waktu disimpan).
+    Freshness (TTL, stale-while-revalidate) diputuskan oleh service pemakai;
+    backend hanya menghapus entry setelah ttl_seconds (retention) lewat.
+    """
+
+    name = "base"
+    shared = False  # True if other processes see the same entries
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Get entry (None jika tidak ada / sudah lewat retention)"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None, stored_at: float | None = None):
+        """Store entry; ttl_seconds = retention sebelum entry boleh dibuang"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove entry"""
+
+    @abstractmethod
+    def clear(self):
+        """Remove all entries of this backend"""
+
+    @abstractmethod
+    def entries(self) -> Dict[str, float]:
+        """Key -> stored_at untuk semua entry yang masih disimpan"""
+
+    @abstractmethod
+    def cleanup_expired(self) -> int:
+        """Remove entries past their retention, returns jumlah yang dihapus"""
+
+    def entry_sizes(self) -> Dict[str, int]:
+        """Key -> approximate bytes per entry (empty jika backend tidak tahu)"""
+        return {}
+
+    def acquire_lock(self, key: str, ttl_seconds: float) -> bool:
+        """Cross-process fetch lock (per-process backends always succeed)"""
+        return True
+
+    def release_lock(self, key: str):
+        """Release lock dari acquire_lock"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "shared": self.shared}
+
+
+class InProcessCacheBackend(CacheBackend):
+    """
+    LRU OrderedDict per process (value disimpan apa adanya, tanpa copy)
+    Bounded by entry count and, optionally, by estimated bytes (estimate_size at insert)
+    """
+
+    name = "memory"
+
+    def __init__(self, max_size: int = 500, max_bytes: int | None = None):
+        self.max_size = max_size
+        self.max_bytes = max_bytes or None
+        # key -> (value, stored_at, expires_at, estimated bytes)
+        self._data: OrderedDict[str, Tuple[Any, float, float | None, int]] = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+        self._lock = threading.RLock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, stored_at, expires_at, _ = item
+            if expires_at is not None and time.time() >= expires_at:
+                self._pop(key)
+                return None
+            # Move to end (LRU)
+            self._data.move_to_end(key)
+            return CacheEntry(value, stored_at)
+
+    def _pop(self, key: str):
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._bytes -= item[3]
+
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None, stored_at: float | None = None):
+        stored_at = time.time() if stored_at is None else stored_at
+        expires_at = stored_at + ttl_seconds if ttl_seconds is not None else None
+        # Measured outside the lock, a whole sheet takes a few milliseconds
+        size = estimate_size(value) if self.max_bytes else 0
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (value, stored_at, expires_at, size)
+            self._bytes += size
+            # Evict least recently used until both bounds hold (the new entry always stays)
+            while len(self._data) > 1 and (
+                len(self._data) > self.max_size
+                or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                oldest = next(iter(self._data))
+                self._pop(oldest)
+                self._evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def entries(self) -> Dict[str, float]:
+        with self._lock:
+            return {key: item[1] for key, item in self._data.items()}
+
+    def entry_sizes(self) -> Dict[str, int]:
+        with self._lock:
+            if self.max_bytes:
+                return {key: item[3] for key, item in self._data.items()}
+            items = [(key, item[0]) for key, item in self._data.items()]
+        # Sizes are only tracked with a byte budget, measure on demand
+        return {key: estimate_size(value) for key, value in items}
+
+    def cleanup_expired(self) -> int:
+        with self._lock:
+            now = time.time()
+            expired = [
+                key for key, item in self._data.items()
+                if item[2] is not None and now >= item[2]
+            ]
+            for key in expired:
+                self._pop(key)
+            return len(expired)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **super().get_stats(),
+                "entries": len(self._data),
+                "max_size": self.max_size,
+                "bytes": self._bytes if self.max_bytes else None,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+            }
+
+
+# Disk entry header: stored_at, expires_at (0 = never), key length
+_DISK_HEADER = struct.Struct("<ddI")
+
+
+def default_cache_dir() -> str:
+    """/dev/shm (RAM-backed) jika ada, selain itu temp directory"""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+    return os.path.join(base, "hawa-cache")
+
+
+class SharedDiskCacheBackend(CacheBackend):
+    """
+    Satu file per key di shared directory (single host, multi worker).
+    - Writes are atomic (temp file + os.replace), readers never see partial entries
+    - Decoded values are memoized per process while the file is unchanged
+    - Fetch locks use O_EXCL lock files with a TTL
+    - Optional byte budget on the serialized files (oldest writes evicted first)
+    """
+
+    name = "disk"
+    shared = True
+
+    def __init__(self, directory: str, namespace: str, max_size: int = 500, max_bytes: int | None = None):
+        self.directory = os.path.join(directory, namespace)
+        self.max_size = max_size
+        self.max_bytes = max_bytes or None
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # path -> (mtime_ns, size, entry, expires_at); skips unpickling unchanged files
+        self._memo: Dict[str, Tuple[int, int, CacheEntry, float]] = {}
+
+    def _path(self, key: str, suffix: str = ".entry") -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:40]
+        return os.path.join(self.directory, digest + suffix)
+
+    def _read_header(self, path: str) -> Optional[Tuple[float, float, str]]:
+        try:
+            with open(path, "rb") as f:
+                header = f.read(_DISK_HEADER.size)
+                if len(header) < _DISK_HEADER.size:
+                    return None
+                stored_at, expires_at, key_length = _DISK_HEADER.unpack(header)
+                key = f.read(key_length).decode("utf-8")
+        except (OSError, UnicodeDecodeError, struct.error):
+            return None
+        return stored_at, expires_at, key
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            memo = self._memo.get(path)
+        if memo and memo[0] == stat.st_mtime_ns and memo[1] == stat.st_size:
+            entry, expires_at = memo[2], memo[3]
+        else:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                stored_at, expires_at, key_length = _DISK_HEADER.unpack_from(data)
+                offset = _DISK_HEADER.size
+                if data[offset:offset + key_length].decode("utf-8") != key:
+                    return None  # hash collision
+                value = pickle.loads(data[offset + key_length:])
+            except (OSError, EOFError, pickle.UnpicklingError, struct.error, UnicodeDecodeError):
+                return None
+            entry = CacheEntry(value, stored_at)
+            with self._lock:
+                if path not in self._memo and len(self._memo) >= self.max_size:
+                    self._memo.pop(next(iter(self._memo)))
+                self._memo[path] = (stat.st_mtime_ns, stat.st_size, entry, expires_at)
+
+        # Expired files are left for cleanup_expired (another worker may be rewriting it)
+        if expires_at and time.time() >= expires_at:
+            return None
+        return entry
+
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None, stored_at: float | None = None):
+        stored_at = time.time() if stored_at is None else stored_at
+        expires_at = stored_at + ttl_seconds if ttl_seconds is not None else 0.0
+        key_bytes = key.encode("utf-8")
+        payload = (
+            _DISK_HEADER.pack(stored_at, expires_at, len(key_bytes))
+            + key_bytes
+            + pickle.dumps(value, protocol=PICKLE_PROTOCOL)
+        )
+
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        self._evict_if_needed()
+
+    def _remove(self, path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._memo.pop(path, None)
+
+    def _entry_paths(self) -> List[os.DirEntry]:
+        try:
+            return [e for e in os.scandir(self.directory) if e.name.endswith(".entry")]
+        except FileNotFoundError:
+            return []
+
+    def _evict_if_needed(self):
+        paths = self._entry_paths()
+        overflow = len(paths) - self.max_size
+        total_bytes = 0
+        if self.max_bytes:
+            total_bytes = sum(self._file_size(entry) for entry in paths)
+        if overflow <= 0 and (not self.max_bytes or total_bytes <= self.max_bytes):
+            return
+        # Oldest writes first (mtime = write time), the newest entry always stays
+        paths.sort(key=lambda e: self._file_mtime(e))
+        for entry in paths[:-1]:
+            if overflow <= 0 and (not self.max_bytes or total_bytes <= self.max_bytes):
+                break
+            total_bytes -= self._file_size(entry)
+            overflow -= 1
+            self._remove(entry.path)
+
+    @staticmethod
+    def _file_size(entry: os.DirEntry) -> int:
+        try:
+            return entry.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _file_mtime(entry: os.DirEntry) -> int:
+        try:
+            return entry.stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def delete(self, key: str):
+        self._remove(self._path(key))
+
+    def clear(self):
+        for entry in self._entry_paths():
+            self._remove(entry.path)
+
+    def entries(self) -> Dict[str, float]:
+        result = {}
+        for entry in self._entry_paths():
+            header = self._read_header(entry.path)
+            if header:
+                stored_at, _, key = header
+                result[key] = stored_at
+        return result
+
+    def entry_sizes(self) -> Dict[str, int]:
+        # Serialized size on disk (the decoded memo per worker is larger)
+        result = {}
+        for entry in self._entry_paths():
+            header = self._read_header(entry.path)
+            if header:
+                result[header[2]] = self._file_size(entry)
+        return result
+
+    def cleanup_expired(self) -> int:
+        now = time.time()
+        removed = 0
+        for entry in self._entry_paths():
+            header = self._read_header(entry.path)
+            if header and header[1] and now >= header[1]:
+                self._remove(entry.path)
+                removed += 1
+        return removed
+
+    def acquire_lock(self, key: str, ttl_seconds: float) -> bool:
+        path = self._path(key, suffix=".lock")
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.stat(path).st_mtime < ttl_seconds:
+                        return False
+                    # Holder died without releasing, take over
+                    os.unlink(path)
+                except FileNotFoundError:
+                    continue
+        return False
+
+    def release_lock(self, key: str):
+        try:
+            os.unlink(self._path(key, suffix=".lock"))
+        except FileNotFoundError:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **super().get_stats(),
+            "directory": self.directory,
+            "entries": len(self._entry_paths()),
+            "max_size": self.max_size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class RedisProtocolError(Exception):
+    """Error reply dari Redis server"""
+
+
+# Degrade (cache miss / skip) instead of failing the request: unreachable server, or an error reply
+# such as NOAUTH, OOM (maxmemory + noeviction), LOADING, READONLY
+_REDIS_ERRORS = (ConnectionError, OSError, RedisProtocolError)
+
+
+class _RespConnection:
+    """Minimal RESP2 connection (cukup untuk GET/SET/DEL/ZSET commands)"""
+
+    def __init__(self, host: str, port: int, db: int, password: str | None, username: str | None, timeout: float):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+        try:
+            if password:
+                self.execute("AUTH", *([username] if username else []), password)
+            if db:
+                self.execute("SELECT", db)
+        except Exception:
+            self.close()
+            raise
+
+    @staticmethod
+    def _encode(args: Tuple[Any, ...]) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, bytes):
+                data = arg
+            elif isinstance(arg, float):
+                data = repr(arg).encode()
+            else:
+                data = str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n" % len(data))
+            parts.append(data)
+            parts.append(b"\r\n")
+        return b"".join(parts)
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b"+":
+            return body.decode()
+        if prefix == b"-":
+            raise RedisProtocolError(body.decode())
+        if prefix == b":":
+            return int(body)
+        if prefix == b"$":
+            length = int(body)
+            if length == -1:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            count = int(body)
+            if count == -1:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise RedisProtocolError(f"Unexpected reply prefix: {line!r}")
+
+    def execute(self, *args: Any) -> Any:
+        self._sock.sendall(self._encode(args))
+        return self._read_reply()
+
+    def close(self):
+        try:
+            self._reader.close()
+            self._sock.close()
+        except OSError:
+            pass
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache di Redis (atau server lain yang bicara Redis protocol).
+    - Entry: SET key pickle(stored_at, value) PX retention
+    - Sorted set <prefix>:index (score = stored_at) untuk stats dan max_size eviction
+    - Fetch lock: SET NX PX
+    - Decoded values are memoized per process while the index score (stored_at) is unchanged,
+      so a hit costs one ZSCORE instead of GET + unpickle of the whole sheet
+    Satu koneksi per thread, reconnect otomatis setelah connection error.
+    Jika server tidak bisa dihubungi atau membalas error, get = cache miss, set/lock/delete di-skip
+    dan stats kosong (request tetap jalan).
+    Memory is bounded by the server (maxmemory + eviction policy), not by this client.
+    Values are unpickled: REDIS_URL must point to a private instance that only this app can write to,
+    anyone able to write keys there can run code in the app.
+    """
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str, namespace: str, max_size: int = 500, timeout: float = 2.0):
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", ""):
+            raise ValueError(f"Unsupported Redis URL scheme: {parsed.scheme} (use redis://)")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.timeout = timeout
+        self.prefix = f"{get_settings().cache_key_prefix}{namespace}:"
+        self.max_size = max_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # key -> (entry, expires_at or 0)
+        self._memo: Dict[str, Tuple[CacheEntry, float]] = {}
+
+    def _connection(self) -> _RespConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _RespConnection(self.host, self.port, self.db, self.password, self.username, self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, *args: Any) -> Any:
+        for attempt in range(2):
+            try:
+                return self._connection().execute(*args)
+            except (ConnectionError, OSError):
+                conn = getattr(self._local, "conn", None)
+                if conn is not None:
+                    conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+    @property
+    def _index_key(self) -> str:
+        return f"{self.prefix}index"
+
+    def _unavailable(self, action: str, error: Exception):
+        print(f"[cache_backend] Redis {action} failed ({self.host}:{self.port}): {error}")
+
+    def _remember(self, key: str, entry: CacheEntry, expires_at: float):
+        with self._lock:
+            if key not in self._memo and len(self._memo) >= self.max_size:
+                self._memo.pop(next(iter(self._memo)))
+            self._memo[key] = (entry, expires_at)
+
+    def _forget(self, key: str | None = None):
+        with self._lock:
+            if key is None:
+                self._memo.clear()
+            else:
+                self._memo.pop(key, None)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        try:
+            score = self._execute("ZSCORE", self._index_key, key)
+            with self._lock:
+                memo = self._memo.get(key)
+            if memo is not None and score is not None and float(score) == memo[0].stored_at:
+                entry, expires_at = memo
+                if not expires_at or time.time() < expires_at:
+                    return entry
+            data = self._execute("GET", self.prefix + key)
+            if data is None:
+                self._forget(key)
+                return None
+            ttl_ms = int(self._execute("PTTL", self.prefix + key))
+        except _REDIS_ERRORS as e:
+            self._unavailable("get", e)
+            return None
+        try:
+            stored_at, value = pickle.loads(data)
+        except (pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        entry = CacheEntry(value, stored_at)
+        self._remember(key, entry, time.time() + ttl_ms / 1000 if ttl_ms > 0 else 0.0)
+        return entry
+
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None, stored_at: float | None = None):
+        stored_at = time.time() if stored_at is None else stored_at
+        payload = pickle.dumps((stored_at, value), protocol=PICKLE_PROTOCOL)
+        try:
+            self._store(key, payload, ttl_seconds, stored_at)
+        except _REDIS_ERRORS as e:
+            self._forget(key)
+            self._unavailable("set", e)
+            return
+        expires_at = time.time() + ttl_seconds if ttl_seconds is not None else 0.0
+        self._remember(key, CacheEntry(value, stored_at), expires_at)
+
+    def _store(self, key: str, payload: bytes, ttl_seconds: float | None, stored_at: float):
+        if ttl_seconds is not None:
+            self._execute("SET", self.prefix + key, payload, "PX", max(int(ttl_seconds * 1000), 1))
+        else:
+            self._execute("SET", self.prefix + key, payload)
+        self._execute("ZADD", self._index_key, stored_at, key)
+
+        overflow = int(self._execute("ZCARD", self._index_key)) - self.max_size
+        if overflow > 0:
+            oldest = self._execute("ZRANGE", self._index_key, 0, overflow - 1) or []
+            for old_key in oldest:
+                old_key = old_key.decode("utf-8")
+                self._execute("DEL", self.prefix + old_key)
+                self._execute("ZREM", self._index_key, old_key)
+
+    def delete(self, key: str):
+        self._forget(key)
+        try:
+            self._execute("DEL", self.prefix + key)
+            self._execute("ZREM", self._index_key, key)
+        except _REDIS_ERRORS as e:
+            self._unavailable("delete", e)
+
+    def clear(self):
+        self._forget()
+        try:
+            for key in self._entries():
+                self._execute("DEL", self.prefix + key)
+            self._execute("DEL", self._index_key)
+        except _REDIS_ERRORS as e:
+            self._unavailable("clear", e)
+
+    def _entries(self) -> Dict[str, float]:
+        reply = self._execute("ZRANGE", self._index_key, 0, -1, "WITHSCORES") or []
+        return {reply[i].decode("utf-8"): float(reply[i + 1]) for i in range(0, len(reply), 2)}
+
+    def entries(self) -> Dict[str, float]:
+        try:
+            return self._entries()
+        except _REDIS_ERRORS as e:
+            self._unavailable("entries", e)
+            return {}
+
+    def entry_sizes(self) -> Dict[str, int]:
+        # Serialized payload length per key
+        try:
+            return {key: int(self._execute("STRLEN", self.prefix + key)) for key in self._entries()}
+        except _REDIS_ERRORS as e:
+            self._unavailable("entry_sizes", e)
+            return {}
+
+    def cleanup_expired(self) -> int:
+        # Redis expires entries itself (PX), only the index needs pruning
+        removed = 0
+        try:
+            for key in self._entries():
+                if not self._execute("EXISTS", self.prefix + key):
+                    self._execute("ZREM", self._index_key, key)
+                    self._forget(key)
+                    removed += 1
+        except _REDIS_ERRORS as e:
+            self._unavailable("cleanup", e)
+        return removed
+
+    def acquire_lock(self, key: str, ttl_seconds: float) -> bool:
+        try:
+            reply = self._execute("SET", f"{self.prefix}lock:{key}", os.getpid(), "NX", "PX", max(int(ttl_seconds * 1000), 1))
+        except _REDIS_ERRORS as e:
+            # Without Redis every worker fetches for itself
+            self._unavailable("lock", e)
+            return True
+        return reply == "OK"
+
+    def release_lock(self, key: str):
+        try:
+            self._execute("DEL", f"{self.prefix}lock:{key}")
+        except _REDIS_ERRORS as e:
+            self._unavailable("unlock", e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {**super().get_stats(), "url": f"redis://{self.host}:{self.port}/{self.db}", "max_size": self.max_size}
+        try:
+            stats["entries"] = int(self._execute("ZCARD", self._index_key))
+        except Exception as e:
+            stats["error"] = str(e)
+        return stats
+
+
+def create_cache_backend(namespace: str, max_size: int = 500, max_bytes: int | None = None) -> CacheBackend:
+    """
+    Create cache backend sesuai CACHE_BACKEND (memory, disk, redis)
+
+    Args:
+        namespace: Nama cache (memisahkan entries antar cache di shared backend)
+        max_size: Maximum entries in cache
+        max_bytes: Byte budget (memory: estimated footprint, disk: file sizes; Redis uses maxmemory)
+    """
+    settings = get_settings()
+    backend = settings.cache_backend.lower()
+
+    if backend == "disk":
+        return SharedDiskCacheBackend(
+            settings.cache_dir or default_cache_dir(),
+            namespace,
+            max_size=max_size,
+            max_bytes=max_bytes
+        )
+    if backend == "redis":
+        return RedisCacheBackend(settings.redis_url, namespace, max_size=max_size)
+    if backend != "memory":
+        print(f"[cache_backend] Unknown CACHE_BACKEND '{settings.cache_backend}', using in-process cache")
+    return InProcessCacheBackend(max_size=max_size, max_bytes=max_bytes)
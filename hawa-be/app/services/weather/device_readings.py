@@ -0,0 +1,245 @@
+"""
+Per-device latest reading dan ring buffer readings terbaru (in-process)
+Di-update incremental setiap kali ReadingsStore menyimpan readings, sehingga endpoint realtime
+membaca O(devices) dari memory tanpa query ke sensor_readings
+"""
+import heapq
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.weather.spreadsheet_service import DEFAULT_TZ
+
+
+def _epoch(timestamp: datetime) -> float:
+    if timestamp.tzinfo is None:
+        # SQLite returns naive datetimes (stored as UTC)
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+class DeviceRingBuffer:
+    """
+    Readings terbaru satu device dalam fixed-capacity arrays (slot tertua ditimpa).
+    Reading yang datang terlambat (backfill) disisipkan urut waktu selama lebih baru dari slot
+    tertua; yang lebih lama diperlakukan seperti reading yang sudah tertimpa (recent() -> database).
+    """
+
+    def __init__(self, capacity: int, fields: Sequence[str]):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity)  # epoch seconds (UTC)
+        self.values = np.full((capacity, len(fields)), np.nan)
+        self.source_rows = np.zeros(capacity, dtype=np.int64)  # 0 = unknown
+        self.locations = np.empty(capacity, dtype=object)
+        self.levels = np.empty(capacity, dtype=object)
+        self.head = 0  # next slot to write
+        self.size = 0
+        self.received_at: Optional[datetime] = None
+
+    @property
+    def newest(self) -> Optional[float]:
+        return float(self.timestamps[(self.head - 1) % self.capacity]) if self.size else None
+
+    def append(self, timestamp: float, values: List[Optional[float]], row: Dict[str, Any]) -> bool:
+        """Tambah reading; False jika duplikat atau lebih lama dari slot tertua buffer yang penuh"""
+        newest = self.newest
+        if newest is not None and timestamp <= newest:
+            return self._insert(timestamp, values, row)
+        slot = self.head
+        self.timestamps[slot] = timestamp
+        self.values[slot] = [np.nan if value is None else value for value in values]
+        self.source_rows[slot] = row.get("source_row") or 0
+        self.locations[slot] = row.get("location")
+        self.levels[slot] = row.get("air_quality_level")
+        self.head = (slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return True
+
+    def _insert(self, timestamp: float, values: List[Optional[float]], row: Dict[str, Any]) -> bool:
+        """Out-of-order reading: rewrite the buffer oldest-first with the reading at its position (O(capacity))"""
+        order = (self.head - self.size + np.arange(self.size)) % self.capacity  # oldest first
+        timestamps = self.timestamps[order]
+        position = int(np.searchsorted(timestamps, timestamp))
+        if position < self.size and timestamps[position] == timestamp:
+            return False  # duplicate
+        if self.size == self.capacity and position == 0:
+            return False  # older than every slot, same as an overwritten reading
+
+        items = (
+            (self.timestamps, timestamp),
+            (self.values, [np.nan if value is None else value for value in values]),
+            (self.source_rows, row.get("source_row") or 0),
+            (self.locations, row.get("location")),
+            (self.levels, row.get("air_quality_level")),
+        )
+        for array, item in items:
+            ordered = array[order]
+            if array.dtype == object:
+                ordered = np.concatenate([ordered[:position], np.array([item], dtype=object), ordered[position:]])
+            else:
+                ordered = np.insert(ordered, position, item, axis=0)
+            ordered = ordered[-self.capacity:]  # full buffer drops its oldest reading
+            array[:len(ordered)] = ordered
+        self.size = min(self.size + 1, self.capacity)
+        self.head = self.size % self.capacity
+        return True
+
+    def slots(self, start: Optional[float] = None, end: Optional[float] = None, limit: Optional[int] = None) -> np.ndarray:
+        """Slot indexes in [start, end), newest first, at most limit"""
+        order = (self.head - 1 - np.arange(self.size)) % self.capacity
+        timestamps = self.timestamps[order]
+        keep = np.ones(len(order), dtype=bool)
+        if start is not None:
+            keep &= timestamps >= start
+        if end is not None:
+            keep &= timestamps < end
+        order = order[keep]
+        return order[:limit] if limit is not None else order
+
+
+class DeviceReadingsIndex:
+    """
+    source -> device_id -> DeviceRingBuffer.
+    - latest(): newest reading per device, O(devices)
+    - recent(): newest N readings of a source across devices, O(devices x N)
+    - Per process; fed by ReadingsStore.bulk_insert (Sheets mirror dan IoT direct ingest)
+    """
+
+    def __init__(self, fields: Sequence[str], capacity: int = 256):
+        """
+        Initialize index
+
+        Args:
+            fields: Numeric reading fields (kolom sensor_readings)
+            capacity: Readings kept per device
+        """
+        self.fields = list(fields)
+        self.capacity = max(1, capacity)
+        self._sources: Dict[str, Dict[str, DeviceRingBuffer]] = {}
+        self._lock = threading.Lock()
+
+    def ingest(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Tambah readings (format kolom sensor_readings: device_id, timestamp, source, fields, ...)
+
+        Returns:
+            Jumlah readings yang masuk ring buffer
+        """
+        prepared = sorted(
+            ((_epoch(row["timestamp"]), row) for row in rows if row.get("timestamp") is not None),
+            key=lambda item: item[0]
+        )
+        if not prepared:
+            return 0
+
+        received_at = datetime.now(timezone.utc)
+        appended = 0
+        with self._lock:
+            for timestamp, row in prepared:
+                devices = self._sources.setdefault(row.get("source") or "", {})
+                device_id = row.get("device_id") or "unknown"
+                buffer = devices.get(device_id)
+                if buffer is None:
+                    buffer = devices[device_id] = DeviceRingBuffer(self.capacity, self.fields)
+                if buffer.append(timestamp, [row.get(field) for field in self.fields], row):
+                    buffer.received_at = received_at
+                    appended += 1
+        return appended
+
+    def _reading(self, device_id: str, buffer: DeviceRingBuffer, slot: int) -> Dict[str, Any]:
+        """Reading dalam format ReadingsStore.to_dict"""
+        data = {
+            field: (None if np.isnan(value) else value)
+            for field, value in zip(self.fields, buffer.values[slot].tolist())
+        }
+        timestamp = datetime.fromtimestamp(float(buffer.timestamps[slot]), tz=timezone.utc)
+        data.update({
+            "location": buffer.locations[slot] or "Bandung",
+            "timestamp": timestamp.astimezone(DEFAULT_TZ).isoformat(),
+            "air_quality_level": buffer.levels[slot],
+            "device_id": device_id,
+            "source_row": int(buffer.source_rows[slot]) or None,
+        })
+        return data
+
+    def newest_timestamp(self, source: str) -> Optional[datetime]:
+        """Timestamp of the newest reading of source in memory (any device), None if there is none"""
+        with self._lock:
+            newest = [buffer.newest for buffer in self._sources.get(source, {}).values() if buffer.size]
+        return datetime.fromtimestamp(max(newest), tz=timezone.utc) if newest else None
+
+    def latest(self, source: str, device_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Newest reading per device (plus "received_at" = waktu reading masuk ke process ini)
+
+        Args:
+            source: Source key (lihat sheets_source)
+            device_id: Satu device saja (optional)
+        """
+        with self._lock:
+            devices = self._sources.get(source, {})
+            if device_id is not None:
+                devices = {device_id: devices[device_id]} if device_id in devices else {}
+            result = {}
+            for key, buffer in devices.items():
+                if not buffer.size:
+                    continue
+                reading = self._reading(key, buffer, (buffer.head - 1) % buffer.capacity)
+                reading["received_at"] = buffer.received_at.isoformat() if buffer.received_at else None
+                result[key] = reading
+            return result
+
+    def recent(
+        self,
+        source: str,
+        limit: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        N readings terbaru dari semua device di source dalam [start, end), urut dari yang paling lama
+        (sama dengan ReadingsStore.latest)
+
+        Returns:
+            None jika source belum ada di memory, atau readings yang sudah tertimpa di ring buffer
+            bisa termasuk hasil (caller query database)
+        """
+        start_ts = _epoch(start) if start is not None else None
+        end_ts = _epoch(end) if end is not None else None
+        with self._lock:
+            devices = self._sources.get(source)
+            if not devices:
+                return None
+            candidates: List[Tuple[float, str, int]] = []
+            for device_id, buffer in devices.items():
+                slots = buffer.slots(start_ts, end_ts, limit)
+                candidates.extend(zip(buffer.timestamps[slots].tolist(), [device_id] * len(slots), slots.tolist()))
+            newest = heapq.nlargest(limit, candidates, key=lambda item: item[0])
+
+            # Overwritten readings are older than the oldest slot of a full buffer
+            cutoff = newest[-1][0] if len(newest) == limit else None
+            for buffer in devices.values():
+                if buffer.size < buffer.capacity:
+                    continue
+                oldest = float(buffer.timestamps[buffer.head])
+                if (start_ts is None or oldest > start_ts) and (cutoff is None or oldest > cutoff):
+                    return None
+
+            newest.reverse()
+            return [self._reading(device_id, devices[device_id], slot) for _, device_id, slot in newest]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Jumlah device dan readings per source"""
+        with self._lock:
+            return {
+                "capacity_per_device": self.capacity,
+                "sources": {
+                    source: {
+                        "devices": len(devices),
+                        "readings": sum(buffer.size for buffer in devices.values())
+                    }
+                    for source, devices in self._sources.items()
+                }
+            }
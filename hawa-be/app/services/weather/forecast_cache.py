@@ -0,0 +1,193 @@
+"""
+Forecast Cache Service
+Cache response Open-Meteo (raw JSON) per (endpoint, lat, lon, variables, horizon).
+Upstream data hanya berubah per model run / per jam, jadi entry expire di batas periode
+berikutnya dan concurrent misses untuk key yang sama berbagi satu upstream request
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+from app.core.config import get_settings
+from app.services.weather.cache_backend import CacheBackend, create_cache_backend
+
+
+class _Flight:
+    """Result holder for a sync upstream fetch that other threads can wait on"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._result: Optional[Dict[str, Any]] = None
+        self._error: Optional[Exception] = None
+
+    def set_result(self, result: Dict[str, Any]):
+        self._result = result
+        self._event.set()
+
+    def set_error(self, error: Exception):
+        self._error = error
+        self._event.set()
+
+    def wait(self, timeout: float) -> Dict[str, Any]:
+        if not self._event.wait(timeout):
+            raise TimeoutError(f"Timed out after {timeout}s waiting for in-flight Open-Meteo fetch")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class ForecastCacheService:
+    """
+    TTL cache for Open-Meteo responses.
+    Features:
+    - Expiry aligned to upstream cadence (next period boundary + grace), not N seconds after the fetch
+    - Single-flight per process: one upstream request per key, async handlers and threads alike
+    - Only successful responses are cached
+    - Pluggable backend (CACHE_BACKEND; disk/Redis share entries across workers). Their file/socket I/O
+      runs in a worker thread on the async path (run_io), the in-process backend is used inline
+    """
+
+    def __init__(self, backend: CacheBackend | None = None, grace_seconds: float = 60, wait_timeout: float = 30):
+        """
+        Initialize forecast cache
+
+        Args:
+            backend: Storage backend (default: in-process LRU, 1000 entries)
+            grace_seconds: Delay after a period boundary before refetching (upstream publish lag)
+            wait_timeout: Max seconds a coalesced caller waits for the in-flight fetch
+        """
+        self._backend = backend or create_cache_backend("openmeteo", max_size=1000)
+        self.grace_seconds = grace_seconds
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    @staticmethod
+    def make_key(url: str, params: Dict[str, Any]) -> str:
+        """Cache key: endpoint + sorted params (coordinates rounded to ~10 m)"""
+        normalized = {
+            name: round(value, 4) if name in ("latitude", "longitude") and isinstance(value, float) else value
+            for name, value in params.items()
+        }
+        return f"{url}?{urlencode(sorted(normalized.items()))}"
+
+    def ttl_for(self, period_seconds: float) -> float:
+        """Seconds until the next period boundary (epoch aligned) plus grace"""
+        return period_seconds - (time.time() % period_seconds) + self.grace_seconds
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached response for key, or None"""
+        entry = self._backend.get(key)
+        if entry is None:
+            return None
+        with self._lock:
+            self._stats["hits"] += 1
+        return entry.value
+
+    def put(self, key: str, data: Dict[str, Any], period_seconds: float):
+        """Store a response fetched elsewhere (batch requests), expiring at the next period boundary"""
+        self._backend.set(key, data, ttl_seconds=self.ttl_for(period_seconds))
+
+    async def run_io(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Call func (which reads/writes the backend) without blocking the event loop on shared backends"""
+        if not self._backend.shared:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    def get(self, key: str, period_seconds: float, fetch: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Cached response for key, fetch() on miss (sync, coalesced across threads)
+
+        Raises:
+            Exception from fetch() (errors are not cached)
+        """
+        cached = self.lookup(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._flights[key] = _Flight()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        if not is_leader:
+            return flight.wait(self.wait_timeout)
+
+        try:
+            data = fetch()
+            self.put(key, data, period_seconds)
+            flight.set_result(data)
+            return data
+        except Exception as e:
+            flight.set_error(e)
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    async def get_async(
+        self,
+        key: str,
+        period_seconds: float,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Cached response for key, await fetch() on miss (coalesced across concurrent requests).
+        The fetch runs as its own task, so a disconnecting caller does not cancel it for the others.
+        """
+        cached = await self.run_io(self.lookup, key)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None or task.done() or task.get_loop() is not loop:
+                task = self._tasks[key] = loop.create_task(self._load(key, period_seconds, fetch))
+                # Callers may stop waiting (timeout); mark the error retrieved so it is not logged as lost
+                task.add_done_callback(lambda done: done.cancelled() or done.exception())
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        return await asyncio.wait_for(asyncio.shield(task), self.wait_timeout)
+
+    async def _load(
+        self,
+        key: str,
+        period_seconds: float,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        try:
+            data = await fetch()
+            await self.run_io(self.put, key, data, period_seconds)
+            return data
+        finally:
+            with self._lock:
+                if self._tasks.get(key) is asyncio.current_task():
+                    del self._tasks[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                **self._stats,
+                "in_flight": len(self._flights) + len(self._tasks),
+                "backend": self._backend.get_stats()
+            }
+
+
+# Global instance
+_forecast_cache = ForecastCacheService(grace_seconds=get_settings().openmeteo_cache_grace_seconds)
+
+
+def get_forecast_cache() -> ForecastCacheService:
+    """Get global forecast cache instance"""
+    return _forecast_cache
@@ -0,0 +1,200 @@
+"""
+Offline gazetteer Jawa Barat
+Resolve nama kota/kabupaten/kecamatan (User.location, query ?city=) ke koordinat tanpa
+network geocoding. Data dari data/gazetteer_jawa_barat.tsv, di-index sekali per process.
+"""
+import bisect
+import re
+import threading
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+DATA_FILE = Path(__file__).resolve().parent / "data" / "gazetteer_jawa_barat.tsv"
+
+# Administrative prefixes: stripped from the name, used as a kind hint ("Kab. Bandung" -> kabupaten)
+_KIND_PREFIXES = {
+    "kota": "kota",
+    "kodya": "kota",
+    "kotamadya": "kota",
+    "kabupaten": "kabupaten",
+    "kab": "kabupaten",
+    "kecamatan": "kecamatan",
+    "kec": "kecamatan",
+}
+# Same name for several areas (Kota vs Kabupaten Bogor): lower rank wins without a prefix
+_KIND_RANK = {"kota": 0, "kabupaten": 1, "kecamatan": 2}
+
+MIN_PREFIX_LENGTH = 3
+FUZZY_CUTOFF = 0.8
+
+
+class Place(NamedTuple):
+    name: str
+    kind: str  # kota | kabupaten | kecamatan
+    province: str
+    lat: float
+    lon: float
+
+
+def _location_tokens(name: str) -> Tuple[List[str], Optional[str]]:
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    tokens = re.findall(r"[a-z0-9]+", text.split(",")[0])
+    kind = None
+    if len(tokens) > 1 and tokens[0] in _KIND_PREFIXES:
+        kind = _KIND_PREFIXES[tokens.pop(0)]
+    return tokens, kind
+
+
+def normalize_location(name: str) -> Tuple[str, Optional[str]]:
+    """
+    Normalize a location name to its index key
+
+    Returns:
+        (key, kind hint): "Kab. Bandung Barat, Jawa Barat" -> ("bandungbarat", "kabupaten")
+    """
+    tokens, kind = _location_tokens(name)
+    # Spaces dropped: "Buah Batu" == "Buahbatu"
+    return "".join(tokens), kind
+
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Gazetteer:
+    """
+    Name -> Place index:
+    - exact: normalized name/alias -> places (kota before kabupaten before kecamatan)
+    - prefix: sorted keys + bisect ("Tasikmal" -> Tasikmalaya), only when unambiguous
+    - fuzzy: trigram candidates + SequenceMatcher for typos ("Sumedng" -> Sumedang), never for
+      a prefix or an extension of a known name ("Cibeunying", "Bandungan" stay unknown)
+    Results are memoized per raw name, so repeated lookups cost one dict hit.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[Place, List[str]]]):
+        """
+        Build indexes
+
+        Args:
+            entries: (place, aliases) pairs
+        """
+        self._exact: Dict[str, List[Place]] = {}
+        for place, aliases in entries:
+            for alias in [place.name, *aliases]:
+                key, _ = normalize_location(alias)
+                if key:
+                    self._exact.setdefault(key, []).append(place)
+        for places in self._exact.values():
+            places.sort(key=lambda place: _KIND_RANK.get(place.kind, len(_KIND_RANK)))
+
+        self._keys = sorted(self._exact)
+        self._trigram_index: Dict[str, List[str]] = {}
+        for key in self._keys:
+            for trigram in _trigrams(key):
+                self._trigram_index.setdefault(trigram, []).append(key)
+
+        self.resolve = lru_cache(maxsize=4096)(self._resolve)
+
+    @classmethod
+    def load(cls, path: Path = DATA_FILE) -> "Gazetteer":
+        """Load TSV (name, kind, province, lat, lon, aliases); lines starting with # are comments"""
+        entries = []
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                fields = line.rstrip("\n").split("\t")
+                name, kind, province, lat, lon = fields[:5]
+                aliases = fields[5].split("|") if len(fields) > 5 and fields[5] else []
+                entries.append((Place(name, kind, province, float(lat), float(lon)), aliases))
+        return cls(entries)
+
+    def __len__(self) -> int:
+        return len({place for places in self._exact.values() for place in places})
+
+    def _prefix_match(self, key: str) -> Optional[List[Place]]:
+        """Places whose key starts with key; [] if ambiguous, None if no key starts with it"""
+        start = bisect.bisect_left(self._keys, key)
+        matches: Optional[List[Place]] = None
+        for candidate in self._keys[start:]:
+            if not candidate.startswith(key):
+                break
+            places = self._exact[candidate]
+            if len(key) < MIN_PREFIX_LENGTH or (matches is not None and matches != places):
+                return []  # "Cibeunying" -> Kaler atau Kidul
+            matches = places
+        return matches
+
+    def _extends_key(self, key: str) -> bool:
+        """Whether a known key is a strict prefix of key ("bandungan" -> "bandung")"""
+        return any(key[:length] in self._exact for length in range(MIN_PREFIX_LENGTH, len(key)))
+
+    def _fuzzy_match(self, key: str) -> Optional[List[Place]]:
+        shared = Counter(
+            candidate
+            for trigram in _trigrams(key)
+            for candidate in self._trigram_index.get(trigram, ())
+        )
+        best_key, best_ratio = None, FUZZY_CUTOFF
+        for candidate, _ in shared.most_common(8):
+            ratio = SequenceMatcher(None, key, candidate).ratio()
+            if ratio >= best_ratio:
+                best_key, best_ratio = candidate, ratio
+        return self._exact[best_key] if best_key else None
+
+    def _resolve(self, name: str) -> Optional[Place]:
+        """
+        Resolve a location name (case/spacing/prefix insensitive)
+
+        Returns:
+            Place, or None if nothing matches
+        """
+        key, kind = normalize_location(name or "")
+        if not key:
+            return None
+        places = self._exact.get(key)
+        if places is None:
+            places = self._prefix_match(key)
+        if places is None and not self._extends_key(key):
+            places = self._fuzzy_match(key)
+        if not places:
+            print(f"[gazetteer] Unknown location '{name}'")
+            return None
+        if kind is not None:
+            for place in places:
+                if place.kind == kind:
+                    return place
+        return places[0]
+
+    def resolve_leading_token(self, name: str) -> Optional[Place]:
+        """
+        Resolve only the first word of a multi-word name ("Cimahi Selatan" -> Cimahi),
+        for names that are more specific than the gazetteer
+
+        Returns:
+            Place, or None if the name has one word or the first word is unknown
+        """
+        tokens, kind = _location_tokens(name or "")
+        if len(tokens) < 2:
+            return None
+        return self.resolve(f"{kind} {tokens[0]}" if kind else tokens[0])
+
+
+# Global instance (loaded on first use or at app startup)
+_gazetteer: Optional[Gazetteer] = None
+_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Get global gazetteer instance"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.load()
+    return _gazetteer
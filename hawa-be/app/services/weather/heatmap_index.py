@@ -0,0 +1,191 @@
+"""
+Spatial index dan viewport query untuk heatmap points
+Grid buckets dibangun sekali per snapshot; query bbox hanya memeriksa cell yang overlap,
+dan pada zoom rendah points di-cluster di server (count, mean PM2.5, max risk)
+"""
+import hashlib
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_CELL_DEGREES = 0.05  # index bucket size (~5.5 km)
+CLUSTER_RADIUS_PX = 60  # points closer than this on screen are merged
+MAX_CLUSTER_ZOOM = 13  # from this zoom up every point is returned as is
+WORLD_BBOX = (-180.0, -90.0, 180.0, 90.0)
+
+BBox = Tuple[float, float, float, float]  # min_lng, min_lat, max_lng, max_lat
+
+
+def parse_bbox(bbox: str) -> BBox:
+    """
+    Parse "minLng,minLat,maxLng,maxLat"
+
+    Raises:
+        ValueError: Format salah atau min > max
+    """
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in bbox.split(","))
+    except ValueError:
+        raise ValueError("bbox must be 'minLng,minLat,maxLng,maxLat'") from None
+    if not all(math.isfinite(value) for value in (min_lng, min_lat, max_lng, max_lat)):
+        raise ValueError("bbox values must be finite numbers")
+    if min_lng > max_lng or min_lat > max_lat:
+        raise ValueError("bbox min values must not exceed max values")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def risk_level_of(risk_score: float) -> str:
+    """Risk level dengan threshold yang sama seperti HeatmapProcessor"""
+    if risk_score >= 0.7:
+        return "high"
+    if risk_score >= 0.4:
+        return "moderate"
+    return "low"
+
+
+class HeatmapSpatialIndex:
+    """
+    Uniform grid index over processed heatmap points (read-only, one per snapshot).
+    - Points are sorted by grid cell; each occupied cell maps to a slice of that order
+    - Viewport query visits only cells overlapping the bbox, then filters exactly
+    - Clustering snaps visible points to a zoom-dependent grid (screen-space radius)
+    """
+
+    def __init__(self, points: List[Dict[str, Any]], cell_degrees: float = DEFAULT_CELL_DEGREES):
+        """
+        Build index
+
+        Args:
+            points: Processed points (HeatmapProcessor format: lat, lng, pm2_5, risk_score, ...)
+            cell_degrees: Grid cell size in degrees
+        """
+        self.points = points
+        self.cell_degrees = cell_degrees
+        self.lat = np.array([point["lat"] for point in points], dtype=float)
+        self.lng = np.array([point["lng"] for point in points], dtype=float)
+        self.pm25 = np.array(
+            [point["pm2_5"] if point.get("pm2_5") is not None else np.nan for point in points],
+            dtype=float
+        )
+        self.risk = np.array([point.get("risk_score") or 0.0 for point in points], dtype=float)
+        # Changes only when a location or PM2.5 value changes (keys derived surfaces like tiles)
+        self.fingerprint = hashlib.blake2b(
+            self.lat.tobytes() + self.lng.tobytes() + self.pm25.tobytes(),
+            digest_size=8
+        ).hexdigest()
+
+        rows = np.floor(self.lat / cell_degrees).astype(np.int64)
+        cols = np.floor(self.lng / cell_degrees).astype(np.int64)
+        self._order = np.lexsort((cols, rows))
+        self._cells: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        if len(points):
+            cells, starts, counts = np.unique(
+                np.stack([rows[self._order], cols[self._order]], axis=1),
+                axis=0,
+                return_index=True,
+                return_counts=True
+            )
+            for (row, col), start, count in zip(cells.tolist(), starts.tolist(), counts.tolist()):
+                self._cells[(row, col)] = (start, start + count)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def query_indices(self, bbox: BBox) -> np.ndarray:
+        """Indexes (input order) of points inside bbox"""
+        if not self._cells:
+            return np.array([], dtype=np.int64)
+        min_lng, min_lat, max_lng, max_lat = bbox
+        row_min, row_max = math.floor(min_lat / self.cell_degrees), math.floor(max_lat / self.cell_degrees)
+        col_min, col_max = math.floor(min_lng / self.cell_degrees), math.floor(max_lng / self.cell_degrees)
+
+        if (row_max - row_min + 1) * (col_max - col_min + 1) > len(self._cells):
+            # Big viewport: cheaper to scan the occupied cells
+            spans = [
+                span for (row, col), span in self._cells.items()
+                if row_min <= row <= row_max and col_min <= col <= col_max
+            ]
+        else:
+            spans = [
+                self._cells[(row, col)]
+                for row in range(row_min, row_max + 1)
+                for col in range(col_min, col_max + 1)
+                if (row, col) in self._cells
+            ]
+        if not spans:
+            return np.array([], dtype=np.int64)
+
+        candidates = np.concatenate([self._order[start:stop] for start, stop in spans])
+        inside = (
+            (self.lat[candidates] >= min_lat) & (self.lat[candidates] <= max_lat)
+            & (self.lng[candidates] >= min_lng) & (self.lng[candidates] <= max_lng)
+        )
+        return np.sort(candidates[inside])
+
+    def query(self, bbox: Optional[BBox] = None, zoom: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Points in view, clustered below MAX_CLUSTER_ZOOM
+
+        Args:
+            bbox: Viewport (default: whole world)
+            zoom: Web map zoom level (None = no clustering)
+
+        Returns:
+            {"points": [...], "clusters": [...], "visible_points": n, "clustered": bool}
+        """
+        indices = self.query_indices(bbox or WORLD_BBOX)
+        if zoom is None or zoom >= MAX_CLUSTER_ZOOM or len(indices) < 2:
+            return {
+                "points": [self.points[i] for i in indices.tolist()],
+                "clusters": [],
+                "visible_points": len(indices),
+                "clustered": False
+            }
+
+        # Cluster cell = CLUSTER_RADIUS_PX at this zoom (256 px tiles, 360 degrees at zoom 0)
+        size = CLUSTER_RADIUS_PX * 360.0 / (256 * 2 ** zoom)
+        lat, lng = self.lat[indices], self.lng[indices]
+        grid = np.stack([np.floor(lng / size), np.floor(lat / size)], axis=1).astype(np.int64)
+        keys, inverse, counts = np.unique(grid, axis=0, return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+        groups = len(keys)
+
+        lat_mean = np.bincount(inverse, weights=lat, minlength=groups) / counts
+        lng_mean = np.bincount(inverse, weights=lng, minlength=groups) / counts
+        pm25 = self.pm25[indices]
+        has_pm25 = ~np.isnan(pm25)
+        pm25_count = np.bincount(inverse, weights=has_pm25, minlength=groups)
+        pm25_sum = np.bincount(inverse, weights=np.where(has_pm25, pm25, 0.0), minlength=groups)
+        max_risk = np.full(groups, -np.inf)
+        np.maximum.at(max_risk, inverse, self.risk[indices])
+        bounds = {
+            name: np.full(groups, start) for name, start in
+            (("min_lng", np.inf), ("min_lat", np.inf), ("max_lng", -np.inf), ("max_lat", -np.inf))
+        }
+        np.minimum.at(bounds["min_lng"], inverse, lng)
+        np.minimum.at(bounds["min_lat"], inverse, lat)
+        np.maximum.at(bounds["max_lng"], inverse, lng)
+        np.maximum.at(bounds["max_lat"], inverse, lat)
+
+        points = [self.points[i] for i, group in zip(indices.tolist(), inverse.tolist()) if counts[group] == 1]
+        clusters = []
+        for group in np.flatnonzero(counts > 1).tolist():
+            gx, gy = keys[group].tolist()
+            risk = float(max_risk[group])
+            clusters.append({
+                "id": f"cluster-{zoom}-{gx}-{gy}",
+                "lat": float(lat_mean[group]),
+                "lng": float(lng_mean[group]),
+                "count": int(counts[group]),
+                "mean_pm2_5": float(pm25_sum[group] / pm25_count[group]) if pm25_count[group] else None,
+                "max_risk_score": risk,
+                "risk_level": risk_level_of(risk),
+                "bounds": [
+                    float(bounds["min_lng"][group]),
+                    float(bounds["min_lat"][group]),
+                    float(bounds["max_lng"][group]),
+                    float(bounds["max_lat"][group])
+                ]
+            })
+        return {"points": points, "clusters": clusters, "visible_points": len(indices), "clustered": True}
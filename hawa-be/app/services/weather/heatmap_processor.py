@@ -2,7 +2,149 @@
 Shared service untuk process heatmap data dari Google Sheets
 Mengurangi duplikasi processing logic di admin.py dan weather.py
 """
-from typing import Dict, List, Any, Optional
+import hashlib
+import json
+import threading
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import get_settings
+from app.services.weather.heatmap_index import BBox, HeatmapSpatialIndex
+from app.services.weather.sheet_table import SheetTable
+from app.services.weather.spreadsheet_service import _strings_to_float
+
+# Column variants per heatmap field (case-insensitive, first variant that matches wins)
+_HEATMAP_COLUMNS: Dict[str, List[str]] = {
+    "lat": ['Latitude', 'latitude', 'lat'],
+    "lng": ['Longitude', 'longitude', 'lng', 'lon'],
+    "pm25": ['PM2.5', 'pm2.5', 'PM25', 'pm25', 'PM 2.5'],
+    "pm10": ['PM10', 'pm10', 'PM 10'],
+    "location": ['Location', 'location', 'Lokasi', 'lokasi'],
+    "air_quality": ['Air Quality', 'air_quality', 'Air Quality Level', 'air_quality_level'],
+    "risk_score": ['Risk Score', 'risk_score', 'Risk', 'risk'],
+    "color": ['Color', 'color', 'Colour', 'colour'],
+    "device_id": ['Device ID', 'device_id', 'Device', 'device'],
+}
+
+
+# Snapshot object (cached SheetTable) -> processed points; dropped when the cache drops the snapshot.
+# Copies of the same snapshot (unpickled from disk/redis backends) hit the fingerprint LRU instead
+PROCESSED_SNAPSHOT_MEMO = 8
+_processed: "weakref.WeakKeyDictionary[Any, _ProcessedHeatmap]" = weakref.WeakKeyDictionary()
+_processed_by_fingerprint: "OrderedDict[str, _ProcessedHeatmap]" = OrderedDict()
+_processed_lock = threading.Lock()
+
+# (spreadsheet_id, worksheet_name) -> recent versions (oldest first): version -> {point id: digest}
+# Per process; a `since` older than this window (or from another worker) gets a full response
+HEATMAP_VERSION_HISTORY = 32
+_versions: Dict[Tuple[str, str], "OrderedDict[str, Dict[Any, str]]"] = {}
+_versions_lock = threading.Lock()
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _numeric_cells(series: Optional[pd.Series], size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse satu kolom numeric (vectorized untuk kolom string dari Google Sheets)
+
+    Returns:
+        (number, present): float64 array (NaN jika kosong / bukan angka) dan mask cell terisi
+    """
+    if series is None:
+        return np.full(size, np.nan), np.zeros(size, dtype=bool)
+
+    if pd.api.types.infer_dtype(series, skipna=False) == "string":
+        stripped = np.strings.strip(series.to_numpy(dtype=str))
+        present = stripped != ""
+        return _strings_to_float(np.where(present, stripped, "nan")), present
+
+    # Mixed cells (e.g. records from Excel/CSV): per-cell rules
+    number = np.full(size, np.nan)
+    present = np.zeros(size, dtype=bool)
+    for i, value in enumerate(series.tolist()):
+        if isinstance(value, str):
+            if not value.strip():
+                continue
+            present[i] = True
+            try:
+                number[i] = float(value)
+            except ValueError:
+                pass
+        elif not _is_missing(value):
+            present[i] = True
+            if isinstance(value, (int, float)):
+                number[i] = float(value)
+    return number, present
+
+
+def _text_cell(value: Any) -> Optional[str]:
+    """Cell teks ke string output (string angka jadi float dulu), None jika kosong/falsy"""
+    if isinstance(value, str):
+        if not value.strip():
+            return None
+        try:
+            value = float(value)
+        except ValueError:
+            return value
+    elif _is_missing(value):
+        return None
+    return str(value) if value else None
+
+
+def _point_digest(point: Dict[str, Any]) -> str:
+    return hashlib.blake2b(
+        json.dumps(point, sort_keys=True, default=str).encode("utf-8"),
+        digest_size=8
+    ).hexdigest()
+
+
+def _latest_per_device(points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Satu point per device_id (baris terakhir = reading terbaru), urutan sheet dipertahankan"""
+    latest: Dict[Any, Dict[str, Any]] = {}
+    for point in points:
+        latest[point["device_id"] or ("row", point["id"])] = point
+    if len(latest) == len(points):
+        return points
+    return sorted(latest.values(), key=lambda point: point["id"])
+
+
+def _text_cells(series: Optional[pd.Series], size: int) -> List[Optional[str]]:
+    """Parse satu kolom teks, per unique value (location/color/device cuma sedikit variasi)"""
+    if series is None:
+        return [None] * size
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    mapped = [_text_cell(value) for value in uniques]
+    return [mapped[code] if code >= 0 else None for code in codes.tolist()]
+
+
+class _ProcessedHeatmap:
+    """Points, center dan version dari satu snapshot (read-only, dipakai bersama antar requests)"""
+
+    def __init__(self, points: List[Dict[str, Any]]):
+        self.points = points
+        self.center = HeatmapProcessor._calculate_center(points)
+        self.digests = {point["id"]: _point_digest(point) for point in points}
+        self.version = hashlib.blake2b(
+            "\n".join(f"{point_id}:{digest}" for point_id, digest in self.digests.items()).encode("utf-8"),
+            digest_size=8
+        ).hexdigest()
+        self._index: Optional[HeatmapSpatialIndex] = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def index(self) -> HeatmapSpatialIndex:
+        """Spatial index, built on first viewport/tile request"""
+        with self._index_lock:
+            if self._index is None:
+                self._index = HeatmapSpatialIndex(self.points)
+            return self._index
 
 
 class HeatmapProcessor:
@@ -23,120 +165,242 @@ class HeatmapProcessor:
             worksheet_name: Worksheet name
         
         Returns:
-            Dictionary dengan format heatmap data
+            Dictionary dengan format heatmap data ("points" memoized per snapshot, read-only)
         """
-        if not raw_data:
-            return {
-                "success": True,
-                "spreadsheet_id": spreadsheet_id,
-                "worksheet_name": worksheet_name,
-                "points": [],
-                "total_points": 0,
-                "center": None
-            }
-        
-        heatmap_points = []
-        
-        for idx, record in enumerate(raw_data, start=1):
-            try:
-                point = HeatmapProcessor._extract_point(record, idx)
-                if point:
-                    heatmap_points.append(point)
-            except Exception:
-                continue
-        
-        center = HeatmapProcessor._calculate_center(heatmap_points)
+        processed = HeatmapProcessor._process(raw_data)
+        HeatmapProcessor._remember_version(processed, spreadsheet_id, worksheet_name)
         
         return {
             "success": True,
             "spreadsheet_id": spreadsheet_id,
             "worksheet_name": worksheet_name,
-            "points": heatmap_points,
-            "total_points": len(heatmap_points),
-            "center": center
+            "points": processed.points,
+            "total_points": len(processed.points),
+            "center": processed.center,
+            "version": processed.version
         }
-    
+
     @staticmethod
-    def _extract_point(record: Dict[str, Any], idx: int) -> Optional[Dict[str, Any]]:
-        """Extract single point dari record"""
-        def get_field_value(field_variants: List[str], default: Any = None) -> Any:
-            for variant in field_variants:
-                for key in record.keys():
-                    if str(key).lower() == variant.lower():
-                        value = record[key]
-                        if isinstance(value, str):
-                            try:
-                                return float(value) if value.strip() else default
-                            except ValueError:
-                                return value if value else default
-                        return value if value is not None else default
-            return default
-        
-        latitude = get_field_value(['Latitude', 'latitude', 'lat'])
-        longitude = get_field_value(['Longitude', 'longitude', 'lng', 'lon'])
-        
-        if latitude is None or longitude is None:
-            return None
+    def _process(raw_data: Sequence[Dict[str, Any]]) -> _ProcessedHeatmap:
+        """
+        Processed points untuk snapshot (latest per device, lihat HEATMAP_LATEST_PER_DEVICE),
+        memoized per object lalu per SheetTable fingerprint.
+        Plain lists (tidak bisa di-weakref / di-fingerprint) diproses setiap call.
+        """
+        table = raw_data if isinstance(raw_data, SheetTable) else None
+        if table is not None:
+            with _processed_lock:
+                processed = _processed.get(table)
+            if processed is not None:
+                return processed
+            fingerprint = table.fingerprint()
+            with _processed_lock:
+                processed = _processed_by_fingerprint.get(fingerprint)
+                if processed is not None:
+                    _processed_by_fingerprint.move_to_end(fingerprint)
+                    _processed[table] = processed
+                    return processed
+
+        points = HeatmapProcessor._extract_points(raw_data) if raw_data else []
+        if get_settings().heatmap_latest_per_device:
+            points = _latest_per_device(points)
+        processed = _ProcessedHeatmap(points)
+        if table is not None:
+            with _processed_lock:
+                processed = _processed_by_fingerprint.setdefault(fingerprint, processed)
+                _processed_by_fingerprint.move_to_end(fingerprint)
+                while len(_processed_by_fingerprint) > PROCESSED_SNAPSHOT_MEMO:
+                    _processed_by_fingerprint.popitem(last=False)
+                _processed[table] = processed
+        return processed
+
+    @staticmethod
+    def _remember_version(processed: _ProcessedHeatmap, spreadsheet_id: str, worksheet_name: str):
+        """Simpan {point id: digest} version ini di history per sheet (untuk `since` deltas)"""
+        with _versions_lock:
+            history = _versions.setdefault((spreadsheet_id, worksheet_name), OrderedDict())
+            history[processed.version] = processed.digests
+            history.move_to_end(processed.version)
+            while len(history) > HEATMAP_VERSION_HISTORY:
+                history.popitem(last=False)
+
+    @staticmethod
+    def process_heatmap_delta(
+        raw_data: Sequence[Dict[str, Any]],
+        spreadsheet_id: str,
+        worksheet_name: str,
+        since: str
+    ) -> Dict[str, Any]:
+        """
+        Perubahan heatmap points sejak version `since` (points di-key dengan "id")
         
-        try:
-            lat = float(latitude) if not isinstance(latitude, float) else latitude
-            lng = float(longitude) if not isinstance(longitude, float) else longitude
-        except (ValueError, TypeError):
-            return None
+        Args:
+            raw_data: Raw data dari Google Sheets
+            spreadsheet_id: Spreadsheet ID
+            worksheet_name: Worksheet name
+            since: Version dari response sebelumnya
         
-        pm25 = get_field_value(['PM2.5', 'pm2.5', 'PM25', 'pm25', 'PM 2.5'])
-        pm10 = get_field_value(['PM10', 'pm10', 'PM 10'])
-        location = get_field_value(
-            ['Location', 'location', 'Lokasi', 'lokasi'],
-            f"Location {idx}"
-        )
-        air_quality = get_field_value(
-            ['Air Quality', 'air_quality', 'Air Quality Level', 'air_quality_level'],
-            "UNKNOWN"
-        )
-        risk_score = get_field_value(['Risk Score', 'risk_score', 'Risk', 'risk'], 0.0)
-        color = get_field_value(['Color', 'color', 'Colour', 'colour'], "GRAY")
-        device_id = get_field_value(['Device ID', 'device_id', 'Device', 'device'], None)
+        Returns:
+            {"delta": True, "since", "version", "added", "changed", "removed", ...};
+            version `since` tidak dikenal -> full response dengan "delta": False
+        """
+        with _versions_lock:
+            previous = _versions.get((spreadsheet_id, worksheet_name), {}).get(since)
+        if previous is None:
+            response = HeatmapProcessor.process_heatmap_points(raw_data, spreadsheet_id, worksheet_name)
+            response["delta"] = False
+            return response
+
+        processed = HeatmapProcessor._process(raw_data)
+        HeatmapProcessor._remember_version(processed, spreadsheet_id, worksheet_name)
+        current = processed.digests
+        added, changed = [], []
+        if processed.version != since:
+            for point in processed.points:
+                old_digest = previous.get(point["id"])
+                if old_digest is None:
+                    added.append(point)
+                elif old_digest != current[point["id"]]:
+                    changed.append(point)
+        return {
+            "success": True,
+            "spreadsheet_id": spreadsheet_id,
+            "worksheet_name": worksheet_name,
+            "total_points": len(processed.points),
+            "center": processed.center,
+            "version": processed.version,
+            "delta": True,
+            "since": since,
+            "added": added,
+            "changed": changed,
+            "removed": [point_id for point_id in previous if point_id not in current]
+        }
+
+    @staticmethod
+    def get_spatial_index(raw_data: Sequence[Dict[str, Any]]) -> HeatmapSpatialIndex:
+        """Spatial index untuk snapshot, dibangun sekali per processed snapshot"""
+        return HeatmapProcessor._process(raw_data).index
+
+    @staticmethod
+    def query_viewport(
+        raw_data: Sequence[Dict[str, Any]],
+        spreadsheet_id: str,
+        worksheet_name: str,
+        bbox: Optional[BBox] = None,
+        zoom: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Heatmap points di dalam viewport, di-cluster pada zoom rendah
         
-        risk_level = HeatmapProcessor._determine_risk_level(air_quality, risk_score)
+        Args:
+            raw_data: Raw data dari Google Sheets
+            spreadsheet_id: Spreadsheet ID
+            worksheet_name: Worksheet name
+            bbox: (min_lng, min_lat, max_lng, max_lat), None = semua points
+            zoom: Map zoom level, None = tanpa clustering
         
+        Returns:
+            Format process_heatmap_points plus clusters, visible_points dan viewport
+        """
+        processed = HeatmapProcessor._process(raw_data)
+        HeatmapProcessor._remember_version(processed, spreadsheet_id, worksheet_name)
+        index = processed.index
+        result = index.query(bbox, zoom)
         return {
-            "id": idx,
-            "location": str(location) if location else f"Location {idx}",
-            "lat": lat,
-            "lng": lng,
-            "pm2_5": float(pm25) if pm25 is not None else None,
-            "pm10": float(pm10) if pm10 is not None else None,
-            "air_quality": str(air_quality) if air_quality else "UNKNOWN",
-            "risk_score": float(risk_score) if risk_score is not None else None,
-            "risk_level": risk_level,
-            "color": str(color).upper() if color else "GRAY",
-            "device_id": str(device_id) if device_id else None
+            "success": True,
+            "spreadsheet_id": spreadsheet_id,
+            "worksheet_name": worksheet_name,
+            "points": result["points"],
+            "clusters": result["clusters"],
+            "total_points": len(index),
+            "visible_points": result["visible_points"],
+            "center": processed.center,
+            "version": processed.version,
+            "viewport": {
+                "bbox": list(bbox) if bbox else None,
+                "zoom": zoom,
+                "clustered": result["clustered"]
+            }
         }
     
     @staticmethod
-    def _determine_risk_level(air_quality: Any, risk_score: Any) -> str:
-        """Determine risk level dari air quality atau risk score"""
-        risk_level = "low"
-        
-        if isinstance(air_quality, str):
-            air_quality_upper = air_quality.upper()
-            if "POOR" in air_quality_upper or "UNHEALTHY" in air_quality_upper:
-                risk_level = "high"
-            elif "MODERATE" in air_quality_upper:
-                risk_level = "moderate"
-            elif "GOOD" in air_quality_upper:
-                risk_level = "low"
-        
-        if isinstance(risk_score, (int, float)):
-            if risk_score >= 0.7:
-                risk_level = "high"
-            elif risk_score >= 0.4:
-                risk_level = "moderate"
-            else:
-                risk_level = "low"
-        
-        return risk_level
+    @lru_cache(maxsize=64)
+    def _resolve_columns(columns: Tuple[Any, ...]) -> Dict[str, Any]:
+        """Heatmap field -> column key (None jika tidak ada), sekali per header set (read-only result)"""
+        lowered: Dict[str, Any] = {}
+        for column in columns:
+            lowered.setdefault(str(column).lower(), column)
+
+        resolved = {}
+        for field, variants in _HEATMAP_COLUMNS.items():
+            resolved[field] = next((lowered[v.lower()] for v in variants if v.lower() in lowered), None)
+        return resolved
+
+    @staticmethod
+    def _extract_points(raw_data: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Extract heatmap points dari seluruh snapshot sekaligus (vectorized parse per kolom).
+        Record tanpa lat/lng valid, atau dengan PM/risk score non-numeric, di-skip.
+        """
+        table = raw_data if isinstance(raw_data, SheetTable) else None
+        frame = pd.DataFrame.from_records(raw_data) if table is None else None
+        size = len(raw_data)
+        columns = HeatmapProcessor._resolve_columns(table.header if table is not None else tuple(frame.columns))
+
+        def column_of(field: str) -> Optional[pd.Series]:
+            if columns[field] is None:
+                return None
+            # SheetTable: only the columns actually used are decoded
+            return table.series(columns[field]) if table is not None else frame[columns[field]]
+
+        def numeric_of(field: str) -> Tuple[np.ndarray, np.ndarray]:
+            # Columns the SheetTable already stores as numbers need no string parsing
+            typed = table.numeric(columns[field]) if table is not None and columns[field] is not None else None
+            return typed if typed is not None else _numeric_cells(column_of(field), size)
+
+        lat, lat_present = numeric_of("lat")
+        lng, lng_present = numeric_of("lng")
+        pm25, pm25_present = numeric_of("pm25")
+        pm10, pm10_present = numeric_of("pm10")
+        risk, risk_present = numeric_of("risk_score")
+
+        # lat/lng wajib angka; PM/risk score boleh kosong tapi tidak boleh non-numeric
+        valid = ~np.isnan(lat) & ~np.isnan(lng)
+        for number, present in ((pm25, pm25_present), (pm10, pm10_present), (risk, risk_present)):
+            valid &= ~(present & np.isnan(number))
+
+        risk_score = np.where(risk_present, risk, 0.0)
+        risk_level = np.select([risk_score >= 0.7, risk_score >= 0.4], ["high", "moderate"], "low")
+
+        locations = _text_cells(column_of("location"), size)
+        air_qualities = _text_cells(column_of("air_quality"), size)
+        colors = _text_cells(column_of("color"), size)
+        device_ids = _text_cells(column_of("device_id"), size)
+
+        rows = np.flatnonzero(valid)
+        lat_values, lng_values = lat[rows].tolist(), lng[rows].tolist()
+        pm25_values = np.where(pm25_present, pm25, np.nan)[rows].tolist()
+        pm10_values = np.where(pm10_present, pm10, np.nan)[rows].tolist()
+        risk_values, level_values = risk_score[rows].tolist(), risk_level[rows].tolist()
+
+        points = []
+        for n, i in enumerate(rows.tolist()):
+            idx = i + 1
+            color = colors[i]
+            points.append({
+                "id": idx,
+                "location": locations[i] or f"Location {idx}",
+                "lat": lat_values[n],
+                "lng": lng_values[n],
+                "pm2_5": pm25_values[n] if pm25_values[n] == pm25_values[n] else None,
+                "pm10": pm10_values[n] if pm10_values[n] == pm10_values[n] else None,
+                "air_quality": air_qualities[i] or "UNKNOWN",
+                "risk_score": risk_values[n],
+                "risk_level": level_values[n],
+                "color": color.upper() if color else "GRAY",
+                "device_id": device_ids[i]
+            })
+        return points
     
     @staticmethod
     def _calculate_center(points: List[Dict[str, Any]]) -> Optional[Dict[str, float]]:
@@ -0,0 +1,221 @@
+"""
+Interpolated PM2.5 heatmap tiles (XYZ, 256 px PNG)
+Surface dihitung dengan inverse-distance weighting dari heatmap points, per tile,
+dan di-cache per fingerprint snapshot sehingga hanya di-render ulang saat points berubah
+"""
+import math
+import struct
+import threading
+import zlib
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.services.weather.cache_backend import CacheBackend, create_cache_backend
+from app.services.weather.heatmap_index import HeatmapSpatialIndex
+
+TILE_SIZE = 256
+MAX_TILE_ZOOM = 18
+_LATTICE = 64  # IDW evaluated on a 65 x 65 lattice per tile, then bilinear upsampled
+_POINT_CHUNK = 256  # points per distance block (bounds memory to lattice x chunk)
+_MAX_ALPHA = 180
+
+# PM2.5 (μg/m³) -> RGB, same bands as the /weather/heatmap/info legend (<35 green, 35-75 orange, >75 red)
+_COLOR_STOPS = np.array([0.0, 35.0, 75.0, 150.0])
+_COLOR_VALUES = np.array([
+    [34, 197, 94],
+    [249, 115, 22],
+    [239, 68, 68],
+    [127, 29, 29],
+], dtype=float)
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """RGBA uint8 array (height, width, 4) ke PNG bytes (tanpa Pillow)"""
+    height, width, _ = rgba.shape
+    # Filter type 0 (None) at the start of every scanline
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)]).tobytes()
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw, 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+_EMPTY_TILE = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(min_lng, min_lat, max_lng, max_lat) of a Web Mercator XYZ tile"""
+    n = 2 ** z
+
+    def lat_of(row: float) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, lat_of(y + 1), (x + 1) / n * 360.0 - 180.0, lat_of(y)
+
+
+def validate_tile(z: int, x: int, y: int):
+    """Raises ValueError untuk koordinat tile di luar range"""
+    if not 0 <= z <= MAX_TILE_ZOOM:
+        raise ValueError(f"Tile zoom must be between 0 and {MAX_TILE_ZOOM}")
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise ValueError(f"Tile x/y out of range for zoom {z}")
+
+
+class HeatmapTileService:
+    """
+    Render dan cache interpolated PM2.5 tiles.
+    Features:
+    - IDW (power p) within a radius; alpha fades out with distance to the nearest sensor
+    - Only points near the tile are used (spatial index query on the expanded bbox)
+    - Tiles keyed by the points fingerprint, so a changed snapshot never serves stale tiles
+    - Cache backend sesuai CACHE_BACKEND (tiles are bytes, shareable across workers)
+    """
+
+    def __init__(
+        self,
+        radius_km: float = 15.0,
+        power: float = 2.0,
+        backend: CacheBackend | None = None,
+        retention_seconds: float = 3600
+    ):
+        """
+        Initialize tile service
+
+        Args:
+            radius_km: Influence radius of a sensor
+            power: IDW power parameter
+            backend: Tile cache backend (default: in-process, 500 tiles)
+            retention_seconds: How long an unused tile stays cached
+        """
+        self.radius_km = radius_km
+        self.power = power
+        self.retention_seconds = retention_seconds
+        self._backend = backend or create_cache_backend("heatmap_tiles", max_size=500)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "rendered": 0, "empty": 0}
+
+    def tile_etag(self, index: HeatmapSpatialIndex, z: int, x: int, y: int) -> str:
+        """ETag tile (known before rendering, so If-None-Match needs no work)"""
+        return f'"{index.fingerprint}-{self.radius_km:g}-{self.power:g}-{z}-{x}-{y}"'
+
+    def get_tile(self, index: HeatmapSpatialIndex, z: int, x: int, y: int) -> bytes:
+        """
+        PNG bytes for tile z/x/y of the snapshot behind index (cached)
+
+        Raises:
+            ValueError: Koordinat tile tidak valid
+        """
+        validate_tile(z, x, y)
+        key = f"{index.fingerprint}:{self.radius_km:g}:{self.power:g}:{z}/{x}/{y}"
+        entry = self._backend.get(key)
+        if entry is not None:
+            with self._lock:
+                self._stats["hits"] += 1
+            return entry.value
+
+        tile = self.render_tile(index, z, x, y)
+        self._backend.set(key, tile, ttl_seconds=self.retention_seconds)
+        return tile
+
+    def render_tile(self, index: HeatmapSpatialIndex, z: int, x: int, y: int) -> bytes:
+        """Render one tile (no cache)"""
+        min_lng, min_lat, max_lng, max_lat = tile_bounds(z, x, y)
+        # Expand by the radius so sensors just outside the tile still shade its edge
+        pad_lat = self.radius_km / 110.57
+        pad_lng = self.radius_km / (111.32 * max(math.cos(math.radians(max(abs(min_lat), abs(max_lat)))), 0.01))
+        candidates = index.query_indices((min_lng - pad_lng, min_lat - pad_lat, max_lng + pad_lng, max_lat + pad_lat))
+        candidates = candidates[~np.isnan(index.pm25[candidates])]
+        if not len(candidates):
+            with self._lock:
+                self._stats["empty"] += 1
+            return _EMPTY_TILE
+
+        value, nearest = self._interpolate(index, candidates, z, x, y)
+        value, nearest = self._upsample(value), self._upsample(nearest)
+
+        alpha = np.clip(1.0 - nearest / self.radius_km, 0.0, 1.0) ** 0.5 * _MAX_ALPHA
+        rgb = np.stack(
+            [np.interp(value, _COLOR_STOPS, _COLOR_VALUES[:, channel]) for channel in range(3)],
+            axis=-1
+        )
+        rgba = np.concatenate([rgb, alpha[..., None]], axis=-1)
+        rgba[np.isnan(value)] = 0
+        with self._lock:
+            self._stats["rendered"] += 1
+        return encode_png(np.round(rgba).astype(np.uint8))
+
+    def _interpolate(
+        self,
+        index: HeatmapSpatialIndex,
+        candidates: np.ndarray,
+        z: int,
+        x: int,
+        y: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """IDW value and nearest-sensor distance (km) on the tile lattice"""
+        n = 2 ** z
+        steps = np.arange(_LATTICE + 1) / _LATTICE
+        lng = (x + steps) / n * 360.0 - 180.0
+        lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + steps) / n))))
+        grid_lat, grid_lng = np.meshgrid(lat, lng, indexing="ij")
+        grid_lat, grid_lng = grid_lat.reshape(-1, 1), grid_lng.reshape(-1, 1)
+        km_per_lng = 111.32 * np.cos(np.radians(grid_lat))
+
+        numerator = np.zeros(grid_lat.shape[0])
+        denominator = np.zeros(grid_lat.shape[0])
+        nearest = np.full(grid_lat.shape[0], np.inf)
+        for start in range(0, len(candidates), _POINT_CHUNK):
+            chunk = candidates[start:start + _POINT_CHUNK]
+            dy = (grid_lat - index.lat[chunk]) * 110.57
+            dx = (grid_lng - index.lng[chunk]) * km_per_lng
+            distance = np.sqrt(dx * dx + dy * dy)
+            nearest = np.minimum(nearest, distance.min(axis=1))
+            weight = np.where(distance < self.radius_km, 1.0 / np.maximum(distance, 0.05) ** self.power, 0.0)
+            numerator += weight @ index.pm25[chunk]
+            denominator += weight.sum(axis=1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            value = np.where(denominator > 0, numerator / denominator, np.nan)
+        shape = (_LATTICE + 1, _LATTICE + 1)
+        return value.reshape(shape), nearest.reshape(shape)
+
+    @staticmethod
+    def _upsample(lattice: np.ndarray) -> np.ndarray:
+        """Bilinear lattice (corners) -> TILE_SIZE x TILE_SIZE pixel centers"""
+        position = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE * _LATTICE
+        low = np.minimum(np.floor(position).astype(int), _LATTICE - 1)
+        frac = position - low
+        rows = lattice[low] * (1 - frac)[:, None] + lattice[low + 1] * frac[:, None]
+        return rows[:, low] * (1 - frac)[None, :] + rows[:, low + 1] * frac[None, :]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tile cache statistics"""
+        with self._lock:
+            return {
+                "radius_km": self.radius_km,
+                "power": self.power,
+                "backend": self._backend.get_stats(),
+                **self._stats
+            }
+
+
+# Global instance
+_settings = get_settings()
+_heatmap_tile_service = HeatmapTileService(
+    radius_km=_settings.heatmap_idw_radius_km,
+    power=_settings.heatmap_idw_power,
+    backend=create_cache_backend("heatmap_tiles", max_size=2000, max_bytes=_settings.heatmap_tile_cache_bytes)
+)
+
+
+def get_heatmap_tile_service() -> HeatmapTileService:
+    """Get global heatmap tile service instance"""
+    return _heatmap_tile_service
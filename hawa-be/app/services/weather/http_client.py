@@ -0,0 +1,71 @@
+"""
+Shared HTTP clients untuk upstream APIs (Open-Meteo)
+Satu connection pool per process dengan keep-alive (dan HTTP/2 jika package h2 terpasang),
+sehingga request berikutnya tidak bayar DNS, TCP dan TLS setup lagi
+"""
+import importlib.util
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.config import get_settings
+
+_async_client: Optional[httpx.AsyncClient] = None
+_sync_client: Optional[httpx.Client] = None
+_lock = threading.Lock()
+
+
+def _client_options() -> Dict[str, Any]:
+    settings = get_settings()
+    return {
+        "timeout": httpx.Timeout(settings.http_timeout_seconds),
+        "limits": httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds
+        ),
+        # httpx raises at construction when http2=True and h2 is missing
+        "http2": importlib.util.find_spec("h2") is not None,
+        "follow_redirects": True,
+    }
+
+
+def open_http_clients() -> httpx.AsyncClient:
+    """Create the process-wide AsyncClient (app startup)"""
+    global _async_client
+    with _lock:
+        if _async_client is None or _async_client.is_closed:
+            options = _client_options()
+            _async_client = httpx.AsyncClient(**options)
+            print(f"[http] Opened shared client (http2={options['http2']})")
+        return _async_client
+
+
+async def close_http_clients():
+    """Close shared clients (app shutdown)"""
+    global _async_client, _sync_client
+    with _lock:
+        async_client, _async_client = _async_client, None
+        sync_client, _sync_client = _sync_client, None
+    if async_client is not None:
+        await async_client.aclose()
+    if sync_client is not None:
+        sync_client.close()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Shared AsyncClient for request handlers (dibuat on demand jika startup belum jalan)"""
+    client = _async_client
+    if client is None or client.is_closed:
+        client = open_http_clients()
+    return client
+
+
+def get_http_client() -> httpx.Client:
+    """Shared sync Client for code outside the event loop (scheduler jobs, scripts)"""
+    global _sync_client
+    with _lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(**_client_options())
+        return _sync_client
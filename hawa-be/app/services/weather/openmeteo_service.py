@@ -3,36 +3,274 @@ Open-Meteo Service
 Free weather API service - no API key required
 Supports Indonesia/Bandung
 """
-from typing import Dict, Any, Optional
+import asyncio
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
 import httpx
 
+from app.core.config import get_settings
+from app.services.weather.forecast_cache import get_forecast_cache
+from app.services.weather.gazetteer import get_gazetteer
+from app.services.weather.http_client import get_async_http_client, get_http_client
+
 
 class OpenMeteoService:
-    """Service to fetch weather data from Open-Meteo API (free, no API key)"""
+    """
+    Service to fetch weather data from Open-Meteo API (free, no API key).
+    Requests go through the process-wide pooled clients (see http_client); *_async methods
+    are for async endpoints, the sync ones for scheduler jobs and scripts.
+    Responses are cached until the next upstream update (see forecast_cache).
+    *_batch methods fetch many locations per upstream call (comma-separated coordinates).
+    """
 
     def __init__(self):
         self.base_url = "https://api.open-meteo.com/v1"
+        self.air_quality_url = "https://air-quality-api.open-meteo.com/v1/air-quality"
         self.timeout = 10.0
         self.bandung_lat = -6.9175
         self.bandung_lon = 107.6191
+        self.cache = get_forecast_cache()
+        settings = get_settings()
+        self.current_ttl = settings.openmeteo_current_ttl_seconds
+        self.forecast_ttl = settings.openmeteo_forecast_ttl_seconds
+        self.air_quality_ttl = settings.openmeteo_air_quality_ttl_seconds
+        self.batch_size = max(1, settings.openmeteo_batch_size)
 
     def _get_city_coordinates(self, city: str) -> tuple:
         """
-        Get coordinates for a city.
-        Returns Bandung coordinates as default.
-        Can be extended with geocoding if needed.
+        Get coordinates for a city/kabupaten/kecamatan from the offline gazetteer.
+        Names more specific than the gazetteer fall back to their first word ("Cimahi Selatan" -> Cimahi),
+        Bandung coordinates are the default for unknown names.
         """
-        city_coords = {
-            "bandung": (self.bandung_lat, self.bandung_lon),
-            "jakarta": (-6.2088, 106.8456),
-            "surabaya": (-7.2575, 112.7521),
-            "yogyakarta": (-7.7956, 110.3695),
-            "medan": (3.5952, 98.6722),
-            "semarang": (-6.9667, 110.4167),
+        gazetteer = get_gazetteer()
+        place = gazetteer.resolve(city) or gazetteer.resolve_leading_token(city)
+        if place is None:
+            return (self.bandung_lat, self.bandung_lon)
+        return (place.lat, place.lon)
+
+    # Requests: (url, params, normalize, error label, cache period) shared by the sync and async variants
+    def _current_weather_request(self, city: str) -> Tuple[str, Dict[str, Any], Callable, str, int]:
+        lat, lon = self._get_city_coordinates(city)
+        params = {
+            "latitude": lat,
+            "longitude": lon,
+            "current": "temperature_2m,relative_humidity_2m,weather_code,wind_speed_10m,pressure_msl,is_day",
+            "timezone": "Asia/Jakarta",
+            "forecast_days": 1
         }
-        
-        city_lower = city.lower().strip()
-        return city_coords.get(city_lower, (self.bandung_lat, self.bandung_lon))
+        return (
+            f"{self.base_url}/forecast",
+            params,
+            lambda data: self._normalize_current_weather(data, city),
+            "weather",
+            self.current_ttl
+        )
+
+    def _forecast_request(self, city: str, days: int) -> Tuple[str, Dict[str, Any], Callable, str, int]:
+        lat, lon = self._get_city_coordinates(city)
+        params = {
+            "latitude": lat,
+            "longitude": lon,
+            "daily": "temperature_2m_max,temperature_2m_min,weather_code,wind_speed_10m_max,relative_humidity_2m_max",
+            "timezone": "Asia/Jakarta",
+            "forecast_days": min(days, 16)
+        }
+        return (
+            f"{self.base_url}/forecast",
+            params,
+            lambda data: self._normalize_forecast(data, city),
+            "forecast",
+            self.forecast_ttl
+        )
+
+    def _hourly_forecast_request(self, city: str, hours: int) -> Tuple[str, Dict[str, Any], Callable, str, int]:
+        lat, lon = self._get_city_coordinates(city)
+        params = {
+            "latitude": lat,
+            "longitude": lon,
+            "hourly": "temperature_2m,relative_humidity_2m,weather_code,wind_speed_10m,precipitation_probability,precipitation",
+            "timezone": "Asia/Jakarta",
+            "forecast_days": min((hours // 24) + 1, 16)
+        }
+        return (
+            f"{self.base_url}/forecast",
+            params,
+            lambda data: self._normalize_hourly_forecast(data, city),
+            "hourly forecast",
+            self.forecast_ttl
+        )
+
+    def _air_quality_history_request(self, city: str, hours: int) -> Tuple[str, Dict[str, Any], Callable, str, int]:
+        lat, lon = self._get_city_coordinates(city)
+        total_days = max(1, min((hours // 24) + 1, 7))
+        params = {
+            "latitude": lat,
+            "longitude": lon,
+            "hourly": "pm10,pm2_5",
+            "timezone": "Asia/Jakarta",
+            "past_days": total_days,
+            "forecast_days": 1,
+            # Open-Meteo expects iso8601 or unix; use iso8601 for consistency
+            "timeformat": "iso8601"
+        }
+        return (
+            self.air_quality_url,
+            params,
+            lambda data: self._normalize_air_quality_history(data, city, hours),
+            "air quality",
+            self.air_quality_ttl
+        )
+
+    def _get_json(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        response = get_http_client().get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def _get_json_async(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        response = await get_async_http_client().get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch(self, url: str, params: Dict[str, Any], normalize: Callable, label: str, period: int) -> Dict[str, Any]:
+        """GET lewat forecast cache + shared sync client (pooled connections)"""
+        try:
+            key = self.cache.make_key(url, params)
+            return normalize(self.cache.get(key, period, lambda: self._get_json(url, params)))
+        except httpx.HTTPError as e:
+            return {"error": f"HTTP error: {str(e)}", "data": None}
+        except Exception as e:
+            return {"error": f"Error fetching {label}: {str(e)}", "data": None}
+
+    async def _fetch_async(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        normalize: Callable,
+        label: str,
+        period: int
+    ) -> Dict[str, Any]:
+        """GET lewat forecast cache + shared AsyncClient (pooled keep-alive / HTTP/2 connections)"""
+        try:
+            key = self.cache.make_key(url, params)
+            return normalize(await self.cache.get_async(key, period, lambda: self._get_json_async(url, params)))
+        except httpx.HTTPError as e:
+            return {"error": f"HTTP error: {str(e)}", "data": None}
+        except Exception as e:
+            return {"error": f"Error fetching {label}: {str(e)}", "data": None}
+
+    # Batch: one upstream call per chunk of locations, each location cached under its single-request key
+    def _batch_plan(
+        self,
+        cities: Iterable[str],
+        build: Callable[[str], Tuple[str, Dict[str, Any], Callable, str, int]]
+    ) -> Tuple[Dict[str, Tuple], Dict[str, Dict[str, Any]], List[Tuple[str, Dict[str, Any], List[str], int]]]:
+        """
+        Returns:
+            (requests per city, cached raw responses per key, upstream calls (url, params, keys, period))
+        """
+        requests = {city: build(city) for city in dict.fromkeys(cities)}
+        raw: Dict[str, Dict[str, Any]] = {}
+        pending: Dict[Tuple, Dict[str, Dict[str, Any]]] = {}
+        for url, params, _, _, period in requests.values():
+            key = self.cache.make_key(url, params)
+            if key in raw or any(key in members for members in pending.values()):
+                continue
+            cached = self.cache.lookup(key)
+            if cached is not None:
+                raw[key] = cached
+                continue
+            shared = tuple(sorted((name, value) for name, value in params.items() if name not in ("latitude", "longitude")))
+            pending.setdefault((url, shared, period), {})[key] = params
+
+        calls = []
+        for (url, shared, period), members in pending.items():
+            items = list(members.items())
+            for start in range(0, len(items), self.batch_size):
+                chunk = items[start:start + self.batch_size]
+                params = dict(shared)
+                params["latitude"] = ",".join(str(member["latitude"]) for _, member in chunk)
+                params["longitude"] = ",".join(str(member["longitude"]) for _, member in chunk)
+                calls.append((url, params, [key for key, _ in chunk], period))
+        return requests, raw, calls
+
+    def _batch_store(self, raw: Dict[str, Dict[str, Any]], keys: List[str], period: int, data: Any):
+        """Split a multi-location response (list, same order as the coordinates) into per-location entries"""
+        locations = data if isinstance(data, list) else [data]
+        if len(locations) != len(keys):
+            raise ValueError(f"Expected {len(keys)} locations, got {len(locations)}")
+        for key, location in zip(keys, locations):
+            self.cache.put(key, location, period)
+            raw[key] = location
+
+    def _batch_results(
+        self,
+        requests: Dict[str, Tuple],
+        raw: Dict[str, Dict[str, Any]],
+        errors: Dict[str, str]
+    ) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        for city, (url, params, normalize, label, _) in requests.items():
+            key = self.cache.make_key(url, params)
+            if key in raw:
+                results[city] = normalize(raw[key])
+            else:
+                results[city] = {"error": errors.get(key, f"Error fetching {label}"), "data": None}
+        return results
+
+    @staticmethod
+    def _batch_error(e: Exception) -> str:
+        if isinstance(e, httpx.HTTPError):
+            return f"HTTP error: {str(e)}"
+        return f"Error fetching batch: {str(e)}"
+
+    def _fetch_batch(self, cities: Iterable[str], build: Callable) -> Dict[str, Dict[str, Any]]:
+        requests, raw, calls = self._batch_plan(cities, build)
+        errors: Dict[str, str] = {}
+        for url, params, keys, period in calls:
+            try:
+                self._batch_store(raw, keys, period, self._get_json(url, params))
+            except Exception as e:
+                errors.update(dict.fromkeys(keys, self._batch_error(e)))
+        return self._batch_results(requests, raw, errors)
+
+    async def _fetch_batch_async(self, cities: Iterable[str], build: Callable) -> Dict[str, Dict[str, Any]]:
+        requests, raw, calls = await self.cache.run_io(self._batch_plan, list(cities), build)
+        errors: Dict[str, str] = {}
+
+        async def run(url: str, params: Dict[str, Any], keys: List[str], period: int):
+            try:
+                data = await self._get_json_async(url, params)
+                await self.cache.run_io(self._batch_store, raw, keys, period, data)
+            except Exception as e:
+                errors.update(dict.fromkeys(keys, self._batch_error(e)))
+
+        await asyncio.gather(*(run(*call) for call in calls))
+        return self._batch_results(requests, raw, errors)
+
+    def get_current_weather_batch(self, cities: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Current weather for many cities with as few upstream calls as possible
+
+        Returns:
+            Dictionary city -> same shape as get_current_weather
+        """
+        return self._fetch_batch(cities, self._current_weather_request)
+
+    async def get_current_weather_batch_async(self, cities: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Async variant of get_current_weather_batch"""
+        return await self._fetch_batch_async(cities, self._current_weather_request)
+
+    def get_forecast_batch(self, cities: Iterable[str], days: int = 5) -> Dict[str, Dict[str, Any]]:
+        """Daily forecast for many cities (city -> same shape as get_forecast)"""
+        return self._fetch_batch(cities, lambda city: self._forecast_request(city, days))
+
+    def get_hourly_forecast_batch(self, cities: Iterable[str], hours: int = 24) -> Dict[str, Dict[str, Any]]:
+        """Hourly forecast for many cities (city -> same shape as get_hourly_forecast)"""
+        return self._fetch_batch(cities, lambda city: self._hourly_forecast_request(city, hours))
+
+    def get_air_quality_history_batch(self, cities: Iterable[str], hours: int = 72) -> Dict[str, Dict[str, Any]]:
+        """Air quality history for many cities (city -> same shape as get_air_quality_history)"""
+        return self._fetch_batch(cities, lambda city: self._air_quality_history_request(city, hours))
 
     def get_current_weather(self, city: str = "Bandung", country_code: str = "ID") -> Dict[str, Any]:
         """
@@ -45,28 +283,11 @@ class OpenMeteoService:
         Returns:
             Dictionary with current weather data
         """
-        try:
-            lat, lon = self._get_city_coordinates(city)
-            
-            url = f"{self.base_url}/forecast"
-            params = {
-                "latitude": lat,
-                "longitude": lon,
-                "current": "temperature_2m,relative_humidity_2m,weather_code,wind_speed_10m,pressure_msl,is_day",
-                "timezone": "Asia/Jakarta",
-                "forecast_days": 1
-            }
-            
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-            
-            return self._normalize_current_weather(data, city)
-        except httpx.HTTPError as e:
-            return {"error": f"HTTP error: {str(e)}", "data": None}
-        except Exception as e:
-            return {"error": f"Error fetching weather: {str(e)}", "data": None}
+        return self._fetch(*self._current_weather_request(city))
+
+    async def get_current_weather_async(self, city: str = "Bandung", country_code: str = "ID") -> Dict[str, Any]:
+        """Async variant of get_current_weather"""
+        return await self._fetch_async(*self._current_weather_request(city))
 
     def get_forecast(self, city: str = "Bandung", country_code: str = "ID", days: int = 5) -> Dict[str, Any]:
         """
@@ -80,28 +301,11 @@ class OpenMeteoService:
         Returns:
             Dictionary with forecast data
         """
-        try:
-            lat, lon = self._get_city_coordinates(city)
-            
-            url = f"{self.base_url}/forecast"
-            params = {
-                "latitude": lat,
-                "longitude": lon,
-                "daily": "temperature_2m_max,temperature_2m_min,weather_code,wind_speed_10m_max,relative_humidity_2m_max",
-                "timezone": "Asia/Jakarta",
-                "forecast_days": min(days, 16)
-            }
-            
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-            
-            return self._normalize_forecast(data, city)
-        except httpx.HTTPError as e:
-            return {"error": f"HTTP error: {str(e)}", "data": None}
-        except Exception as e:
-            return {"error": f"Error fetching forecast: {str(e)}", "data": None}
+        return self._fetch(*self._forecast_request(city, days))
+
+    async def get_forecast_async(self, city: str = "Bandung", country_code: str = "ID", days: int = 5) -> Dict[str, Any]:
+        """Async variant of get_forecast"""
+        return await self._fetch_async(*self._forecast_request(city, days))
 
     def get_hourly_forecast(self, city: str = "Bandung", country_code: str = "ID", hours: int = 24) -> Dict[str, Any]:
         """
@@ -115,28 +319,16 @@ class OpenMeteoService:
         Returns:
             Dictionary with hourly forecast data
         """
-        try:
-            lat, lon = self._get_city_coordinates(city)
-            
-            url = f"{self.base_url}/forecast"
-            params = {
-                "latitude": lat,
-                "longitude": lon,
-                "hourly": "temperature_2m,relative_humidity_2m,weather_code,wind_speed_10m,precipitation_probability,precipitation",
-                "timezone": "Asia/Jakarta",
-                "forecast_days": min((hours // 24) + 1, 16)
-            }
-            
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-            
-            return self._normalize_hourly_forecast(data, city)
-        except httpx.HTTPError as e:
-            return {"error": f"HTTP error: {str(e)}", "data": None}
-        except Exception as e:
-            return {"error": f"Error fetching hourly forecast: {str(e)}", "data": None}
+        return self._fetch(*self._hourly_forecast_request(city, hours))
+
+    async def get_hourly_forecast_async(
+        self,
+        city: str = "Bandung",
+        country_code: str = "ID",
+        hours: int = 24
+    ) -> Dict[str, Any]:
+        """Async variant of get_hourly_forecast"""
+        return await self._fetch_async(*self._hourly_forecast_request(city, hours))
 
     def get_air_quality_history(self, city: str = "Bandung", hours: int = 72) -> Dict[str, Any]:
         """
@@ -149,32 +341,11 @@ class OpenMeteoService:
         Returns:
             Dictionary with normalized air quality series
         """
-        try:
-            lat, lon = self._get_city_coordinates(city)
-
-            url = "https://air-quality-api.open-meteo.com/v1/air-quality"
-            total_days = max(1, min((hours // 24) + 1, 7))
-            params = {
-                "latitude": lat,
-                "longitude": lon,
-                "hourly": "pm10,pm2_5",
-                "timezone": "Asia/Jakarta",
-                "past_days": total_days,
-                "forecast_days": 1,
-                # Open-Meteo expects iso8601 or unix; use iso8601 for consistency
-                "timeformat": "iso8601"
-            }
+        return self._fetch(*self._air_quality_history_request(city, hours))
 
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-            return self._normalize_air_quality_history(data, city, hours)
-        except httpx.HTTPError as e:
-            return {"error": f"HTTP error: {str(e)}", "data": None}
-        except Exception as e:
-            return {"error": f"Error fetching air quality: {str(e)}", "data": None}
+    async def get_air_quality_history_async(self, city: str = "Bandung", hours: int = 72) -> Dict[str, Any]:
+        """Async variant of get_air_quality_history"""
+        return await self._fetch_async(*self._air_quality_history_request(city, hours))
 
     def _normalize_current_weather(self, data: Dict[str, Any], city: str) -> Dict[str, Any]:
         """Normalize Open-Meteo current weather response"""
@@ -0,0 +1,367 @@
+"""
+Readings Store
+Local time-series store (tabel sensor_readings) yang mirror IoT Google Sheet.
+Google Sheets jadi upstream source, query history (range, stats, latest)
+dilakukan ke database dengan index timestamp.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from pytz import utc
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.models.sensor_reading import SensorReading
+from app.services.weather.device_readings import DeviceReadingsIndex
+from app.services.weather.sheet_table import SheetTable
+from app.services.weather.sheets_cache_service import (
+    get_cached_sheets_data,
+    get_realtime_sheets_data
+)
+from app.services.weather.spreadsheet_service import (
+    DEFAULT_TZ,
+    SpreadsheetService,
+    parse_reading_timestamp
+)
+
+READING_FIELDS = [
+    "pm25", "pm10", "o3", "no2", "so2", "co",
+    "temperature", "humidity", "pressure",
+]
+
+# Mirror considered stale (request handlers read Sheets directly) after this many missed ingest runs
+STALE_AFTER_INGEST_INTERVALS = 3
+
+# Number of sheet rows already mirrored per source (sheet is append-only), seeded from sensor_readings
+_ingest_offsets: Dict[str, int] = {}
+_ingest_lock = threading.Lock()
+
+# Latest reading + recent readings per device, updated on every bulk_insert
+_device_readings = DeviceReadingsIndex(READING_FIELDS, capacity=get_settings().device_ring_capacity)
+
+
+def get_device_readings() -> DeviceReadingsIndex:
+    """Get global per-device readings index"""
+    return _device_readings
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Normalize to UTC so SQLite (no timezone support) compares correctly too"""
+    if value.tzinfo is None:
+        return utc.localize(value)
+    return value.astimezone(utc)
+
+
+def sheets_source(spreadsheet_id: str, worksheet_name: str) -> str:
+    """Source key stored on every reading mirrored from a sheet"""
+    return f"sheets:{spreadsheet_id}:{worksheet_name}"
+
+
+class ReadingsStore:
+    """Service untuk ingest dan query sensor readings dari database"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.sheet_service = SpreadsheetService()
+
+    # Ingestion
+    def ingest_records(
+        self,
+        records: Iterable[Dict[str, Any]],
+        source: str | None = None,
+        start_row: int = 1
+    ) -> int:
+        """
+        Parse raw sheet records dan simpan ke sensor_readings.
+        Rows tanpa timestamp yang bisa di-parse dilewati: timestamp wajib dan bagian dari
+        unique key (device_id, timestamp)
+
+        Args:
+            records: Raw records dari Google Sheets
+            source: Source key (lihat sheets_source)
+            start_row: 1-based data row index of the first record
+
+        Returns:
+            Jumlah readings baru yang tersimpan
+        """
+        if not isinstance(records, SheetTable):
+            records = list(records)
+        if not records:
+            return 0
+
+        # Whole batch parsed column-wise (same rules as process_bmkg_data)
+        frame = self.sheet_service.to_frame(records)
+        has_timestamp = frame["timestamp"].notna()
+        if not has_timestamp.all():
+            print(f"[readings_store] Skipped {int((~has_timestamp).sum())} row(s) without a parseable timestamp from {source}")
+            frame = frame[has_timestamp]
+        if frame.empty:
+            return 0
+
+        numbers = frame[READING_FIELDS].astype(object).where(frame[READING_FIELDS].notna(), None)
+        timestamps = [ts.to_pydatetime() for ts in frame["timestamp"].dt.tz_convert("UTC")]
+
+        rows = []
+        for offset, timestamp, values, device_id, level, location in zip(
+            frame.index.tolist(),
+            timestamps,
+            numbers.itertuples(index=False, name=None),
+            frame["device_id"].tolist(),
+            frame["air_quality_level"].tolist(),
+            frame["location"].tolist()
+        ):
+            row: Dict[str, Any] = {
+                "device_id": str(device_id or "unknown")[:64],
+                "timestamp": timestamp,
+                "air_quality_level": str(level)[:50] if level else None,
+                "location": str(location)[:100] if location else None,
+                "source": source,
+                "source_row": start_row + offset,
+            }
+            row.update(zip(READING_FIELDS, values))
+            rows.append(row)
+        return self.bulk_insert(rows)
+
+    @staticmethod
+    def build_row(
+        processed: Dict[str, Any],
+        source: str | None = None,
+        source_row: int | None = None
+    ) -> Optional[Dict[str, Any]]:
+        """Convert processed (process_bmkg_data) dict ke kolom sensor_readings"""
+        timestamp = parse_reading_timestamp(processed.get("timestamp"))
+        if timestamp is None:
+            return None
+
+        row: Dict[str, Any] = {
+            "device_id": str(processed.get("device_id") or "unknown")[:64],
+            "timestamp": _as_utc(timestamp),
+            "air_quality_level": str(processed["air_quality_level"])[:50] if processed.get("air_quality_level") else None,
+            "location": str(processed["location"])[:100] if processed.get("location") else None,
+            "source": source,
+            "source_row": source_row,
+        }
+        for field in READING_FIELDS:
+            value = processed.get(field)
+            row[field] = float(value) if isinstance(value, (int, float)) else None
+        return row
+
+    def bulk_insert(self, rows: List[Dict[str, Any]], chunk_size: int = 1000) -> int:
+        """
+        Insert readings dalam satu statement per chunk, skip duplikat (device_id, timestamp).
+        Setelah commit, readings juga masuk ke per-device index (get_device_readings)
+
+        Returns:
+            Jumlah readings baru yang tersimpan
+        """
+        if not rows:
+            return 0
+
+        dialect = self.db.get_bind().dialect.name
+        inserted = 0
+
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+            for i in range(0, len(rows), chunk_size):
+                stmt = dialect_insert(SensorReading).values(rows[i:i + chunk_size])
+                stmt = stmt.on_conflict_do_nothing(index_elements=["device_id", "timestamp"])
+                result = self.db.execute(stmt)
+                inserted += max(result.rowcount or 0, 0)
+            self.db.commit()
+            _device_readings.ingest(rows)
+            return inserted
+
+        # Generic fallback: row by row, ignore duplicates
+        for row in rows:
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(insert(SensorReading).values(**row))
+                inserted += 1
+            except IntegrityError:
+                continue
+        self.db.commit()
+        _device_readings.ingest(rows)
+        return inserted
+
+    def sync_from_sheets(
+        self,
+        spreadsheet_id: str,
+        worksheet_name: str = "Sheet1",
+        realtime: bool = False
+    ) -> int:
+        """
+        Mirror baris baru dari Google Sheets ke database
+
+        Args:
+            spreadsheet_id: Google Sheets ID
+            worksheet_name: Worksheet name
+            realtime: Use the 1 second realtime cache instead of the standard cache
+
+        Returns:
+            Jumlah readings baru yang tersimpan
+        """
+        if realtime:
+            raw_data = get_realtime_sheets_data(spreadsheet_id=spreadsheet_id, worksheet_name=worksheet_name)
+        else:
+            raw_data = get_cached_sheets_data(spreadsheet_id=spreadsheet_id, worksheet_name=worksheet_name)
+
+        source = sheets_source(spreadsheet_id, worksheet_name)
+        with _ingest_lock:
+            offset = _ingest_offsets.get(source)
+        if offset is None:
+            # First sync in this process: resume after the rows already stored instead of re-sending the sheet
+            offset = (
+                self.db.query(func.max(SensorReading.source_row))
+                .filter(SensorReading.source == source)
+                .scalar()
+            ) or 0
+            with _ingest_lock:
+                _ingest_offsets.setdefault(source, offset)
+        if offset > len(raw_data):
+            # Sheet shrank (rows deleted), re-scan; duplicates are skipped by the unique key
+            offset = 0
+        if offset == len(raw_data):
+            return 0
+
+        inserted = self.ingest_records(raw_data[offset:], source=source, start_row=offset + 1)
+        with _ingest_lock:
+            _ingest_offsets[source] = len(raw_data)
+        return inserted
+
+    # Queries
+    def _filtered(
+        self,
+        source: str | None = None,
+        device_id: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None
+    ):
+        query = self.db.query(SensorReading)
+        if source:
+            query = query.filter(SensorReading.source == source)
+        if device_id:
+            query = query.filter(SensorReading.device_id == device_id)
+        if start:
+            query = query.filter(SensorReading.timestamp >= _as_utc(start))
+        if end:
+            query = query.filter(SensorReading.timestamp < _as_utc(end))
+        return query
+
+    def query_range(
+        self,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        source: str | None = None,
+        device_id: str | None = None,
+        limit: int | None = None
+    ) -> List[SensorReading]:
+        """Readings dalam range [start, end), urut dari yang paling lama"""
+        query = self._filtered(source, device_id, start, end).order_by(SensorReading.timestamp.asc())
+        if limit:
+            query = query.limit(limit)
+        return query.all()
+
+    def latest(
+        self,
+        limit: int = 1,
+        source: str | None = None,
+        device_id: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None
+    ) -> List[SensorReading]:
+        """N readings terbaru, dikembalikan urut dari yang paling lama"""
+        readings = (
+            self._filtered(source, device_id, start, end)
+            .order_by(SensorReading.timestamp.desc())
+            .limit(limit)
+            .all()
+        )
+        readings.reverse()
+        return readings
+
+    def is_mirror_stale(self, source: str) -> bool:
+        """
+        Whether the newest mirrored reading of source is older than a few ingest intervals
+        (nothing mirrored yet, or the scheduler ingest job is not running, e.g. on serverless)
+        """
+        max_age = timedelta(seconds=get_settings().readings_ingest_interval_seconds * STALE_AFTER_INGEST_INTERVALS)
+        now = datetime.now(utc)
+        newest = _device_readings.newest_timestamp(source)
+        if newest is not None and now - newest <= max_age:
+            return False
+        newest = self.db.query(func.max(SensorReading.timestamp)).filter(SensorReading.source == source).scalar()
+        return newest is None or now - _as_utc(newest) > max_age
+
+    def count(self, source: str | None = None, device_id: str | None = None) -> int:
+        """Jumlah readings tersimpan"""
+        return self._filtered(source, device_id).count()
+
+    def field_stats(
+        self,
+        fields: List[str] | None = None,
+        source: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Min/max/avg/latest per field, dihitung di database
+
+        Returns:
+            Dictionary {field: {min, max, avg, latest}} untuk field yang punya data
+        """
+        fields = fields or READING_FIELDS
+        columns = []
+        for field in fields:
+            column = getattr(SensorReading, field)
+            columns.extend([func.min(column), func.max(column), func.avg(column), func.count(column)])
+
+        query = self.db.query(*columns)
+        if source:
+            query = query.filter(SensorReading.source == source)
+        if start:
+            query = query.filter(SensorReading.timestamp >= _as_utc(start))
+        if end:
+            query = query.filter(SensorReading.timestamp < _as_utc(end))
+        aggregates = query.one()
+
+        stats: Dict[str, Dict[str, Any]] = {}
+        for i, field in enumerate(fields):
+            min_value, max_value, avg_value, count_value = aggregates[i * 4:(i + 1) * 4]
+            if not count_value:
+                continue
+            column = getattr(SensorReading, field)
+            latest_value = (
+                self._filtered(source, None, start, end)
+                .with_entities(column)
+                .filter(column.isnot(None))
+                .order_by(SensorReading.timestamp.desc())
+                .limit(1)
+                .scalar()
+            )
+            stats[field] = {
+                "min": min_value,
+                "max": max_value,
+                "avg": float(avg_value),
+                "latest": latest_value
+            }
+        return stats
+
+    @staticmethod
+    def to_dict(reading: SensorReading) -> Dict[str, Any]:
+        """Convert reading ke format yang sama dengan SpreadsheetService.process_bmkg_data"""
+        data = {field: getattr(reading, field) for field in READING_FIELDS}
+        data.update({
+            "location": reading.location or "Bandung",
+            "timestamp": _as_utc(reading.timestamp).astimezone(DEFAULT_TZ).isoformat() if reading.timestamp else None,
+            "air_quality_level": reading.air_quality_level,
+            "device_id": reading.device_id,
+            "source_row": reading.source_row,
+        })
+        return data
@@ -2,14 +2,15 @@
 Realtime Warning Service
 Service for mapping warnings per column of latest data with personalized recommendations
 """
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 
 from app.db.models.user import User
-from app.services.weather.sheets_cache_service import get_realtime_sheets_data
-from app.services.weather.spreadsheet_service import SpreadsheetService
+from app.services.weather.readings_store import ReadingsStore, get_device_readings, sheets_source
 from app.services.weather.recommendation_service import WeatherRecommendationService
+from app.services.weather.sheets_cache_service import get_realtime_sheets_data
+from app.services.weather.spreadsheet_service import SpreadsheetService, parse_reading_timestamp
 
 
 class RealtimeWarningService:
@@ -20,8 +21,8 @@ class RealtimeWarningService:
     
     def __init__(self, db: Session):
         self.db = db
-        self.sheet_service = SpreadsheetService()
         self.recommendation_service = WeatherRecommendationService(db)
+        self.sheet_service = SpreadsheetService()
     
     def get_warnings_by_columns(
         self,
@@ -44,63 +45,34 @@ class RealtimeWarningService:
         Returns:
             List of warnings with complete metadata
         """
-        # Get latest data with 1 second cache
-        raw_data = get_realtime_sheets_data(
-            spreadsheet_id=spreadsheet_id,
-            worksheet_name=worksheet_name,
-            force_refresh=False
-        )
+        store = ReadingsStore(self.db)
+        source = sheets_source(spreadsheet_id, worksheet_name)
         
-        if not raw_data:
-            return []
+        # Read only: new sheet rows are mirrored by the scheduler ingest job (READINGS_INGEST_INTERVAL_SECONDS).
+        # Rows without a parseable timestamp are not mirrored (timestamp is part of the unique key),
+        # so unlike the direct sheet path below they never show up here.
+        now = datetime.now(timezone.utc)
+        start = now - timedelta(seconds=time_window_seconds)
+        if store.is_mirror_stale(source):
+            # Not mirrored, or the ingest job is not running (serverless): read the realtime cache
+            recent_readings = self._recent_from_sheets(spreadsheet_id, worksheet_name, limit, start, now)
+        else:
+            # Last N readings within the time window: per-device ring buffers, database only when
+            # memory cannot answer exactly (window older than the buffers)
+            recent_readings = get_device_readings().recent(source, limit=limit, start=start, end=now)
+            if recent_readings is None:
+                recent_readings = [
+                    store.to_dict(reading)
+                    for reading in store.latest(limit=limit, source=source, start=start, end=now)
+                ]
         
-        # Get last N columns
-        recent_data = raw_data[-limit:] if len(raw_data) > limit else raw_data
+        if not recent_readings:
+            return []
         
         warnings = []
-        now = datetime.now()
         
-        for idx, row in enumerate(recent_data):
+        for idx, processed in enumerate(recent_readings):
             try:
-                # Process data
-                processed = self.sheet_service.process_bmkg_data(row)
-                
-                # Check if within time window
-                timestamp_str = processed.get('timestamp')
-                if timestamp_str:
-                    try:
-                        # Try parsing timestamp
-                        if isinstance(timestamp_str, str):
-                            # Try multiple formats
-                            for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%d/%m/%Y %H:%M:%S"):
-                                try:
-                                    row_time = datetime.strptime(timestamp_str, fmt)
-                                    break
-                                except ValueError:
-                                    continue
-                            else:
-                                # Try ISO format
-                                try:
-                                    row_time = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                                except:
-                                    row_time = None
-                        else:
-                            row_time = timestamp_str
-                        
-                        if row_time:
-                            # Remove timezone info for comparison
-                            if row_time.tzinfo:
-                                row_time = row_time.replace(tzinfo=None)
-                            
-                            time_diff = (now - row_time).total_seconds()
-                            
-                            # Skip if outside window
-                            if time_diff > time_window_seconds or time_diff < 0:
-                                continue
-                    except Exception:
-                        # If parsing fails, still process (might be different format)
-                        pass
-                
                 # Generate recommendation for this column
                 recommendation = self.recommendation_service.get_personalized_recommendation(
                     user=user,
@@ -111,8 +83,8 @@ class RealtimeWarningService:
                 
                 # Only return warning if risk is medium or higher
                 if risk_level in ['medium', 'high', 'critical']:
-                    # Calculate column index (1-based, from end)
-                    column_index = len(raw_data) - len(recent_data) + idx + 1
+                    # Column index = 1-based data row in the source sheet
+                    column_index = processed.get('source_row') or idx + 1
                     
                     warnings.append({
                         "column_index": column_index,
@@ -140,6 +112,28 @@ class RealtimeWarningService:
         
         return warnings
     
+    def _recent_from_sheets(
+        self,
+        spreadsheet_id: str,
+        worksheet_name: str,
+        limit: int,
+        start: datetime,
+        end: datetime
+    ) -> List[Dict[str, Any]]:
+        """Last limit sheet rows within [start, end]; rows without a parseable timestamp are kept"""
+        raw_data = get_realtime_sheets_data(spreadsheet_id=spreadsheet_id, worksheet_name=worksheet_name)
+        first_row = max(len(raw_data) - limit, 0)
+        
+        recent = []
+        for offset, row in enumerate(raw_data[first_row:]):
+            processed = self.sheet_service.process_bmkg_data(row)
+            timestamp = parse_reading_timestamp(processed.get('timestamp'))
+            if timestamp is not None and not start <= timestamp <= end:
+                continue
+            processed['source_row'] = first_row + offset + 1
+            recent.append(processed)
+        return recent
+    
     def get_warnings_summary(
         self,
         spreadsheet_id: str,
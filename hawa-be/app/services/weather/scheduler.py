@@ -2,7 +2,9 @@
 Weather notification scheduler.
 
 Scheduled pipeline:
-- Fetch today's IoT/Sheets data (first N rows for today).
+- Mirror new IoT/Sheets rows into the sensor_readings table (every N seconds).
+- Pre-fetch Open-Meteo data for West Java cities and user locations (batched, every N seconds).
+- Fetch today's readings from the store (first N rows for today).
 - Aggregate metrics (mean/median).
 - Determine AQI level.
 - Generate multilingual recommendations via GroqWeatherService.
@@ -15,7 +17,7 @@ Cron defaults:
 from __future__ import annotations
 
 import statistics
-from datetime import datetime
+from datetime import datetime, time, timedelta
 from typing import Any, Dict, List, Optional
 
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -25,7 +27,11 @@ from sqlalchemy.orm import Session
 from app.core.config import get_settings
 from app.db.models.user import User
 from app.db.postgres import get_db
+from app.services.weather.openmeteo_service import OpenMeteoService
+from app.services.weather.readings_store import ReadingsStore, sheets_source
 from app.services.weather.recommendation_service import WeatherRecommendationService
+from app.services.weather.sheets_cache_service import get_cached_sheets_data, refresh_sheets_batch
+from app.services.weather.sheets_quota import SheetsPriority, sheets_priority
 from app.services.weather.spreadsheet_service import SpreadsheetService
 from app.services.whatsapp.wa_client import WAClient
 
@@ -55,6 +61,31 @@ class WeatherNotificationScheduler:
         self.scheduler.add_job(self.run_morning_job, "cron", hour=6, minute=0, id="weather_morning")
         # 12:00 WIB daily (conditional send if AQI is bad)
         self.scheduler.add_job(self.run_midday_job, "cron", hour=12, minute=0, id="weather_midday")
+        # Mirror new sheet rows into sensor_readings
+        self.scheduler.add_job(
+            self.run_ingest_job,
+            "interval",
+            seconds=get_settings().readings_ingest_interval_seconds,
+            id="readings_ingest",
+            max_instances=1,
+            coalesce=True,
+        )
+        # Pre-fetch Open-Meteo data so dashboards read the forecast cache
+        prewarm_interval = get_settings().openmeteo_prewarm_interval_seconds
+        if prewarm_interval > 0:
+            # Aligned just after the cache expiry boundaries (see forecast_cache), first run right away
+            grace = get_settings().openmeteo_cache_grace_seconds
+            epoch = datetime.now(self.tz).timestamp()
+            self.scheduler.add_job(
+                self.run_prewarm_job,
+                "interval",
+                seconds=prewarm_interval,
+                start_date=datetime.fromtimestamp(epoch - epoch % prewarm_interval + grace + 5, self.tz),
+                next_run_time=datetime.now(self.tz),
+                id="openmeteo_prewarm",
+                max_instances=1,
+                coalesce=True,
+            )
         self.scheduler.start()
 
     def shutdown(self):
@@ -63,11 +94,73 @@ class WeatherNotificationScheduler:
             self.scheduler.shutdown(wait=False)
 
     # Job entrypoints
+    # Scheduler jobs get the highest Sheets quota priority
     def run_morning_job(self):
-        self._run_notifications(label="morning", force_send=True)
+        with sheets_priority(SheetsPriority.INGESTION):
+            self._run_notifications(label="morning", force_send=True)
 
     def run_midday_job(self):
-        self._run_notifications(label="midday", force_send=False)
+        with sheets_priority(SheetsPriority.INGESTION):
+            self._run_notifications(label="midday", force_send=False)
+
+    def run_ingest_job(self):
+        session = next(get_db())
+        try:
+            with sheets_priority(SheetsPriority.INGESTION):
+                # One batchGet per spreadsheet warms every dashboard sheet; the sync below hits the cache
+                try:
+                    refresh_sheets_batch()
+                except Exception as exc:  # noqa: BLE001
+                    print(f"[scheduler:ingest] Batched sheets refresh failed: {exc}")
+                inserted = ReadingsStore(session).sync_from_sheets(
+                    spreadsheet_id=self.spreadsheet_id,
+                    worksheet_name=self.worksheet_name,
+                )
+            if inserted:
+                print(f"[scheduler:ingest] Stored {inserted} new readings.")
+        except Exception as exc:  # noqa: BLE001
+            print(f"[scheduler:ingest] Failed to mirror sheets data: {exc}")
+        finally:
+            session.close()
+
+    def run_prewarm_job(self):
+        cities = self._prewarm_locations()
+        service = OpenMeteoService()
+        failed = 0
+        for fetch_batch in (
+            service.get_current_weather_batch,
+            service.get_forecast_batch,
+            service.get_hourly_forecast_batch,
+            service.get_air_quality_history_batch,
+        ):
+            try:
+                results = fetch_batch(cities)
+            except Exception as exc:  # noqa: BLE001
+                print(f"[scheduler:prewarm] {fetch_batch.__name__} failed: {exc}")
+                failed += len(cities)
+                continue
+            failed += sum(1 for result in results.values() if result.get("error"))
+        print(f"[scheduler:prewarm] Warmed {len(cities)} locations, failed={failed}")
+
+    def _prewarm_locations(self) -> List[str]:
+        """Configured cities followed by every distinct User.location (case-insensitive dedupe)."""
+        configured = get_settings().openmeteo_prewarm_locations.split(",")
+        user_locations: List[str] = []
+        session = next(get_db())
+        try:
+            rows = session.query(User.location).filter(User.location.isnot(None), User.location != "").distinct()
+            user_locations = [location for (location,) in rows]
+        except Exception as exc:  # noqa: BLE001
+            print(f"[scheduler:prewarm] Failed to load user locations: {exc}")
+        finally:
+            session.close()
+
+        cities: Dict[str, str] = {}
+        for city in configured + user_locations:
+            city = city.strip()
+            if city:
+                cities.setdefault(city.lower(), city)
+        return list(cities.values())
 
     # Core pipeline
     def _run_notifications(self, label: str, force_send: bool):
@@ -132,58 +225,91 @@ class WeatherNotificationScheduler:
         )
 
     def _fetch_today_weather(self) -> tuple[Optional[Dict[str, Any]], str]:
-        """Fetch today's rows from Google Sheets and aggregate."""
+        """Fetch today's readings from the local store (fallback: Google Sheets) and aggregate."""
         try:
-            raw_rows = self.sheet_service.read_from_google_sheets(
-                spreadsheet_id=self.spreadsheet_id,
-                worksheet_name=self.worksheet_name,
-            )
+            limited_rows = self._fetch_today_rows_from_store()
         except Exception as exc:  # noqa: BLE001
-            print(f"[scheduler] Failed to fetch sheets data: {exc}")
-            return None, "unknown"
+            print(f"[scheduler] Readings store unavailable, falling back to sheets: {exc}")
+            limited_rows = []
+
+        if not limited_rows:
+            # Nothing mirrored for today yet (fresh database, ingest job behind): read the sheet directly
+            limited_rows = self._fetch_today_rows_from_sheets()
 
-        today_rows = self._filter_today_rows(raw_rows)
-        if not today_rows:
+        if not limited_rows:
             return None, "unknown"
 
-        limited_rows = today_rows[: self.max_rows_per_day]
         aggregates = self._aggregate_rows(limited_rows)
         aqi_level = self._categorize_aqi(aggregates)
 
         aggregates["aqi_level"] = aqi_level
         return aggregates, aqi_level
 
-    def _filter_today_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Keep rows whose timestamp is today in target timezone."""
-        today_local = datetime.now(self.tz).date()
-        filtered: List[Dict[str, Any]] = []
-        for row in rows:
-            ts_raw = row.get("Timestamp") or row.get("timestamp") or row.get("Date") or row.get("date")
-            ts = self._parse_timestamp(ts_raw)
-            if ts and self._as_local(ts).date() == today_local:
-                filtered.append(row)
-        return filtered
-
-    @staticmethod
-    def _parse_timestamp(value: Any) -> Optional[datetime]:
-        if not value:
-            return None
-        if isinstance(value, datetime):
-            return value
-        for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M"):
+    def _fetch_today_rows_from_store(self) -> List[Dict[str, Any]]:
+        """First N readings of today (local timezone) from sensor_readings."""
+        session = next(get_db())
+        try:
+            store = ReadingsStore(session)
             try:
-                return datetime.strptime(str(value), fmt)
-            except ValueError:
+                store.sync_from_sheets(spreadsheet_id=self.spreadsheet_id, worksheet_name=self.worksheet_name)
+            except Exception as exc:  # noqa: BLE001
+                # Sheets down: still aggregate whatever has already been mirrored
+                print(f"[scheduler] Failed to sync sheets data: {exc}")
+
+            start = self.tz.localize(datetime.combine(datetime.now(self.tz).date(), time.min))
+            readings = store.query_range(
+                start=start,
+                end=start + timedelta(days=1),
+                source=sheets_source(self.spreadsheet_id, self.worksheet_name),
+                limit=self.max_rows_per_day,
+            )
+            rows = [store.to_dict(reading) for reading in readings]
+            self._attach_sheet_co2(rows)
+            return rows
+        finally:
+            session.close()
+
+    def _attach_sheet_co2(self, rows: List[Dict[str, Any]]):
+        """CO2 is not a sensor_readings column: copy it from the cached sheet rows (matched by source_row)."""
+        if not rows:
+            return
+        try:
+            raw_rows = get_cached_sheets_data(spreadsheet_id=self.spreadsheet_id, worksheet_name=self.worksheet_name)
+        except Exception as exc:  # noqa: BLE001
+            print(f"[scheduler] CO2 unavailable, sheets data not cached: {exc}")
+            return
+
+        for row in rows:
+            index = (row.get("source_row") or 0) - 1
+            if not 0 <= index < len(raw_rows):
                 continue
+            sheet_row = raw_rows[index]
+            for key in ("CO2", "co2"):
+                if key in sheet_row:
+                    row[key] = sheet_row[key]
+
+    def _fetch_today_rows_from_sheets(self) -> List[Dict[str, Any]]:
+        """First N rows of today straight from Google Sheets."""
         try:
-            return datetime.fromisoformat(str(value))
-        except ValueError:
-            return None
-
-    def _as_local(self, ts: datetime) -> datetime:
-        if ts.tzinfo is None:
-            return self.tz.localize(ts)
-        return ts.astimezone(self.tz)
+            raw_rows = self.sheet_service.read_from_google_sheets(
+                spreadsheet_id=self.spreadsheet_id,
+                worksheet_name=self.worksheet_name,
+            )
+        except Exception as exc:  # noqa: BLE001
+            print(f"[scheduler] Failed to fetch sheets data: {exc}")
+            return []
+
+        return self._filter_today_rows(raw_rows)[: self.max_rows_per_day]
+
+    def _filter_today_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep rows whose timestamp is today in target timezone."""
+        if not rows:
+            return []
+        # Timestamps parsed for the whole sheet at once instead of strptime per row
+        timestamps = self.sheet_service.to_frame(rows)["timestamp"]
+        today_local = datetime.now(self.tz).date()
+        is_today = (timestamps.dt.tz_convert(self.tz.zone).dt.date == today_local).to_numpy()
+        return [row for row, keep in zip(rows, is_today) if keep]
 
     def _aggregate_rows(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Compute mean/median for selected pollutants."""
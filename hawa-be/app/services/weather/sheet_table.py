@@ -0,0 +1,380 @@
+"""
+Columnar, read-only representation of a cached sheet snapshot
+Header disimpan sekali (shared tuple), kolom angka sebagai NumPy arrays, kolom teks
+sebagai packed UTF-8 atau dictionary codes. Row dicts dibuat on demand, jadi caller lama
+(raw_data[-1], raw_data[offset:offset + limit], for record in raw_data) tetap jalan.
+"""
+import hashlib
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+_ABSENT = object()  # cell not in the record (row shorter than the header); never stored
+
+# _NumberColumn cell states
+_NUMBER, _EMPTY, _MISSING = 0, 1, 2
+
+_ITER_CHUNK = 1024
+
+
+class _NumberColumn:
+    """Numeric strings that round-trip exactly (numbers.astype(str) == cell), "" dan absent di state"""
+
+    def __init__(self, numbers: np.ndarray, state: Optional[np.ndarray]):
+        self.numbers = numbers
+        self.state = state  # uint8 per row (None = every cell is a number)
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def decode(self, start: int, stop: int) -> List[Any]:
+        text = self.numbers[start:stop].astype(str).tolist()
+        if self.state is None:
+            return text
+        cells = {_EMPTY: "", _MISSING: _ABSENT}
+        return [
+            value if state == _NUMBER else cells[state]
+            for value, state in zip(text, self.state[start:stop].tolist())
+        ]
+
+    def numeric(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        numbers = self.numbers[start:stop].astype(float)
+        if self.state is None:
+            return numbers, np.ones(len(numbers), dtype=bool)
+        present = self.state[start:stop] == _NUMBER
+        return np.where(present, numbers, np.nan), present
+
+    def digest(self, hasher, start: int, stop: int):
+        hasher.update(self.numbers.dtype.str.encode())
+        hasher.update(self.numbers[start:stop].tobytes())
+        if self.state is not None:
+            hasher.update(self.state[start:stop].tobytes())
+
+    def concat(self, other: "_NumberColumn") -> Optional["_NumberColumn"]:
+        if self.numbers.dtype != other.numbers.dtype:
+            return None
+        state = None
+        if self.state is not None or other.state is not None:
+            state = np.concatenate([
+                self.state if self.state is not None else np.zeros(len(self), dtype=np.uint8),
+                other.state if other.state is not None else np.zeros(len(other), dtype=np.uint8),
+            ])
+        return _NumberColumn(np.concatenate([self.numbers, other.numbers]), state)
+
+
+class _CategoryColumn:
+    """Low-cardinality strings (device, location, color): int32 codes + unique values (-1 = absent)"""
+
+    def __init__(self, codes: np.ndarray, categories: Tuple[str, ...]):
+        self.codes = codes
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def decode(self, start: int, stop: int) -> List[Any]:
+        lookup = np.empty(len(self.categories) + 1, dtype=object)
+        lookup[:-1] = self.categories
+        lookup[-1] = _ABSENT  # code -1 picks the last item
+        return lookup[self.codes[start:stop]].tolist()
+
+    def digest(self, hasher, start: int, stop: int):
+        hasher.update(repr(self.categories).encode("utf-8", "surrogatepass"))
+        hasher.update(self.codes[start:stop].tobytes())
+
+    def concat(self, other: "_CategoryColumn") -> "_CategoryColumn":
+        index = {value: code for code, value in enumerate(self.categories)}
+        for value in other.categories:
+            index.setdefault(value, len(index))
+        remap = np.array([index[value] for value in other.categories] + [-1], dtype=np.int32)
+        return _CategoryColumn(np.concatenate([self.codes, remap[other.codes]]), tuple(index))
+
+
+class _TextColumn:
+    """High-cardinality strings (timestamps): one UTF-8 blob + uint32 offsets"""
+
+    def __init__(self, blob: bytes, offsets: np.ndarray, present: Optional[np.ndarray], ascii: bool):
+        self.blob = blob
+        self.offsets = offsets  # len(rows) + 1, byte offsets into blob
+        self.present = present  # bool per row (None = every cell present)
+        self.ascii = ascii
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def decode(self, start: int, stop: int) -> List[Any]:
+        bounds = self.offsets[start:stop + 1].tolist()
+        if not bounds:
+            return []
+        base = bounds[0]
+        if self.ascii:
+            # Byte offsets == character offsets: decode the range once
+            text = self.blob[base:bounds[-1]].decode("ascii")
+            values = [text[bounds[i] - base:bounds[i + 1] - base] for i in range(len(bounds) - 1)]
+        else:
+            values = [self.blob[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+        if self.present is not None:
+            values = [value if flag else _ABSENT for value, flag in zip(values, self.present[start:stop].tolist())]
+        return values
+
+    def digest(self, hasher, start: int, stop: int):
+        offsets = self.offsets[start:stop + 1]
+        hasher.update((offsets - offsets[0]).tobytes())
+        hasher.update(self.blob[int(offsets[0]):int(offsets[-1])])
+        if self.present is not None:
+            hasher.update(self.present[start:stop].tobytes())
+
+    def concat(self, other: "_TextColumn") -> "_TextColumn":
+        present = None
+        if self.present is not None or other.present is not None:
+            present = np.concatenate([
+                self.present if self.present is not None else np.ones(len(self), dtype=bool),
+                other.present if other.present is not None else np.ones(len(other), dtype=bool),
+            ])
+        offsets = np.concatenate([self.offsets, other.offsets[1:] + self.offsets[-1]]).astype(np.uint32)
+        return _TextColumn(self.blob + other.blob, offsets, present, self.ascii and other.ascii)
+
+
+class _ValueColumn:
+    """Anything else (non-string cells, e.g. records from Excel/CSV), kept as a tuple"""
+
+    def __init__(self, values: Tuple[Any, ...], present: Optional[np.ndarray]):
+        self.values = values
+        self.present = present
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def decode(self, start: int, stop: int) -> List[Any]:
+        values = list(self.values[start:stop])
+        if self.present is None:
+            return values
+        return [value if flag else _ABSENT for value, flag in zip(values, self.present[start:stop].tolist())]
+
+    def digest(self, hasher, start: int, stop: int):
+        hasher.update(repr(self.values[start:stop]).encode("utf-8", "surrogatepass"))
+        if self.present is not None:
+            hasher.update(self.present[start:stop].tobytes())
+
+    def concat(self, other: "_ValueColumn") -> "_ValueColumn":
+        present = None
+        if self.present is not None or other.present is not None:
+            present = np.concatenate([
+                self.present if self.present is not None else np.ones(len(self), dtype=bool),
+                other.present if other.present is not None else np.ones(len(other), dtype=bool),
+            ])
+        return _ValueColumn(self.values + other.values, present)
+
+
+def _number_column(cells: np.ndarray, absent: np.ndarray) -> Optional[_NumberColumn]:
+    """Typed column jika setiap cell terisi adalah angka yang round-trip persis, selain itu None"""
+    empty = cells == ""
+    is_number = ~(absent | empty)
+    if not is_number.any():
+        return None
+    text = cells[is_number]
+    try:
+        float(text[0])
+    except ValueError:
+        return None  # cheap reject for text columns
+    text = text.astype(str)
+
+    for dtype in (np.int64, np.float64):
+        try:
+            parsed = text.astype(dtype)
+        except (ValueError, OverflowError):
+            continue
+        # "05", "1.50", "56,82" dan sejenisnya tetap teks supaya row view identik dengan aslinya
+        if not np.array_equal(parsed.astype(str), text):
+            continue
+        numbers = np.zeros(len(cells), dtype=dtype)
+        numbers[is_number] = parsed
+        if is_number.all():
+            return _NumberColumn(numbers, None)
+        state = np.where(absent, _MISSING, np.where(empty, _EMPTY, _NUMBER)).astype(np.uint8)
+        return _NumberColumn(numbers, state)
+    return None
+
+
+def _build_column(cells: List[Any]):
+    """Pick the most compact representation for one column (cells use _ABSENT for missing)"""
+    size = len(cells)
+    values = np.empty(size, dtype=object)
+    values[:] = cells
+    absent = values == _ABSENT
+    present = None if not absent.any() else ~absent
+
+    if not set(map(type, cells)) <= {str, object}:
+        # object = the _ABSENT marker
+        return _ValueColumn(tuple(None if cell is _ABSENT else cell for cell in cells), present)
+
+    numbers = _number_column(values, absent)
+    if numbers is not None:
+        return numbers
+
+    codes, categories = pd.factorize(np.where(absent, None, values), use_na_sentinel=True)
+    if len(categories) * 2 <= size:
+        return _CategoryColumn(codes.astype(np.int32), tuple(categories.tolist()))
+
+    strings = [cell if cell is not _ABSENT else "" for cell in cells]
+    joined = "".join(strings)
+    if joined.isascii():
+        blob, lengths = joined.encode("ascii"), [len(value) for value in strings]
+    else:
+        encoded = [value.encode("utf-8") for value in strings]
+        blob, lengths = b"".join(encoded), [len(value) for value in encoded]
+    offsets = np.zeros(size + 1, dtype=np.uint32)
+    if size:
+        np.cumsum(lengths, out=offsets[1:])
+    return _TextColumn(blob, offsets, present, joined.isascii())
+
+
+class SheetTable(Sequence):
+    """
+    Immutable columnar sheet snapshot yang berperilaku seperti List[Dict[str, Any]].
+    - Header tuple dipakai bersama, tidak diulang per row
+    - Numeric columns are int64/float64 arrays, only used when every value round-trips exactly
+    - table[i] / iteration build row dicts on demand (same keys and string values as the records)
+    - table[a:b] is a zero-copy view over the same columns
+    """
+
+    def __init__(self, header: Tuple[str, ...], columns: Tuple[Any, ...], start: int = 0, stop: int | None = None):
+        self.header = header
+        self._columns = columns
+        self._start = start
+        self._stop = (len(columns[0]) if columns else 0) if stop is None else stop
+        self._fingerprint: Optional[str] = None
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "SheetTable":
+        """Build table from raw records (no-op jika sudah SheetTable)"""
+        if isinstance(records, SheetTable):
+            return records
+        records = records if isinstance(records, list) else list(records)
+        header = tuple(dict.fromkeys(column for record in records for column in record))
+        columns = tuple(
+            _build_column([record.get(column, _ABSENT) for record in records])
+            for column in header
+        )
+        return cls(header, columns, 0, len(records))
+
+    @classmethod
+    def from_columns(cls, header: Iterable[str], columns: Iterable[List[Any]]) -> "SheetTable":
+        """Build table from per-column values (None = cell absent from the record)"""
+        header = tuple(header)
+        built = tuple(
+            _build_column([_ABSENT if value is None else value for value in values])
+            for values in columns
+        )
+        size = len(built[0]) if built else 0
+        return cls(header, built, 0, size)
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def _row(self, cells: Tuple[Any, ...]) -> Dict[str, Any]:
+        return {name: value for name, value in zip(self.header, cells) if value is not _ABSENT}
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return SheetTable(self.header, self._columns, self._start + start, self._start + max(start, stop))
+
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("SheetTable index out of range")
+        position = self._start + index
+        return self._row(tuple(column.decode(position, position + 1)[0] for column in self._columns))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        # Decode column-wise per chunk, then zip into row dicts
+        header = self.header
+        for chunk_start in range(self._start, self._stop, _ITER_CHUNK):
+            chunk_stop = min(chunk_start + _ITER_CHUNK, self._stop)
+            decoded = [column.decode(chunk_start, chunk_stop) for column in self._columns]
+            complete = not any(_ABSENT in values for values in decoded)
+            for cells in zip(*decoded):
+                yield dict(zip(header, cells)) if complete else self._row(cells)
+
+    def __repr__(self) -> str:
+        return f"SheetTable(rows={len(self)}, columns={list(self.header)})"
+
+    def fingerprint(self) -> str:
+        """
+        Content hash (header + cells), computed once per table.
+        Equal for tables built from the same records, e.g. the same snapshot unpickled twice
+        from a shared cache backend, so derived data can be memoized across objects.
+        """
+        fingerprint = getattr(self, "_fingerprint", None)  # tables pickled before this existed
+        if fingerprint is None:
+            hasher = hashlib.blake2b(repr(self.header).encode("utf-8", "surrogatepass"), digest_size=16)
+            hasher.update(str(len(self)).encode())
+            for column in self._columns:
+                hasher.update(type(column).__name__.encode())
+                column.digest(hasher, self._start, self._stop)
+            fingerprint = self._fingerprint = hasher.hexdigest()
+        return fingerprint
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Materialize as a plain list of dicts (JSON responses)"""
+        return list(self)
+
+    def _column(self, name: str):
+        try:
+            return self._columns[self.header.index(name)]
+        except ValueError:
+            raise KeyError(name) from None
+
+    def column_values(self, name: str) -> List[Any]:
+        """Raw cell values of one column (None = absent)"""
+        return [
+            None if value is _ABSENT else value
+            for value in self._column(name).decode(self._start, self._stop)
+        ]
+
+    def numeric(self, name: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        (float64 values, present mask) untuk kolom yang tersimpan sebagai angka
+
+        Returns:
+            None jika kolom disimpan sebagai teks (caller parse sendiri)
+        """
+        column = self._column(name)
+        if not isinstance(column, _NumberColumn):
+            return None
+        return column.numeric(self._start, self._stop)
+
+    def series(self, name: str) -> pd.Series:
+        """One column as in pd.DataFrame.from_records(records)[name] (NaN = absent)"""
+        values = self._column(name).decode(self._start, self._stop)
+        return pd.Series([np.nan if value is _ABSENT else value for value in values], name=name)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Same frame as pd.DataFrame.from_records(records): string cells, NaN for absent cells"""
+        if not len(self):
+            return pd.DataFrame()
+        return pd.DataFrame({name: self.series(name) for name in self.header})
+
+    def append_records(self, records: List[Dict[str, Any]]) -> "SheetTable":
+        """New table with records appended (this table is not modified, views stay valid)"""
+        if not records:
+            return self
+        tail = SheetTable.from_records(records)
+        full = self._start == 0 and self._stop == (len(self._columns[0]) if self._columns else 0)
+        if not full or tail.header != self.header:
+            return SheetTable.from_records(list(self) + list(tail))
+
+        columns = []
+        for column, other in zip(self._columns, tail._columns):
+            merged = column.concat(other) if type(column) is type(other) else None
+            if merged is None:
+                merged = _build_column(column.decode(0, len(column)) + other.decode(0, len(other)))
+            columns.append(merged)
+        return SheetTable(self.header, tuple(columns), 0, len(self) + len(tail))
+
@@ -5,10 +5,63 @@ Improved with thread-safety, auto cleanup, and memory limit
 """
 import time
 import threading
-from collections import OrderedDict
-from typing import Dict, List, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Any, Tuple
 
-from app.services.weather.spreadsheet_service import SpreadsheetService
+from app.core.config import get_settings
+from app.services.weather.cache_backend import (
+    CacheBackend,
+    CacheEntry,
+    InProcessCacheBackend,
+    create_cache_backend
+)
+from app.services.weather.sheet_table import SheetTable
+from app.services.weather.sheets_client_pool import get_error_status, get_sheets_client_pool
+from app.services.weather.sheets_quota import (
+    SheetsPriority,
+    current_sheets_priority,
+    is_rate_limit_error,
+    sheets_priority
+)
+from app.services.weather.sheets_snapshot_store import SheetSnapshotStore, get_sheet_snapshot_store
+from app.services.weather.sheets_tail_reader import get_sheets_tail_reader
+from app.services.weather.spreadsheet_service import SpreadsheetService, a1_range
+
+
+def _is_upstream_unavailable(error: Exception) -> bool:
+    """Rate limited, Google 5xx, or network failure (cached/snapshot data may be served instead)"""
+    if is_rate_limit_error(error):
+        return True
+    status_code = get_error_status(error)
+    if status_code is not None:
+        return status_code >= 500
+    # requests' ConnectionError/Timeout are OSError subclasses
+    return isinstance(error, (OSError, TimeoutError))
+
+
+class _InFlightFetch:
+    """Result holder for an upstream fetch that other callers can wait on"""
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self._result: SheetTable | None = None
+        self._error: Exception | None = None
+    
+    def set_result(self, result: SheetTable):
+        self._result = result
+        self._event.set()
+    
+    def set_error(self, error: Exception):
+        self._error = error
+        self._event.set()
+    
+    def wait(self, timeout: float) -> SheetTable:
+        if not self._event.wait(timeout):
+            raise TimeoutError(f"Timed out after {timeout}s waiting for in-flight Google Sheets fetch")
+        if self._error is not None:
+            raise self._error
+        return self._result
 
 
 class SheetsCacheService:
@@ -17,32 +70,134 @@ class SheetsCacheService:
     Features:
     - Thread-safe for concurrent requests
     - Auto cleanup expired entries (prevent memory leak)
-    - Memory limit (prevent OOM)
+    - Memory limit (prevent OOM): entry count plus an optional byte budget,
+      least recently used sheets are evicted first (sizes in get_stats)
     - Better error handling
+    - Single-flight fetch per key (concurrent misses share one upstream call)
+    - Optional stale-while-revalidate with a hard max-staleness bound
+    - Pluggable storage backend (in-process, shared disk, Redis); with a shared
+      backend workers reuse each other's snapshots and take a cross-process fetch lock
+    - Optional change detection: expired entries are revalidated with a cheap Drive
+      revision probe and kept (TTL extended) when the spreadsheet did not change
+    - Sheets are cached as columnar SheetTables (shared header, typed numeric columns,
+      zero-copy slices); rows are built as dicts on access
+    - Optional durable last-good snapshot on disk: served on cold start and when
+      Google Sheets is unavailable (see get_freshness for the staleness flag)
     """
     
-    def __init__(self, ttl_seconds: int = 30, max_size: int = 500):
+    def __init__(
+        self,
+        ttl_seconds: int = 30,
+        max_size: int = 500,
+        max_bytes: int | None = None,
+        stale_while_revalidate: bool = False,
+        max_staleness_seconds: int = 300,
+        background_workers: int = 4,
+        backend: CacheBackend | None = None,
+        change_detection: bool = False,
+        snapshot_store: SheetSnapshotStore | None = None,
+        snapshot_max_age_seconds: float = 86400
+    ):
         """
         Initialize cache service
         
         Args:
             ttl_seconds: Time to live in seconds
             max_size: Maximum entries in cache
+            max_bytes: Byte budget for the default in-process backend (estimated footprint per sheet)
+            stale_while_revalidate: Serve expired entries immediately and refresh in background
+            max_staleness_seconds: Hard bound on entry age served in stale-while-revalidate mode
+            background_workers: Threads used for background refreshes
+            backend: Storage backend (default: in-process LRU bounded by max_size / max_bytes)
+            change_detection: Probe the spreadsheet revision before re-downloading an expired entry
+            snapshot_store: Durable last-good snapshots (None = memory only)
+            snapshot_max_age_seconds: Oldest snapshot served without waiting for Google on a cold miss
         """
-        self._cache: OrderedDict[str, Tuple[List[Dict[str, Any]], float]] = OrderedDict()
+        self._backend = backend or InProcessCacheBackend(max_size=max_size, max_bytes=max_bytes)
         self._lock = threading.RLock()  # Reentrant lock
         self.ttl_seconds = ttl_seconds
         self.max_size = max_size
+        self.max_bytes = max_bytes
         self._service = SpreadsheetService()
         self._last_cleanup = time.time()
         self._cleanup_interval = 60  # Cleanup every 60 seconds
+        self._in_flight: Dict[str, _InFlightFetch] = {}
+        self.fetch_wait_timeout = 60  # Max seconds a coalesced caller waits for the leader
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_staleness_seconds = max_staleness_seconds
+        self.background_workers = background_workers
+        self._refresh_intervals: Dict[str, float] = {}
+        self._executor: ThreadPoolExecutor | None = None
+        self.change_detection = change_detection
+        self._revisions: Dict[str, str] = {}  # cache_key -> spreadsheet revision of the cached data
+        self._fetched: set = set()  # cache_keys this process has loaded fresh data for
+        self._snapshot_store = snapshot_store
+        self.snapshot_max_age_seconds = snapshot_max_age_seconds
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "stale_served": 0,
+            "background_refreshes": 0,
+            "peer_fetches": 0,
+            "revalidated_unchanged": 0,
+            "snapshot_served": 0,
+        }
+
+    @staticmethod
+    def _is_append_only(spreadsheet_id: str) -> bool:
+        """Append-only IoT sheets can be read incrementally (only new rows are fetched)"""
+        settings = get_settings()
+        append_only_ids = {sid.strip() for sid in settings.append_only_sheet_ids.split(",") if sid.strip()}
+        if settings.google_sheets_id:
+            append_only_ids.add(settings.google_sheets_id)
+        return spreadsheet_id in append_only_ids
+
+    def _fetch(self, spreadsheet_id: str, worksheet_name: str) -> SheetTable:
+        """Fetch sheet data from upstream (incremental tail read for append-only sheets)"""
+        if self._is_append_only(spreadsheet_id):
+            return get_sheets_tail_reader().read(
+                spreadsheet_id=spreadsheet_id,
+                worksheet_name=worksheet_name
+            )
+        return SheetTable.from_records(self._service.read_from_google_sheets(
+            spreadsheet_id=spreadsheet_id,
+            worksheet_name=worksheet_name
+        ))
+    
+    def set_refresh_interval(self, spreadsheet_id: str, worksheet_name: str, seconds: float):
+        """
+        Override refresh interval (TTL) for a single sheet
+        
+        Args:
+            spreadsheet_id: Google Sheets ID
+            worksheet_name: Worksheet name
+            seconds: Refresh interval in seconds
+        """
+        with self._lock:
+            self._refresh_intervals[f"{spreadsheet_id}:{worksheet_name}"] = seconds
+    
+    def _ttl_for(self, cache_key: str) -> float:
+        return self._refresh_intervals.get(cache_key, self.ttl_seconds)
+    
+    def _retention_seconds(self, cache_key: str) -> float:
+        """How long an entry may still be served (stale) after it was fetched"""
+        ttl = self._ttl_for(cache_key)
+        if self.stale_while_revalidate:
+            return max(ttl, self.max_staleness_seconds)
+        return ttl
+    
+    def _backend_ttl(self, cache_key: str) -> float:
+        """Backend keeps entries a bit longer so errors (429) can still fall back to them"""
+        return max(self._retention_seconds(cache_key), self._cleanup_interval)
     
     def get_cached_data(
         self,
         spreadsheet_id: str,
         worksheet_name: str,
-        force_refresh: bool = False
-    ) -> List[Dict[str, Any]]:
+        force_refresh: bool = False,
+        priority: SheetsPriority | None = None
+    ) -> SheetTable:
         """
         Get Google Sheets data with caching to reduce API calls
         
@@ -50,52 +205,309 @@ class SheetsCacheService:
             spreadsheet_id: Google Sheets ID
             worksheet_name: Worksheet name
             force_refresh: Force refresh from Google Sheets (bypass cache)
+            priority: Quota priority for the upstream fetch (default: current sheets_priority context)
         
         Returns:
-            List of dictionaries with data from spreadsheet
+            SheetTable (read-only, behaves like a list of dictionaries)
         """
         cache_key = f"{spreadsheet_id}:{worksheet_name}"
+        priority = current_sheets_priority() if priority is None else priority
         current_time = time.time()
         
         # Periodic cleanup
         self._periodic_cleanup()
         
+        # Check cache if not force refresh (backend lookup outside the lock, it may do I/O)
+        entry = None if force_refresh else self._backend.get(cache_key)
+        
+        # Miss: the on-disk last-good snapshot can answer without waiting for Google
+        if entry is None and not force_refresh and self._snapshot_store is not None:
+            snapshot = self._snapshot_store.get(cache_key)
+            if snapshot is not None and self._snapshot_servable(cache_key, snapshot.age_seconds):
+                with self._lock:
+                    self._stats["snapshot_served"] += 1
+                    self._start_background_refresh(cache_key, spreadsheet_id, worksheet_name, priority)
+                return snapshot.records()
+        
         with self._lock:
-            # Check cache if not force refresh
-            if not force_refresh and cache_key in self._cache:
-                cached_data, cache_timestamp = self._cache[cache_key]
-                if current_time - cache_timestamp < self.ttl_seconds:
-                    # Move to end (LRU)
-                    self._cache.move_to_end(cache_key)
+            if entry is not None:
+                cached_data, cache_timestamp = entry
+                age = current_time - cache_timestamp
+                if age < self._ttl_for(cache_key):
+                    self._stats["hits"] += 1
                     return cached_data
-                else:
-                    # Expired, remove from cache
-                    del self._cache[cache_key]
+                
+                # Stale-while-revalidate: serve snapshot now, refresh in background
+                if self.stale_while_revalidate and age < self.max_staleness_seconds:
+                    self._stats["stale_served"] += 1
+                    self._start_background_refresh(cache_key, spreadsheet_id, worksheet_name, priority)
+                    return cached_data
+            
+            # Single-flight: only one upstream fetch per key at a time
+            flight = self._in_flight.get(cache_key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _InFlightFetch()
+                self._in_flight[cache_key] = flight
+                self._stats["misses"] += 1
+            elif (
+                entry is not None
+                and current_time - entry.stored_at < self._retention_seconds(cache_key)
+            ):
+                # Someone is already refreshing this key, serve the stale value
+                self._stats["stale_served"] += 1
+                return entry.value
+            else:
+                self._stats["coalesced"] += 1
         
-        # Fetch fresh data
+        if not is_leader:
+            return flight.wait(self.fetch_wait_timeout)
+        
+        with sheets_priority(priority):
+            return self._refresh(cache_key, spreadsheet_id, worksheet_name, flight, force=force_refresh)
+    
+    def _snapshot_servable(self, cache_key: str, age_seconds: float) -> bool:
+        """
+        Whether a snapshot may be served without blocking on a miss: up to snapshot_max_age_seconds
+        on a cold start (key never fetched by this process), afterwards (idle expiry, eviction)
+        only within the same max-staleness bound as stale-while-revalidate
+        """
+        with self._lock:
+            fetched = cache_key in self._fetched
+        if not fetched:
+            return age_seconds < self.snapshot_max_age_seconds
+        return self.stale_while_revalidate and age_seconds < self.max_staleness_seconds
+
+    def _mark_fetched(self, cache_key: str):
+        with self._lock:
+            self._fetched.add(cache_key)
+
+    def _refresh(
+        self,
+        cache_key: str,
+        spreadsheet_id: str,
+        worksheet_name: str,
+        flight: _InFlightFetch,
+        force: bool = False
+    ) -> SheetTable:
+        """Fetch fresh data as the single in-flight leader for cache_key"""
+        started_at = time.time()
+        locked = False
         try:
-            raw_data = self._service.read_from_google_sheets(
-                spreadsheet_id=spreadsheet_id,
-                worksheet_name=worksheet_name
-            )
+            # Shared backend: only one worker process fetches, the others pick up its result
+            locked = self._backend.acquire_lock(cache_key, self.fetch_wait_timeout)
+            if not locked:
+                peer_entry = self._wait_for_peer(cache_key, started_at)
+                if peer_entry is not None:
+                    self._mark_fetched(cache_key)
+                    flight.set_result(peer_entry.value)
+                    return peer_entry.value
+                locked = self._backend.acquire_lock(cache_key, self.fetch_wait_timeout)
+            
+            # Probe before downloading: a change made during the download shows up on the next probe
+            revision = self._probe_revision(spreadsheet_id) if self.change_detection else None
+            if revision is not None and not force:
+                unchanged = self._extend_if_unchanged(cache_key, revision)
+                if unchanged is not None:
+                    self._mark_fetched(cache_key)
+                    flight.set_result(unchanged)
+                    return unchanged
             
+            raw_data = self._fetch(spreadsheet_id, worksheet_name)
+            self._backend.set(cache_key, raw_data, ttl_seconds=self._backend_ttl(cache_key))
             with self._lock:
-                # Remove oldest if at max size
-                if len(self._cache) >= self.max_size:
-                    self._cache.popitem(last=False)
-                
-                self._cache[cache_key] = (raw_data, current_time)
+                if revision is not None:
+                    self._revisions[cache_key] = revision
+                else:
+                    self._revisions.pop(cache_key, None)
+            self._save_snapshot(cache_key, raw_data, revision)
+            self._mark_fetched(cache_key)
             
+            flight.set_result(raw_data)
             return raw_data
         except Exception as e:
-            # Fallback to cached data if rate limit or error
-            with self._lock:
-                if cache_key in self._cache:
-                    error_msg = str(e)
-                    if "429" in error_msg or "Quota exceeded" in error_msg or "rate limit" in error_msg.lower():
-                        cached_data, _ = self._cache[cache_key]
-                        return cached_data
+            # Fallback to cached data (memory, then last-good snapshot on disk) if Sheets is unavailable
+            if _is_upstream_unavailable(e):
+                entry = self._backend.get(cache_key)
+                if entry is not None:
+                    flight.set_result(entry.value)
+                    return entry.value
+                snapshot = self._snapshot_store.get(cache_key) if self._snapshot_store else None
+                if snapshot is not None:
+                    print(f"[sheets_cache] Serving snapshot for {cache_key} ({snapshot.age_seconds:.0f}s old): {e}")
+                    with self._lock:
+                        self._stats["snapshot_served"] += 1
+                    records = snapshot.records()
+                    flight.set_result(records)
+                    return records
+            flight.set_error(e)
             raise
+        finally:
+            if locked:
+                self._backend.release_lock(cache_key)
+            with self._lock:
+                if self._in_flight.get(cache_key) is flight:
+                    del self._in_flight[cache_key]
+    
+    def _probe_revision(self, spreadsheet_id: str) -> str | None:
+        """Spreadsheet revision from the client pool (None = unknown, download as usual)"""
+        return get_sheets_client_pool().get_revision(spreadsheet_id)
+    
+    def _extend_if_unchanged(self, cache_key: str, revision: str) -> SheetTable | None:
+        """
+        Re-store the cached data with a fresh timestamp if it was fetched at this revision
+        
+        Returns:
+            Cached data (TTL extended), or None if the sheet changed / nothing is cached
+        """
+        with self._lock:
+            known_revision = self._revisions.get(cache_key)
+        entry = self._backend.get(cache_key) if known_revision == revision else None
+        if entry is None:
+            # After a restart the disk snapshot may still be at this revision
+            snapshot = self._snapshot_store.get(cache_key) if self._snapshot_store else None
+            if snapshot is None or snapshot.revision != revision:
+                return None
+            records = snapshot.records()
+            self._backend.set(cache_key, records, ttl_seconds=self._backend_ttl(cache_key))
+            with self._lock:
+                self._revisions[cache_key] = revision
+                self._stats["revalidated_unchanged"] += 1
+            return records
+        self._backend.set(cache_key, entry.value, ttl_seconds=self._backend_ttl(cache_key))
+        with self._lock:
+            self._stats["revalidated_unchanged"] += 1
+        return entry.value
+    
+    def _save_snapshot(self, cache_key: str, data: SheetTable, revision: str | None):
+        """Persist last-good snapshot in the background (throttled by the store)"""
+        if self._snapshot_store is None:
+            return
+        
+        def save():
+            try:
+                self._snapshot_store.save(cache_key, data, revision=revision)
+            except Exception as e:
+                print(f"[sheets_cache] Snapshot save failed for {cache_key}: {e}")
+        
+        self._get_executor().submit(save)
+    
+    def get_freshness(self, spreadsheet_id: str, worksheet_name: str) -> Dict[str, Any] | None:
+        """
+        Freshness of the data get_cached_data currently serves for a sheet
+        
+        Returns:
+            {"source": "cache" | "snapshot", "fetched_at", "age_seconds", "stale"}, None jika belum ada data
+        """
+        cache_key = f"{spreadsheet_id}:{worksheet_name}"
+        entry = self._backend.get(cache_key)
+        if entry is not None:
+            source, fetched_at = "cache", entry.stored_at
+            stale = time.time() - fetched_at >= self._ttl_for(cache_key)
+        else:
+            snapshot = self._snapshot_store.get(cache_key) if self._snapshot_store else None
+            if snapshot is None:
+                return None
+            source, fetched_at, stale = "snapshot", snapshot.fetched_at, True
+        
+        return {
+            "source": source,
+            "fetched_at": datetime.fromtimestamp(fetched_at, timezone.utc).isoformat(),
+            "age_seconds": round(max(0.0, time.time() - fetched_at), 1),
+            "stale": stale
+        }
+    
+    def _wait_for_peer(self, cache_key: str, started_at: float) -> CacheEntry | None:
+        """
+        Wait for another worker holding the fetch lock to store a fresh entry
+        
+        Returns:
+            Entry stored after started_at, or None if the lock was freed without one / timed out
+        """
+        deadline = started_at + self.fetch_wait_timeout
+        delay = 0.05
+        while time.time() < deadline:
+            entry = self._backend.get(cache_key)
+            if entry is not None and entry.stored_at >= started_at:
+                with self._lock:
+                    self._stats["peer_fetches"] += 1
+                return entry
+            if self._backend.acquire_lock(cache_key, self.fetch_wait_timeout):
+                # Peer finished (or died) without a newer entry, fetch ourselves
+                self._backend.release_lock(cache_key)
+                return None
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+        return None
+    
+    def _start_background_refresh(
+        self,
+        cache_key: str,
+        spreadsheet_id: str,
+        worksheet_name: str,
+        priority: SheetsPriority
+    ):
+        """Submit a background refresh unless one is already in flight (caller holds self._lock)"""
+        if cache_key in self._in_flight:
+            return
+        flight = _InFlightFetch()
+        self._in_flight[cache_key] = flight
+        self._stats["background_refreshes"] += 1
+        self._get_executor().submit(
+            self._background_refresh, cache_key, spreadsheet_id, worksheet_name, flight, priority
+        )
+    
+    def _background_refresh(
+        self,
+        cache_key: str,
+        spreadsheet_id: str,
+        worksheet_name: str,
+        flight: _InFlightFetch,
+        priority: SheetsPriority
+    ):
+        """Background refresh job (errors are logged, stale entry stays in place)"""
+        try:
+            # Executor threads don't inherit the caller's context, re-apply its priority
+            with sheets_priority(priority):
+                self._refresh(cache_key, spreadsheet_id, worksheet_name, flight)
+        except Exception as e:
+            print(f"[sheets_cache] Background refresh failed for {cache_key}: {e}")
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Lazily create the background refresh pool"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.background_workers,
+                thread_name_prefix="sheets-refresh"
+            )
+        return self._executor
+    
+    def prime(
+        self,
+        spreadsheet_id: str,
+        worksheet_name: str,
+        data: Iterable[Dict[str, Any]],
+        revision: str | None = None
+    ):
+        """
+        Store data fetched elsewhere (mis. batched read) as a fresh cache entry
+        
+        Args:
+            spreadsheet_id: Google Sheets ID
+            worksheet_name: Worksheet name
+            data: Records in read_from_google_sheets format (or a SheetTable)
+            revision: Spreadsheet revision probed before the read (enables change detection)
+        """
+        cache_key = f"{spreadsheet_id}:{worksheet_name}"
+        data = SheetTable.from_records(data)
+        self._backend.set(cache_key, data, ttl_seconds=self._backend_ttl(cache_key))
+        with self._lock:
+            if revision is not None:
+                self._revisions[cache_key] = revision
+            else:
+                self._revisions.pop(cache_key, None)
+            self._fetched.add(cache_key)
+        self._save_snapshot(cache_key, data, revision)
     
     def _periodic_cleanup(self):
         """Periodic cleanup expired entries"""
@@ -110,28 +522,29 @@ class SheetsCacheService:
     
     def cleanup_expired(self):
         """Remove expired entries"""
-        with self._lock:
-            current_time = time.time()
-            expired_keys = [
-                key for key, (_, timestamp) in self._cache.items()
-                if current_time - timestamp >= self.ttl_seconds
-            ]
-            for key in expired_keys:
-                del self._cache[key]
+        try:
+            self._backend.cleanup_expired()
+        except Exception as e:
+            print(f"[sheets_cache] Cleanup failed: {e}")
     
     def clear_cache(self):
         """Clear all cached data"""
-        with self._lock:
-            self._cache.clear()
+        self._backend.clear()
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
+        entries = self._backend.entries()
+        try:
+            bytes_per_key = self._backend.entry_sizes()
+        except Exception as e:
+            print(f"[sheets_cache] Entry sizes unavailable: {e}")
+            bytes_per_key = {}
         with self._lock:
             current_time = time.time()
-            total_entries = len(self._cache)
+            total_entries = len(entries)
             expired_count = sum(
-                1 for _, (_, timestamp) in self._cache.items()
-                if current_time - timestamp >= self.ttl_seconds
+                1 for key, timestamp in entries.items()
+                if current_time - timestamp >= self._ttl_for(key)
             )
             
             return {
@@ -139,23 +552,79 @@ class SheetsCacheService:
                 "valid_entries": total_entries - expired_count,
                 "expired_entries": expired_count,
                 "max_size": self.max_size,
-                "ttl_seconds": self.ttl_seconds
+                "max_bytes": self.max_bytes,
+                "total_bytes": sum(bytes_per_key.values()),
+                "bytes_per_key": bytes_per_key,
+                "ttl_seconds": self.ttl_seconds,
+                "refresh_intervals": dict(self._refresh_intervals),
+                "stale_while_revalidate": self.stale_while_revalidate,
+                "max_staleness_seconds": self.max_staleness_seconds,
+                "in_flight": len(self._in_flight),
+                "backend": self._backend.get_stats(),
+                "snapshots": self._snapshot_store is not None,
+                **self._stats
             }
 
 
 # Global instances for shared cache
+_settings = get_settings()
+
 # Standard cache (30 seconds for normal use)
-_sheets_cache_service = SheetsCacheService(ttl_seconds=30, max_size=500)
+_sheets_cache_service = SheetsCacheService(
+    ttl_seconds=30,
+    max_size=500,
+    max_bytes=_settings.sheets_cache_max_bytes,
+    stale_while_revalidate=_settings.sheets_stale_while_revalidate,
+    max_staleness_seconds=_settings.sheets_max_staleness_seconds,
+    backend=create_cache_backend("sheets", max_size=500, max_bytes=_settings.sheets_cache_max_bytes),
+    change_detection=_settings.sheets_change_detection,
+    snapshot_store=get_sheet_snapshot_store(),
+    snapshot_max_age_seconds=_settings.sheets_snapshot_max_age_seconds
+)
 
 # Realtime cache (1 second for realtime data)
-_realtime_cache_service = SheetsCacheService(ttl_seconds=1, max_size=500)
+_realtime_cache_service = SheetsCacheService(
+    ttl_seconds=1,
+    max_size=500,
+    max_bytes=_settings.sheets_cache_max_bytes,
+    stale_while_revalidate=_settings.sheets_stale_while_revalidate,
+    max_staleness_seconds=_settings.realtime_max_staleness_seconds,
+    backend=create_cache_backend("sheets_realtime", max_size=500, max_bytes=_settings.sheets_cache_max_bytes),
+    change_detection=_settings.sheets_change_detection,
+    snapshot_store=get_sheet_snapshot_store(),
+    snapshot_max_age_seconds=_settings.sheets_snapshot_max_age_seconds
+)
+
+
+def _parse_refresh_intervals(spec: str) -> List[Tuple[str, str, float]]:
+    """Parse SHEETS_REFRESH_INTERVALS ("<spreadsheet_id>[:<worksheet>]=<seconds>,...", worksheet default Sheet1)"""
+    intervals = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        sheet, _, seconds = item.rpartition("=")
+        spreadsheet_id, _, worksheet_name = sheet.strip().partition(":")
+        try:
+            interval = float(seconds)
+        except ValueError:
+            interval = 0
+        if not spreadsheet_id or interval <= 0:
+            print(f"[sheets_cache] Ignoring invalid SHEETS_REFRESH_INTERVALS entry '{item.strip()}'")
+            continue
+        intervals.append((spreadsheet_id, worksheet_name.strip() or "Sheet1", interval))
+    return intervals
+
+
+for _spreadsheet_id, _worksheet_name, _interval in _parse_refresh_intervals(_settings.sheets_refresh_intervals):
+    _sheets_cache_service.set_refresh_interval(_spreadsheet_id, _worksheet_name, _interval)
 
 
 def get_cached_sheets_data(
     spreadsheet_id: str,
     worksheet_name: str,
-    force_refresh: bool = False
-) -> List[Dict[str, Any]]:
+    force_refresh: bool = False,
+    priority: SheetsPriority | None = None
+) -> SheetTable:
     """
     Convenience function to get cached sheets data
     Uses global cache service instance (standard cache)
@@ -163,15 +632,17 @@ def get_cached_sheets_data(
     return _sheets_cache_service.get_cached_data(
         spreadsheet_id=spreadsheet_id,
         worksheet_name=worksheet_name,
-        force_refresh=force_refresh
+        force_refresh=force_refresh,
+        priority=priority
     )
 
 
 def get_realtime_sheets_data(
     spreadsheet_id: str,
     worksheet_name: str,
-    force_refresh: bool = False
-) -> List[Dict[str, Any]]:
+    force_refresh: bool = False,
+    priority: SheetsPriority | None = None
+) -> SheetTable:
     """
     Get cached sheets data with 1 second TTL for realtime data
     Uses realtime cache service instance
@@ -179,7 +650,97 @@ def get_realtime_sheets_data(
     return _realtime_cache_service.get_cached_data(
         spreadsheet_id=spreadsheet_id,
         worksheet_name=worksheet_name,
-        force_refresh=force_refresh
+        force_refresh=force_refresh,
+        priority=priority
     )
 
 
+def get_sheets_cache_stats() -> Dict[str, Any]:
+    """Stats of both sheets caches (entries, bytes per key, hit/miss counters)"""
+    return {
+        "standard": _sheets_cache_service.get_stats(),
+        "realtime": _realtime_cache_service.get_stats()
+    }
+
+
+def get_sheets_freshness(
+    spreadsheet_id: str,
+    worksheet_name: str,
+    realtime: bool = False
+) -> Dict[str, Any] | None:
+    """Freshness info (source, age, stale flag) for data served by get_cached_sheets_data / get_realtime_sheets_data"""
+    service = _realtime_cache_service if realtime else _sheets_cache_service
+    return service.get_freshness(spreadsheet_id, worksheet_name)
+
+
+def get_dashboard_sheets() -> List[Tuple[str, str]]:
+    """(spreadsheet_id, worksheet_name) pairs read by the dashboards (IoT sheet + heatmap sheet)"""
+    settings = get_settings()
+    sheets = [(settings.heatmap_sheets_id, "Sheet1")]
+    if settings.google_sheets_id:
+        sheets.insert(0, (settings.google_sheets_id, "Sheet1"))
+    return sheets
+
+
+def refresh_sheets_batch(
+    sheets: Iterable[Tuple[str, str]] | None = None,
+    priority: SheetsPriority | None = None
+) -> Dict[Tuple[str, str], SheetTable]:
+    """
+    Refresh several sheets with one values.batchGet request per spreadsheet
+    and store the results in both the standard and realtime cache.
+    Append-only sheets only request the rows after the last ingested row.
+    
+    Args:
+        sheets: (spreadsheet_id, worksheet_name) pairs (default: get_dashboard_sheets())
+        priority: Quota priority (default: current sheets_priority context)
+    
+    Returns:
+        (spreadsheet_id, worksheet_name) -> records
+    """
+    sheets = list(dict.fromkeys(sheets if sheets is not None else get_dashboard_sheets()))
+    tail_reader = get_sheets_tail_reader()
+    
+    # (spreadsheet_id, worksheet_name) -> (A1 range, tail start or None for whole sheet)
+    plans: Dict[Tuple[str, str], Tuple[str, int | None]] = {}
+    ranges_by_spreadsheet: Dict[str, List[str]] = {}
+    for spreadsheet_id, worksheet_name in sheets:
+        tail_plan = None
+        if SheetsCacheService._is_append_only(spreadsheet_id):
+            tail_plan = tail_reader.plan_batch_range(spreadsheet_id, worksheet_name)
+        if tail_plan is not None:
+            cells, after_row_index = tail_plan
+            plans[(spreadsheet_id, worksheet_name)] = (a1_range(worksheet_name, cells), after_row_index)
+        else:
+            plans[(spreadsheet_id, worksheet_name)] = (a1_range(worksheet_name), None)
+        ranges_by_spreadsheet.setdefault(spreadsheet_id, []).append(plans[(spreadsheet_id, worksheet_name)][0])
+    
+    service = SpreadsheetService()
+    priority = current_sheets_priority() if priority is None else priority
+    revisions: Dict[str, str | None] = {}
+    if _settings.sheets_change_detection:
+        # Probed before the read so the caches can revalidate these snapshots later
+        revisions = {
+            spreadsheet_id: get_sheets_client_pool().get_revision(spreadsheet_id)
+            for spreadsheet_id in ranges_by_spreadsheet
+        }
+    
+    with sheets_priority(priority):
+        values = service.batch_read_ranges(ranges_by_spreadsheet)
+        
+        results: Dict[Tuple[str, str], SheetTable] = {}
+        for (spreadsheet_id, worksheet_name), (range_name, after_row_index) in plans.items():
+            sheet_values = values.get((spreadsheet_id, range_name), [])
+            if SheetsCacheService._is_append_only(spreadsheet_id):
+                # Keep the tail reader's row log in sync with what we just fetched
+                records = tail_reader.apply_batch_values(spreadsheet_id, worksheet_name, sheet_values, after_row_index)
+                if records is None:
+                    records = tail_reader.read(spreadsheet_id, worksheet_name, full_resync=True)
+            else:
+                records = SheetTable.from_records(service._values_to_records(sheet_values))
+            
+            for cache in (_sheets_cache_service, _realtime_cache_service):
+                cache.prime(spreadsheet_id, worksheet_name, records, revision=revisions.get(spreadsheet_id))
+            results[(spreadsheet_id, worksheet_name)] = records
+    
+    return results
@@ -0,0 +1,404 @@
+"""
+Process-wide pool of authorized gspread clients and opened worksheet handles
+Avoids re-parsing credentials, minting tokens, and re-opening spreadsheets
+on every Google Sheets read
+"""
+import base64
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Set, Tuple, TypeVar
+
+from app.services.weather.sheets_quota import get_sheets_quota_budgeter
+
+T = TypeVar("T")
+
+GOOGLE_API_SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets.readonly',
+    # Drive file metadata (version/modifiedTime) for cheap change detection
+    'https://www.googleapis.com/auth/drive.metadata.readonly',
+]
+
+# Seconds to stop probing a spreadsheet's Drive revision after the probe is refused
+_PROBE_DISABLE_SECONDS = 600
+
+# HTTP status codes that mean a cached handle (or its token) is no longer usable:
+# 400 = worksheet renamed/deleted (range can't be parsed), 401 = token revoked,
+# 403 = permission removed, 404 = spreadsheet/worksheet deleted
+_STALE_HANDLE_STATUS = {400, 401, 403, 404}
+_AUTH_STATUS = {401, 403}
+
+
+def load_google_credentials(credentials_path: str | None = None):
+    """
+    Load Google service account credentials
+
+    Args:
+        credentials_path: Path ke Google credentials JSON (optional, bisa dari env)
+
+    Returns:
+        google.oauth2.service_account.Credentials
+    """
+    try:
+        from google.oauth2.service_account import Credentials
+    except ImportError:
+        raise ImportError(
+            "gspread and google-auth required for Google Sheets. "
+            "Install with: pip install gspread google-auth google-auth-oauthlib google-auth-httplib2"
+        )
+
+    if credentials_path:
+        return Credentials.from_service_account_file(credentials_path, scopes=GOOGLE_API_SCOPES)
+
+    # Try to get from environment variable (JSON string)
+    creds_json = os.getenv("GOOGLE_SHEETS_CREDENTIALS_JSON")
+    creds_b64 = os.getenv("GOOGLE_SHEETS_CREDENTIALS_B64") or os.getenv("GOOGLE_CREDS_B64")
+    if creds_json:
+        return Credentials.from_service_account_info(json.loads(creds_json), scopes=GOOGLE_API_SCOPES)
+    if creds_b64:
+        decoded = base64.b64decode(creds_b64).decode("utf-8")
+        return Credentials.from_service_account_info(json.loads(decoded), scopes=GOOGLE_API_SCOPES)
+
+    # Try service account file from env
+    service_account_file = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE")
+    if service_account_file and os.path.exists(service_account_file):
+        return Credentials.from_service_account_file(service_account_file, scopes=GOOGLE_API_SCOPES)
+
+    raise ValueError(
+        "Google Sheets credentials not found. "
+        "Set GOOGLE_SHEETS_CREDENTIALS_JSON, GOOGLE_SHEETS_CREDENTIALS_B64, "
+        "or GOOGLE_SERVICE_ACCOUNT_FILE in .env"
+    )
+
+
+def get_error_status(error: Exception) -> Optional[int]:
+    """Extract HTTP status code dari gspread/google API error (None jika tidak ada)"""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+    return status_code if isinstance(status_code, int) else None
+
+
+def _utcnow_naive() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class SheetsClientPool:
+    """
+    Pool of authorized gspread clients and worksheet handles.
+    Features:
+    - One authorized client per credentials source (token reused across requests)
+    - Spreadsheet/worksheet handles cached per (spreadsheet_id, worksheet_name)
+    - Proactive token refresh before the access token expires (outside the pool lock, one thread per credentials)
+    - Handles invalidated on 400/401/403/404 and the call retried once
+    - Every upstream request (open, worksheet lookup, read) is charged to the quota budgeter
+    """
+
+    def __init__(self, token_refresh_margin_seconds: int = 300):
+        """
+        Initialize client pool
+
+        Args:
+            token_refresh_margin_seconds: Refresh access token this many seconds before expiry
+        """
+        self._lock = threading.RLock()
+        self._clients: Dict[str, Tuple[Any, Any]] = {}  # creds_key -> (client, credentials)
+        self._refreshing: Set[str] = set()  # creds_key with a token refresh in flight
+        self._spreadsheets: Dict[Tuple[str, str], Any] = {}  # (creds_key, spreadsheet_id) -> Spreadsheet
+        self._worksheets: Dict[Tuple[str, str, str], Any] = {}  # (creds_key, spreadsheet_id, worksheet) -> Worksheet
+        self.token_refresh_margin_seconds = token_refresh_margin_seconds
+        self._probe_disabled_until: Dict[str, float] = {}  # spreadsheet_id -> monotonic time
+        self._stats = {
+            "clients_created": 0,
+            "handles_opened": 0,
+            "handle_hits": 0,
+            "token_refreshes": 0,
+            "invalidations": 0,
+            "revision_probes": 0,
+            "revision_probe_errors": 0,
+        }
+
+    @staticmethod
+    def _credentials_key(credentials_path: str | None) -> str:
+        return f"file:{credentials_path}" if credentials_path else "env"
+
+    def get_client(self, credentials_path: str | None = None):
+        """
+        Get authorized gspread client (create once per credentials source)
+
+        Args:
+            credentials_path: Path ke Google credentials JSON (optional, bisa dari env)
+
+        Returns:
+            gspread.Client
+        """
+        try:
+            import gspread
+        except ImportError:
+            raise ImportError(
+                "gspread and google-auth required for Google Sheets. "
+                "Install with: pip install gspread google-auth google-auth-oauthlib google-auth-httplib2"
+            )
+
+        creds_key = self._credentials_key(credentials_path)
+        with self._lock:
+            entry = self._clients.get(creds_key)
+            if entry is None:
+                creds = load_google_credentials(credentials_path)
+                client = gspread.authorize(creds)
+                self._clients[creds_key] = (client, creds)
+                self._stats["clients_created"] += 1
+                return client
+
+            client, creds = entry
+            if creds_key in self._refreshing or not self._token_needs_refresh(creds):
+                # Another thread is already refreshing: keep using the current token
+                return client
+            self._refreshing.add(creds_key)
+
+        # Network call, made outside the pool lock so handle lookups don't wait on it
+        try:
+            self._refresh_token(creds)
+        finally:
+            with self._lock:
+                self._refreshing.discard(creds_key)
+        return client
+
+    def _token_needs_refresh(self, creds: Any) -> bool:
+        """Access token sudah/hampir expired (hindari refresh di tengah request)"""
+        expiry = getattr(creds, "expiry", None)
+        token = getattr(creds, "token", None)
+        if token and expiry is not None:
+            # google-auth stores expiry as naive UTC datetime
+            remaining = (expiry.replace(tzinfo=None) - _utcnow_naive()).total_seconds()
+            return remaining <= self.token_refresh_margin_seconds
+        return not token
+
+    def _refresh_token(self, creds: Any):
+        """Refresh access token"""
+        try:
+            from google.auth.transport.requests import Request
+        except ImportError:
+            # AuthorizedSession will still refresh lazily on the next request
+            return
+
+        creds.refresh(Request())
+        with self._lock:
+            self._stats["token_refreshes"] += 1
+
+    def get_spreadsheet(self, spreadsheet_id: str, credentials_path: str | None = None):
+        """Get opened spreadsheet handle (cached)"""
+        creds_key = self._credentials_key(credentials_path)
+        key = (creds_key, spreadsheet_id)
+        with self._lock:
+            spreadsheet = self._spreadsheets.get(key)
+            if spreadsheet is not None:
+                self._stats["handle_hits"] += 1
+        if spreadsheet is not None:
+            # Keep token fresh even when the handle is reused
+            self.get_client(credentials_path)
+            return spreadsheet
+
+        client = self.get_client(credentials_path)
+        spreadsheet = get_sheets_quota_budgeter().call(lambda: client.open_by_key(spreadsheet_id))
+
+        with self._lock:
+            self._spreadsheets[key] = spreadsheet
+            self._stats["handles_opened"] += 1
+        return spreadsheet
+
+    def get_worksheet(
+        self,
+        spreadsheet_id: str,
+        worksheet_name: str = "Sheet1",
+        credentials_path: str | None = None
+    ):
+        """Get opened worksheet handle (cached)"""
+        creds_key = self._credentials_key(credentials_path)
+        key = (creds_key, spreadsheet_id, worksheet_name)
+        with self._lock:
+            worksheet = self._worksheets.get(key)
+            if worksheet is not None:
+                self._stats["handle_hits"] += 1
+        if worksheet is not None:
+            # Keep token fresh even when the handle is reused
+            self.get_client(credentials_path)
+            return worksheet
+
+        spreadsheet = self.get_spreadsheet(spreadsheet_id, credentials_path)
+        worksheet = get_sheets_quota_budgeter().call(lambda: spreadsheet.worksheet(worksheet_name))
+
+        with self._lock:
+            self._worksheets[key] = worksheet
+            self._stats["handles_opened"] += 1
+        return worksheet
+
+    def get_revision(self, spreadsheet_id: str, credentials_path: str | None = None) -> Optional[str]:
+        """
+        Cheap change probe: Drive file version (naik setiap kali spreadsheet diubah)
+
+        Counts against the Drive API quota, not the Sheets read quota.
+
+        Returns:
+            Revision string, None jika probe tidak tersedia (caller harus download penuh)
+        """
+        disabled_until = self._probe_disabled_until.get(spreadsheet_id)
+        if disabled_until is not None and time.monotonic() < disabled_until:
+            return None
+
+        try:
+            from gspread.urls import DRIVE_FILES_API_V3_URL
+
+            client = self.get_client(credentials_path)
+            response = client.http_client.request(
+                "get",
+                f"{DRIVE_FILES_API_V3_URL}/{spreadsheet_id}",
+                params={"supportsAllDrives": True, "fields": "version,modifiedTime"}
+            )
+            metadata = response.json()
+        except Exception as e:
+            with self._lock:
+                self._stats["revision_probe_errors"] += 1
+            if get_error_status(e) in _STALE_HANDLE_STATUS:
+                # Drive API disabled / scope not granted / file not visible: stop probing for a while
+                self._probe_disabled_until[spreadsheet_id] = time.monotonic() + _PROBE_DISABLE_SECONDS
+                print(f"[sheets_pool] Revision probe unavailable for {spreadsheet_id}: {e}")
+            return None
+
+        with self._lock:
+            self._stats["revision_probes"] += 1
+        revision = metadata.get("version") or metadata.get("modifiedTime")
+        return str(revision) if revision else None
+
+    def call_spreadsheet(
+        self,
+        spreadsheet_id: str,
+        operation: Callable[[Any], T],
+        credentials_path: str | None = None
+    ) -> T:
+        """
+        Run operation terhadap spreadsheet handle.
+        Jika handle stale (400/401/403/404), invalidate lalu retry sekali dengan handle baru.
+        """
+        budgeter = get_sheets_quota_budgeter()
+        try:
+            spreadsheet = self.get_spreadsheet(spreadsheet_id, credentials_path)
+            return budgeter.call(lambda: operation(spreadsheet))
+        except Exception as e:
+            if not self._handle_stale_error(e, spreadsheet_id, None, credentials_path):
+                raise
+        spreadsheet = self.get_spreadsheet(spreadsheet_id, credentials_path)
+        return budgeter.call(lambda: operation(spreadsheet))
+
+    def call_worksheet(
+        self,
+        spreadsheet_id: str,
+        worksheet_name: str,
+        operation: Callable[[Any], T],
+        credentials_path: str | None = None
+    ) -> T:
+        """
+        Run operation terhadap worksheet handle.
+        Jika handle stale (400/401/403/404), invalidate lalu retry sekali dengan handle baru.
+        """
+        budgeter = get_sheets_quota_budgeter()
+        try:
+            worksheet = self.get_worksheet(spreadsheet_id, worksheet_name, credentials_path)
+            return budgeter.call(lambda: operation(worksheet))
+        except Exception as e:
+            if not self._handle_stale_error(e, spreadsheet_id, worksheet_name, credentials_path):
+                raise
+        worksheet = self.get_worksheet(spreadsheet_id, worksheet_name, credentials_path)
+        return budgeter.call(lambda: operation(worksheet))
+
+    def _handle_stale_error(
+        self,
+        error: Exception,
+        spreadsheet_id: str,
+        worksheet_name: str | None,
+        credentials_path: str | None
+    ) -> bool:
+        """Invalidate handles for stale-handle errors. Returns True if the call should be retried."""
+        error_name = type(error).__name__
+        status_code = get_error_status(error)
+
+        if error_name in ("SpreadsheetNotFound", "WorksheetNotFound") or status_code in _STALE_HANDLE_STATUS:
+            self.invalidate(
+                spreadsheet_id=spreadsheet_id,
+                worksheet_name=worksheet_name,
+                credentials_path=credentials_path,
+                drop_client=status_code in _AUTH_STATUS
+            )
+            return True
+        return False
+
+    def invalidate(
+        self,
+        spreadsheet_id: str | None = None,
+        worksheet_name: str | None = None,
+        credentials_path: str | None = None,
+        drop_client: bool = False
+    ):
+        """
+        Invalidate cached handles
+
+        Args:
+            spreadsheet_id: Spreadsheet to invalidate (None = all spreadsheets)
+            worksheet_name: Worksheet to invalidate (None = all worksheets of the spreadsheet)
+            credentials_path: Credentials source the handles belong to
+            drop_client: Also drop the authorized client (re-authorize on next call)
+        """
+        creds_key = self._credentials_key(credentials_path)
+        if drop_client:
+            # New token means every handle of this credentials source must be re-opened
+            spreadsheet_id = worksheet_name = None
+
+        with self._lock:
+            self._stats["invalidations"] += 1
+            if drop_client:
+                self._clients.pop(creds_key, None)
+
+            for key in list(self._worksheets.keys()):
+                if key[0] != creds_key:
+                    continue
+                if spreadsheet_id is not None and key[1] != spreadsheet_id:
+                    continue
+                if worksheet_name is not None and key[2] != worksheet_name:
+                    continue
+                del self._worksheets[key]
+
+            # Spreadsheet handle also goes stale when the whole spreadsheet is the problem
+            if worksheet_name is None:
+                for key in list(self._spreadsheets.keys()):
+                    if key[0] == creds_key and (spreadsheet_id is None or key[1] == spreadsheet_id):
+                        del self._spreadsheets[key]
+
+    def clear(self):
+        """Drop all clients and handles"""
+        with self._lock:
+            self._clients.clear()
+            self._spreadsheets.clear()
+            self._worksheets.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics"""
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "spreadsheet_handles": len(self._spreadsheets),
+                "worksheet_handles": len(self._worksheets),
+                **self._stats
+            }
+
+
+# Global instance shared by every SpreadsheetService
+_sheets_client_pool = SheetsClientPool()
+
+
+def get_sheets_client_pool() -> SheetsClientPool:
+    """Get global Google Sheets client pool instance"""
+    return _sheets_client_pool
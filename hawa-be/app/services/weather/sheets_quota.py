@@ -0,0 +1,286 @@
+"""
+Process-wide Google Sheets API quota budgeter
+Token bucket untuk semua Sheets calls dengan priority classes, supaya admin yang
+spam force refresh tidak menghabiskan quota yang dibutuhkan scheduler/ingestion
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Callable, Dict, Iterator, TypeVar
+
+from app.core.config import get_settings
+
+T = TypeVar("T")
+
+
+class SheetsPriority(IntEnum):
+    """Priority class untuk Sheets calls (angka kecil = lebih penting)"""
+    INGESTION = 0  # scheduler jobs, sensor_readings mirror
+    USER = 1  # user requests, user-triggered force_refresh
+    ADMIN = 2  # admin dashboard browsing
+
+
+# Fraction of the bucket a priority class may NOT touch (kept for higher classes)
+_RESERVED_FRACTION = {
+    SheetsPriority.INGESTION: 0.0,
+    SheetsPriority.USER: 0.25,
+    SheetsPriority.ADMIN: 0.5,
+}
+
+# Max seconds a call waits for budget before failing fast with a quota error
+_MAX_WAIT_SECONDS = {
+    SheetsPriority.INGESTION: 30.0,
+    SheetsPriority.USER: 5.0,
+    SheetsPriority.ADMIN: 2.0,
+}
+
+# Retries after an upstream 429 (backoff between attempts)
+_MAX_RETRIES = {
+    SheetsPriority.INGESTION: 3,
+    SheetsPriority.USER: 1,
+    SheetsPriority.ADMIN: 0,
+}
+
+_current_priority: ContextVar[SheetsPriority] = ContextVar("sheets_priority", default=SheetsPriority.USER)
+
+
+def current_sheets_priority() -> SheetsPriority:
+    """Priority yang berlaku untuk Sheets calls di context ini"""
+    return _current_priority.get()
+
+
+@contextmanager
+def sheets_priority(priority: SheetsPriority) -> Iterator[None]:
+    """
+    Set priority untuk semua Sheets calls di dalam block
+
+    Usage:
+        with sheets_priority(SheetsPriority.INGESTION):
+            store.sync_from_sheets(...)
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True untuk 429 / quota exceeded dari Google API (atau budget lokal habis)"""
+    response = getattr(error, "response", None)
+    if getattr(error, "code", None) == 429 or getattr(response, "status_code", None) == 429:
+        return True
+    error_msg = str(error)
+    return "429" in error_msg or "Quota exceeded" in error_msg or "rate limit" in error_msg.lower()
+
+
+class SheetsQuotaExceededError(Exception):
+    """Budget lokal habis (call tidak dikirim ke Google)"""
+
+    def __init__(self, priority: SheetsPriority, wait_seconds: float):
+        self.priority = priority
+        super().__init__(
+            f"Quota exceeded: local Google Sheets budget exhausted for {priority.name.lower()} "
+            f"requests (waited {wait_seconds:.1f}s)"
+        )
+
+
+class SheetsQuotaBudgeter:
+    """
+    Token bucket untuk Google Sheets read requests.
+    Features:
+    - Refill rate = requests_per_minute / 60 tokens per second, capacity = burst
+    - Lower priority classes cannot dip into the share reserved for higher ones
+    - Waiting higher-priority callers are served before lower-priority ones
+    - Upstream 429 pauses every class with jittered exponential backoff
+    - Budget usage metrics per priority class
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 60,
+        burst: float | None = None,
+        backoff_base_seconds: float = 1.0,
+        backoff_max_seconds: float = 60.0
+    ):
+        """
+        Initialize budgeter
+
+        Args:
+            requests_per_minute: Sustained Sheets requests per minute for this process (<= 0: quota disabled,
+                only upstream 429 backoff applies)
+            burst: Bucket capacity (default: one minute of budget)
+            backoff_base_seconds: First backoff after a 429
+            backoff_max_seconds: Upper bound for the backoff
+        """
+        self.requests_per_minute = requests_per_minute
+        self.enabled = requests_per_minute > 0
+        self.capacity = float(burst or requests_per_minute) if self.enabled else 0.0
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._consecutive_rate_limits = 0
+        self._waiting = {priority: 0 for priority in SheetsPriority}
+        self._condition = threading.Condition()
+        self._stats: Dict[str, Dict[str, float]] = {
+            priority.name.lower(): {"granted": 0, "rejected": 0, "rate_limited": 0, "wait_seconds": 0.0}
+            for priority in SheetsPriority
+        }
+        self._backoffs = 0
+
+    @property
+    def _refill_rate(self) -> float:
+        return self.requests_per_minute / 60.0
+
+    def _refill(self, now: float):
+        if not self.enabled:
+            return
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self._refill_rate)
+            self._last_refill = now
+
+    def _wait_time(self, priority: SheetsPriority, now: float) -> float:
+        """Seconds until priority may take a token (0 = now). Caller holds the condition."""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if not self.enabled:
+            return 0.0
+        if any(self._waiting[higher] for higher in SheetsPriority if higher < priority):
+            # Let the more important waiters go first; re-checked when they are notified
+            return 1.0 / self._refill_rate
+        # Tiny buckets: the reserve must still leave one whole token reachable
+        floor = min(self.capacity * _RESERVED_FRACTION[priority], max(self.capacity - 1.0, 0.0))
+        missing = floor + 1.0 - self._tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self._refill_rate
+
+    def acquire(self, priority: SheetsPriority | None = None, max_wait: float | None = None):
+        """
+        Take one token, waiting up to max_wait seconds
+
+        Raises:
+            SheetsQuotaExceededError: no budget within max_wait
+        """
+        priority = current_sheets_priority() if priority is None else priority
+        max_wait = _MAX_WAIT_SECONDS[priority] if max_wait is None else max_wait
+        stats = self._stats[priority.name.lower()]
+        started = time.monotonic()
+        deadline = started + max_wait
+
+        with self._condition:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = self._wait_time(priority, now)
+                    if wait <= 0:
+                        if self.enabled:
+                            self._tokens -= 1.0
+                        stats["granted"] += 1
+                        stats["wait_seconds"] += now - started
+                        return
+                    if now + wait > deadline:
+                        stats["rejected"] += 1
+                        raise SheetsQuotaExceededError(priority, now - started)
+                    self._condition.wait(timeout=wait)
+            finally:
+                self._waiting[priority] -= 1
+                self._condition.notify_all()
+
+    def report_rate_limited(self, priority: SheetsPriority | None = None) -> float:
+        """
+        Record upstream 429: pause all calls with jittered exponential backoff
+
+        Returns:
+            Backoff duration in seconds
+        """
+        priority = current_sheets_priority() if priority is None else priority
+        with self._condition:
+            self._consecutive_rate_limits += 1
+            ceiling = min(
+                self.backoff_max_seconds,
+                self.backoff_base_seconds * (2 ** (self._consecutive_rate_limits - 1))
+            )
+            # Equal jitter: at least half the ceiling so workers don't retry in lockstep
+            backoff = ceiling / 2 + random.uniform(0, ceiling / 2)
+            self._blocked_until = max(self._blocked_until, time.monotonic() + backoff)
+            # Google says we're over quota, so our local view of the bucket is too optimistic
+            self._tokens = min(self._tokens, 0.0)
+            self._stats[priority.name.lower()]["rate_limited"] += 1
+            self._backoffs += 1
+            self._condition.notify_all()
+        print(f"[sheets_quota] Google Sheets 429, backing off {backoff:.1f}s")
+        return backoff
+
+    def report_success(self):
+        """Reset backoff after a successful upstream call"""
+        if self._consecutive_rate_limits:
+            with self._condition:
+                self._consecutive_rate_limits = 0
+
+    def call(self, operation: Callable[[], T], priority: SheetsPriority | None = None) -> T:
+        """
+        Run one Sheets API call within the budget, retrying 429s with backoff
+
+        Args:
+            operation: Callable yang melakukan tepat satu upstream request
+            priority: Priority class (default: dari sheets_priority context)
+        """
+        priority = current_sheets_priority() if priority is None else priority
+        attempt = 0
+        while True:
+            self.acquire(priority)
+            try:
+                result = operation()
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                self.report_rate_limited(priority)
+                if attempt >= _MAX_RETRIES[priority]:
+                    raise
+                attempt += 1
+                continue
+            self.report_success()
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get budget usage statistics"""
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "requests_per_minute": self.requests_per_minute,
+                "capacity": self.capacity,
+                "tokens_available": round(self._tokens, 2),
+                "enabled": self.enabled,
+                "utilization": round(1 - max(self._tokens, 0.0) / self.capacity, 3) if self.capacity else 0.0,
+                "backoff_remaining_seconds": round(max(0.0, self._blocked_until - now), 2),
+                "consecutive_rate_limits": self._consecutive_rate_limits,
+                "backoffs": self._backoffs,
+                "waiting": {priority.name.lower(): count for priority, count in self._waiting.items()},
+                "by_priority": {
+                    name: {**values, "wait_seconds": round(values["wait_seconds"], 3)}
+                    for name, values in self._stats.items()
+                },
+            }
+
+
+# Global instance shared by every Sheets call in this process
+_settings = get_settings()
+_sheets_quota_budgeter = SheetsQuotaBudgeter(
+    requests_per_minute=_settings.sheets_quota_requests_per_minute,
+    burst=_settings.sheets_quota_burst
+)
+
+
+def get_sheets_quota_budgeter() -> SheetsQuotaBudgeter:
+    """Get global Google Sheets quota budgeter instance"""
+    return _sheets_quota_budgeter
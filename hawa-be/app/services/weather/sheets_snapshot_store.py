@@ -0,0 +1,321 @@
+"""
+Durable last-good snapshot per sheet di local disk
+Dipakai saat cold start (cache masih kosong) dan saat Google Sheets down,
+supaya endpoint tetap bisa langsung menjawab dengan data terakhir (ditandai stale)
+
+File format (.snap), columnar dan memory-mapped saat dibaca:
+    magic (8 bytes) | header length (uint32) | JSON header
+    per column: offsets uint32[rows + 1] | present mask uint8[rows] (optional) | UTF-8 blob
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.services.weather.sheet_table import SheetTable
+
+_MAGIC = b"HAWASNP1"
+_PREFIX = struct.Struct("<8sI")
+
+
+class SheetSnapshot:
+    """
+    Last-good sheet snapshot metadata. Rows are decoded from the .snap file on demand and only
+    weakly referenced, so they stay resident only while a cache (or caller) still holds them
+    """
+
+    def __init__(
+        self,
+        key: str,
+        fetched_at: float,
+        row_count: int,
+        revision: str | None = None,
+        records: SheetTable | None = None,
+        loader: Callable[[], SheetTable] | None = None
+    ):
+        self.key = key
+        self.fetched_at = fetched_at
+        self.row_count = row_count
+        self.revision = revision
+        self._records = weakref.ref(records) if records is not None else None
+        self._loader = loader
+        self._lock = threading.Lock()
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._records is not None and self._records() is not None
+
+    def records(self) -> SheetTable:
+        """Rows in read_from_google_sheets format (reused while still referenced elsewhere, else decoded again)"""
+        records = self._records() if self._records is not None else None
+        if records is None:
+            with self._lock:
+                records = self._records() if self._records is not None else None
+                if records is None:
+                    records = self._loader() if self._loader else SheetTable.from_records([])
+                    self._records = weakref.ref(records)
+        return records
+
+
+def _encode_snapshot(key: str, records: SheetTable, fetched_at: float, revision: str | None) -> bytes:
+    """Serialize records column by column (values stored as UTF-8 strings)"""
+    row_count = len(records)
+    column_meta = []
+    chunks: List[bytes] = []
+    offset = 0
+
+    for column in records.header:
+        values = records.column_values(column)
+        has_missing = any(value is None for value in values)
+        encoded = [b"" if value is None else str(value).encode("utf-8") for value in values]
+
+        offsets = np.zeros(row_count + 1, dtype="<u4")
+        if encoded:
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        parts = [offsets.tobytes()]
+        if has_missing:
+            parts.append(np.fromiter((value is not None for value in values), dtype=np.uint8, count=row_count).tobytes())
+        parts.append(b"".join(encoded))
+
+        chunk = b"".join(parts)
+        column_meta.append({"name": column, "offset": offset, "has_mask": has_missing})
+        chunks.append(chunk)
+        offset += len(chunk)
+
+    header = json.dumps({
+        "key": key,
+        "fetched_at": fetched_at,
+        "revision": revision,
+        "rows": row_count,
+        "columns": column_meta,
+    }).encode("utf-8")
+    return _PREFIX.pack(_MAGIC, len(header)) + header + b"".join(chunks)
+
+
+def _decode_column(buffer: mmap.mmap, start: int, row_count: int, has_mask: bool) -> List[Optional[str]]:
+    offsets = np.frombuffer(buffer, dtype="<u4", count=row_count + 1, offset=start)
+    position = start + offsets.nbytes
+    present = None
+    if has_mask:
+        present = np.frombuffer(buffer, dtype=np.uint8, count=row_count, offset=position)
+        position += row_count
+    blob = buffer[position:position + int(offsets[-1])]
+
+    bounds = offsets.tolist()
+    if blob.isascii():
+        # Byte offsets == character offsets: decode the whole column once
+        text = blob.decode("ascii")
+        values = [text[bounds[i]:bounds[i + 1]] for i in range(row_count)]
+    else:
+        values = [blob[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(row_count)]
+
+    if present is not None:
+        values = [value if flag else None for value, flag in zip(values, present.tolist())]
+    return values
+
+
+class SheetSnapshotStore:
+    """
+    Satu snapshot file per sheet (cache key) di local disk.
+    Features:
+    - Atomic writes (temp file + os.replace), throttled per key
+    - Columnar binary format, memory-mapped and decoded on demand (rows are not pinned in memory)
+    - preload() maps every snapshot at startup (headers only)
+    """
+
+    def __init__(self, directory: str, min_save_interval_seconds: float = 30):
+        """
+        Initialize snapshot store
+
+        Args:
+            directory: Snapshot directory
+            min_save_interval_seconds: Minimum seconds between two writes of the same key
+        """
+        self.directory = directory
+        self.min_save_interval_seconds = min_save_interval_seconds
+        self._lock = threading.Lock()
+        self._snapshots: Dict[str, SheetSnapshot] = {}
+        self._last_saved: Dict[str, tuple] = {}  # key -> (monotonic time, weakref to the saved records)
+        self._stats = {
+            "saves": 0,
+            "skipped_saves": 0,
+            "loads": 0,
+            "load_errors": 0,
+        }
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:40]
+        return os.path.join(self.directory, digest + ".snap")
+
+    def save(
+        self,
+        key: str,
+        records: Iterable[Dict[str, Any]],
+        fetched_at: float | None = None,
+        revision: str | None = None,
+        force: bool = False
+    ) -> bool:
+        """
+        Persist records as the last-good snapshot for key
+
+        Returns:
+            True jika file ditulis (False = throttled / same data already saved)
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        records = SheetTable.from_records(records)
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_saved.get(key)
+            if not force and last is not None and (last[1]() is records or now - last[0] < self.min_save_interval_seconds):
+                self._stats["skipped_saves"] += 1
+                return False
+            self._last_saved[key] = (now, weakref.ref(records))
+
+        payload = _encode_snapshot(key, records, fetched_at, revision)
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        path = self._path(key)
+        with self._lock:
+            # Metadata only: the saved rows are reused while the cache holds them, else the file is mapped again
+            self._snapshots[key] = SheetSnapshot(
+                key, fetched_at, len(records), revision,
+                records=records,
+                loader=lambda: self._load_records(path)
+            )
+            self._stats["saves"] += 1
+        return True
+
+    def _map(self, path: str) -> Optional[SheetSnapshot]:
+        """Map snapshot file and parse its header (rows stay on disk until records())"""
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size < _PREFIX.size:
+                    return None
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, header_length = _PREFIX.unpack_from(buffer)
+            if magic != _MAGIC:
+                buffer.close()
+                return None
+            header = json.loads(buffer[_PREFIX.size:_PREFIX.size + header_length])
+        except (OSError, ValueError, struct.error) as e:
+            with self._lock:
+                self._stats["load_errors"] += 1
+            print(f"[sheets_snapshot] Failed to map {path}: {e}")
+            return None
+
+        data_start = _PREFIX.size + header_length
+        row_count = header["rows"]
+        columns = header["columns"]
+
+        def load() -> SheetTable:
+            records = SheetTable.from_columns(
+                (column["name"] for column in columns),
+                (
+                    _decode_column(buffer, data_start + column["offset"], row_count, column["has_mask"])
+                    for column in columns
+                )
+            )
+            with self._lock:
+                self._stats["loads"] += 1
+            return records
+
+        return SheetSnapshot(header["key"], header["fetched_at"], row_count, header.get("revision"), loader=load)
+
+    def _load_records(self, path: str) -> SheetTable:
+        snapshot = self._map(path)
+        return snapshot.records() if snapshot is not None else SheetTable.from_records([])
+
+    def get(self, key: str) -> Optional[SheetSnapshot]:
+        """Last-good snapshot for key (None jika belum pernah disimpan)"""
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+        if snapshot is not None:
+            return snapshot
+
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        snapshot = self._map(path)
+        if snapshot is None or snapshot.key != key:
+            return None
+        with self._lock:
+            return self._snapshots.setdefault(key, snapshot)
+
+    def preload(self) -> int:
+        """Map every snapshot in the directory (startup), returns jumlah snapshot"""
+        try:
+            entries = [entry.path for entry in os.scandir(self.directory) if entry.name.endswith(".snap")]
+        except FileNotFoundError:
+            return 0
+
+        loaded = 0
+        for path in entries:
+            snapshot = self._map(path)
+            if snapshot is None:
+                continue
+            with self._lock:
+                self._snapshots.setdefault(snapshot.key, snapshot)
+            loaded += 1
+        return loaded
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get snapshot store statistics"""
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "snapshots": {
+                    key: {
+                        "rows": snapshot.row_count,
+                        "age_seconds": round(snapshot.age_seconds, 1),
+                        "loaded": snapshot.is_loaded,
+                    }
+                    for key, snapshot in self._snapshots.items()
+                },
+                "min_save_interval_seconds": self.min_save_interval_seconds,
+                **self._stats
+            }
+
+
+def default_snapshot_dir() -> str:
+    """Temp directory (writable di serverless juga)"""
+    return os.path.join(tempfile.gettempdir(), "hawa-snapshots")
+
+
+# Global instance shared by the standard and realtime sheets caches
+_settings = get_settings()
+_sheet_snapshot_store: SheetSnapshotStore | None = (
+    SheetSnapshotStore(
+        _settings.sheets_snapshot_dir or default_snapshot_dir(),
+        min_save_interval_seconds=_settings.sheets_snapshot_interval_seconds
+    )
+    if _settings.sheets_snapshots_enabled else None
+)
+
+
+def get_sheet_snapshot_store() -> SheetSnapshotStore | None:
+    """Get global sheet snapshot store (None jika SHEETS_SNAPSHOTS=false)"""
+    return _sheet_snapshot_store
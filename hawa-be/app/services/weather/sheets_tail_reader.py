@@ -0,0 +1,280 @@
+"""
+Incremental tail reader untuk append-only Google Sheets (IoT sheet)
+Firmware hanya menambah baris baru, jadi cukup ambil baris setelah baris terakhir
+yang sudah di-ingest via A1 range read, bukan get_all_values() setiap kali
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services.weather.sheet_table import SheetTable
+from app.services.weather.sheets_client_pool import get_sheets_client_pool
+from app.services.weather.spreadsheet_service import SpreadsheetService
+
+
+def column_letter(index: int) -> str:
+    """Convert 1-based column index ke huruf kolom A1 (1 -> A, 27 -> AA)"""
+    letters = ""
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+@dataclass
+class _TailState:
+    """State ingest per worksheet"""
+    raw_headers: List[str]
+    cleaned_headers: List[str]
+    table: SheetTable = field(default_factory=lambda: SheetTable.from_records([]))
+    last_row_index: int = 1  # 1-based sheet row number of the last ingested row (1 = header)
+    last_full_sync: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class SheetsTailReader:
+    """
+    Append-only row log per worksheet yang di-update secara incremental.
+    Features:
+    - First read (and every full_resync_seconds) downloads the whole sheet
+    - Other reads fetch only rows after the last ingested row index
+    - Full resync when new rows are wider than the known header
+    - Periodic full resync catches edited or deleted rows
+    - Batched refreshes can plan the next range and hand the values back (values.batchGet)
+    - Row log is an immutable SheetTable; appends build a new table, so returned
+      snapshots never change under the caller and need no copy
+    """
+
+    def __init__(self, full_resync_seconds: int = 900):
+        """
+        Initialize tail reader
+
+        Args:
+            full_resync_seconds: Interval full re-download untuk safety (deleted/edited rows)
+        """
+        self.full_resync_seconds = full_resync_seconds
+        self._states: Dict[Tuple[str, str], _TailState] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "full_syncs": 0,
+            "incremental_reads": 0,
+            "rows_ingested": 0,
+        }
+
+    def read(
+        self,
+        spreadsheet_id: str,
+        worksheet_name: str = "Sheet1",
+        credentials_path: str | None = None,
+        full_resync: bool = False
+    ) -> SheetTable:
+        """
+        Read all rows of an append-only worksheet, fetching only new rows when possible
+
+        Args:
+            spreadsheet_id: Google Sheets ID
+            worksheet_name: Worksheet name
+            credentials_path: Path ke Google credentials JSON (optional, bisa dari env)
+            full_resync: Force full re-download
+
+        Returns:
+            Row log snapshot (SheetTable, behaves like a list of dictionaries)
+        """
+        key = (spreadsheet_id, worksheet_name)
+        with self._lock:
+            state = self._states.get(key)
+
+        if state is None or full_resync or time.time() - state.last_full_sync >= self.full_resync_seconds:
+            state = self._full_sync(spreadsheet_id, worksheet_name, credentials_path)
+            if state is None:
+                return SheetTable.from_records([])
+            return state.table
+
+        with state.lock:
+            needs_full_sync = not self._append_new_rows(state, spreadsheet_id, worksheet_name, credentials_path)
+            if not needs_full_sync:
+                return state.table
+
+        state = self._full_sync(spreadsheet_id, worksheet_name, credentials_path)
+        return state.table if state else SheetTable.from_records([])
+
+    def _full_sync(
+        self,
+        spreadsheet_id: str,
+        worksheet_name: str,
+        credentials_path: str | None
+    ) -> Optional[_TailState]:
+        """Download whole worksheet and rebuild the row log"""
+        all_values = get_sheets_client_pool().call_worksheet(
+            spreadsheet_id,
+            worksheet_name,
+            lambda worksheet: worksheet.get_all_values(),
+            credentials_path=credentials_path
+        )
+        return self._install(spreadsheet_id, worksheet_name, all_values)
+
+    def _install(
+        self,
+        spreadsheet_id: str,
+        worksheet_name: str,
+        all_values: List[List[str]]
+    ) -> Optional[_TailState]:
+        """Rebuild the row log from whole-worksheet values"""
+        key = (spreadsheet_id, worksheet_name)
+        if not all_values:
+            with self._lock:
+                self._states.pop(key, None)
+            return None
+
+        service = SpreadsheetService()
+        raw_headers = list(all_values[0])
+        state = _TailState(
+            raw_headers=raw_headers,
+            cleaned_headers=service._clean_headers(raw_headers),
+            last_row_index=len(all_values),
+            last_full_sync=time.time()
+        )
+        state.table = SheetTable.from_records(service._values_to_records(all_values))
+
+        with self._lock:
+            self._states[key] = state
+            self._stats["full_syncs"] += 1
+            self._stats["rows_ingested"] += len(state.table)
+        return state
+
+    def _append_new_rows(
+        self,
+        state: _TailState,
+        spreadsheet_id: str,
+        worksheet_name: str,
+        credentials_path: str | None
+    ) -> bool:
+        """
+        Fetch rows after state.last_row_index and append them to the log
+
+        Returns:
+            False jika perlu full resync (header berubah / kolom bertambah)
+        """
+        range_name = self._tail_cells(state)
+
+        new_values = get_sheets_client_pool().call_worksheet(
+            spreadsheet_id,
+            worksheet_name,
+            lambda worksheet: worksheet.get_values(range_name),
+            credentials_path=credentials_path
+        )
+        return self._apply_new_rows(state, new_values)
+
+    @staticmethod
+    def _tail_cells(state: _TailState) -> str:
+        """A1 cells after the last ingested row (one extra column to detect new headers)"""
+        return f"A{state.last_row_index + 1}:{column_letter(len(state.raw_headers) + 1)}"
+
+    def _apply_new_rows(self, state: _TailState, new_values: List[List[str]]) -> bool:
+        """Append fetched tail rows to the log (False = full resync needed)"""
+        width = len(state.raw_headers)
+        with self._lock:
+            self._stats["incremental_reads"] += 1
+
+        if not new_values:
+            return True
+
+        # One extra column is requested so a new header column is detected here
+        if any(len(row) > width and any(row[width:]) for row in new_values):
+            return False
+
+        new_records = []
+        for row in new_values:
+            if not any(row):
+                continue
+            record = {}
+            for i, header in enumerate(state.cleaned_headers):
+                value = row[i] if i < len(row) else ""
+                record[header] = value.strip() if value else ""
+            new_records.append(record)
+
+        state.table = state.table.append_records(new_records)
+        state.last_row_index += len(new_values)
+        with self._lock:
+            self._stats["rows_ingested"] += len(new_records)
+        return True
+
+    def plan_batch_range(self, spreadsheet_id: str, worksheet_name: str) -> Optional[Tuple[str, int]]:
+        """
+        A1 cells for the next incremental read, for callers that batch several ranges in one request
+
+        Returns:
+            (cells, last_row_index the cells start after), None jika full sync yang dibutuhkan
+        """
+        with self._lock:
+            state = self._states.get((spreadsheet_id, worksheet_name))
+        if state is None or time.time() - state.last_full_sync >= self.full_resync_seconds:
+            return None
+        with state.lock:
+            return self._tail_cells(state), state.last_row_index
+
+    def apply_batch_values(
+        self,
+        spreadsheet_id: str,
+        worksheet_name: str,
+        values: List[List[str]],
+        after_row_index: int | None = None
+    ) -> Optional[SheetTable]:
+        """
+        Apply values fetched by a batched read
+
+        Args:
+            values: Whole worksheet (after_row_index None) atau tail cells dari plan_batch_range
+            after_row_index: last_row_index returned by plan_batch_range
+
+        Returns:
+            Row log snapshot, None jika perlu full resync (read(full_resync=True))
+        """
+        if after_row_index is None:
+            state = self._install(spreadsheet_id, worksheet_name, values)
+            return state.table if state else SheetTable.from_records([])
+
+        with self._lock:
+            state = self._states.get((spreadsheet_id, worksheet_name))
+        if state is None:
+            return None
+        with state.lock:
+            if state.last_row_index != after_row_index:
+                # Another read already advanced the log past (part of) these rows
+                return state.table
+            if not self._apply_new_rows(state, values):
+                return None
+            return state.table
+
+    def reset(self, spreadsheet_id: str | None = None, worksheet_name: str | None = None):
+        """Drop ingest state (next read does a full sync)"""
+        with self._lock:
+            for key in list(self._states.keys()):
+                if spreadsheet_id is not None and key[0] != spreadsheet_id:
+                    continue
+                if worksheet_name is not None and key[1] != worksheet_name:
+                    continue
+                del self._states[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tail reader statistics"""
+        with self._lock:
+            return {
+                "tracked_worksheets": len(self._states),
+                "rows_in_log": {
+                    f"{sid}:{ws}": len(state.table) for (sid, ws), state in self._states.items()
+                },
+                "full_resync_seconds": self.full_resync_seconds,
+                **self._stats
+            }
+
+
+# Global instance shared by every cache/service
+_sheets_tail_reader = SheetsTailReader(full_resync_seconds=get_settings().sheets_full_resync_seconds)
+
+
+def get_sheets_tail_reader() -> SheetsTailReader:
+    """Get global append-only sheet tail reader instance"""
+    return _sheets_tail_reader
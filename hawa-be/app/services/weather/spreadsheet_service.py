@@ -2,17 +2,429 @@
 Spreadsheet Service untuk membaca data cuaca dari file atau Google Sheets
 Support Excel (.xlsx, .xls), CSV, dan Google Sheets
 """
-import base64
-import json
-import os
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
+from pytz import timezone
+
+from app.services.weather.sheet_table import SheetTable
+from app.services.weather.sheets_client_pool import get_sheets_client_pool
 
 load_dotenv()
 
+# Sheet timestamps are written by Apps Script in local (WIB) time without offset
+DEFAULT_TZ = timezone("Asia/Jakarta")
+
+TIMESTAMP_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+)
+
+
+class _FieldSpec(NamedTuple):
+    field: str
+    variants: Tuple[str, ...]
+    numeric: bool
+    expected_max: float = 1000.0
+    default: Any = None
+
+
+# Map columns sesuai dengan format BMKG/IoT (case-insensitive)
+# Support berbagai variasi nama kolom termasuk format dari Google Sheets.
+# Urutan variant = prioritas (variant pertama yang cocok dengan header dipakai)
+_FIELD_SPECS: Tuple[_FieldSpec, ...] = (
+    # PM2.5 - support berbagai format (expected max ~500 μg/m³)
+    _FieldSpec('pm25', ('PM2.5 density', 'PM2.5 raw', 'PM2.5', 'pm25', 'PM25', 'pm2.5', 'PM 2.5'), True, 500.0),
+    # PM10 (expected max ~1000 μg/m³)
+    _FieldSpec('pm10', ('PM10 density', 'PM10 raw', 'PM10', 'pm10', 'PM 10'), True, 1000.0),
+    # Other pollutants (optional)
+    _FieldSpec('o3', ('O3', 'o3', 'Ozone', 'ozone'), True, 500.0),
+    _FieldSpec('no2', ('NO2', 'no2', 'NO 2', 'Nitrogen Dioxide'), True, 500.0),
+    _FieldSpec('so2', ('SO2', 'so2', 'SO 2', 'Sulfur Dioxide'), True, 500.0),
+    _FieldSpec('co', ('CO', 'co', 'Carbon Monoxide'), True, 50.0),
+    # Weather data
+    _FieldSpec('temperature', ('Temperature', 'temperature', 'Temp', 'temp', 'Suhu', 'suhu'), True, 50.0),  # Max ~50°C
+    _FieldSpec('humidity', ('Humidity', 'humidity', 'Hum', 'hum', 'Kelembaban', 'kelembaban'), True, 100.0),  # Max 100%
+    _FieldSpec('pressure', ('Pressure', 'pressure', 'Tekanan', 'tekanan'), True),
+    # Metadata
+    _FieldSpec('location', ('Location', 'location', 'Lokasi', 'lokasi', 'Kota', 'kota', 'Device ID', 'device_id'), False, default='Bandung'),
+    _FieldSpec('timestamp', ('Timestamp', 'timestamp', 'Date', 'date', 'Tanggal', 'tanggal', 'Waktu', 'waktu', 'Time', 'time'), False),
+    _FieldSpec('air_quality_level', (
+        'Air quality level', 'air_quality_level', 'Air Quality Level',
+        'Status', 'status', 'Kualitas Udara', 'kualitas_udara'
+    ), False),
+    _FieldSpec('device_id', ('Device ID', 'device_id', 'Device', 'device'), False),
+)
+
+# Fallback: jika header generik (col_1, col_2, ...) gunakan urutan kolom bawaan
+# Contoh data (dari debug):
+# col_1=id, col_2=timestamp, col_3=pm25, col_4=pm10, col_5=pm10/ozone,
+# col_6=status, col_7=temp, col_8=humidity, col_9=pressure, col_10=?, col_11=device,
+# col_12=lat, col_13=lon, col_14=location
+# (field, 0-based column index, expected_max; None = raw value; -1 = last column)
+_POSITIONAL_FALLBACK: Tuple[Tuple[str, int, float | None], ...] = (
+    ('pm25', 2, 500.0),
+    ('pm10', 3, 1000.0),
+    ('air_quality_level', 5, None),
+    ('temperature', 6, 50.0),
+    ('humidity', 7, 100.0),
+    ('pressure', 8, 1000.0),
+    ('device_id', 10, None),
+    ('timestamp', 1, None),
+    ('location', -1, None),
+)
+# Jika kolom 4 (index 4) berisi polutan lain / AQI, gunakan sebagai pm10 bila belum ada
+_PM10_SECONDARY_INDEX = 4
+
+
+def _coerce_cell(value: Any, default: Any = None) -> Any:
+    """Cell value ke float jika bisa (koma sebagai desimal), selain itu value apa adanya"""
+    # Handle comma as decimal separator (format Indonesia)
+    if isinstance(value, str) and ',' in value:
+        value = value.replace(',', '.')
+    try:
+        # Try to convert to float
+        return float(value) if value else default
+    except (ValueError, TypeError):
+        return value
+
+
+def parse_numeric(value: Any, expected_max: float = 1000.0) -> float | None:
+    """
+    Parse numeric value, handling comma as decimal separator.
+    Google Sheets dengan format Indonesia (koma sebagai desimal)
+    sering dibaca sebagai integer oleh gspread.
+
+    Args:
+        value: Value to parse
+        expected_max: Maximum expected value (untuk detect jika perlu dibagi)
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        num_value = float(value)
+        # Jika nilai terlalu besar, kemungkinan koma dihilangkan
+        # Contoh: "56,82" dibaca sebagai 5682, harus jadi 56.82
+        if num_value > expected_max:
+            # Coba bagi dengan 100 (untuk 2 decimal places)
+            corrected_100 = num_value / 100.0
+            if corrected_100 <= expected_max:
+                return corrected_100
+            # Jika masih terlalu besar, coba bagi dengan 10 (untuk 1 decimal place)
+            corrected_10 = num_value / 10.0
+            if corrected_10 <= expected_max:
+                return corrected_10
+        return num_value
+    if isinstance(value, str):
+        # Remove any whitespace
+        value = value.strip()
+        # Handle comma as decimal separator (format Indonesia)
+        if ',' in value and '.' not in value:
+            # Comma is decimal separator
+            value = value.replace(',', '.')
+        elif ',' in value and '.' in value:
+            # Both comma and dot - assume comma is thousands separator
+            # Remove comma, keep dot as decimal
+            value = value.replace(',', '')
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def parse_numeric_array(
+    values: Sequence[Any] | pd.Series,
+    expected_max: float = 1000.0,
+    coerce_cells: bool = True
+) -> np.ndarray:
+    """
+    Vectorized parse_numeric untuk satu kolom, aturan sama dengan versi per-cell.
+
+    Args:
+        values: Cell values satu kolom
+        expected_max: Maximum expected value (untuk detect jika perlu dibagi)
+        coerce_cells: True = cell lewat _coerce_cell dulu (lookup by header di process_bmkg_data),
+            False = raw cell langsung ke parse_numeric (col_N positional fallback)
+
+    Returns:
+        float64 array (NaN = None)
+    """
+    series = values.astype(object) if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    if series.empty:
+        return np.array([], dtype=float)
+
+    if pd.api.types.infer_dtype(series, skipna=False) == "string":
+        # Google Sheets snapshots are all strings: stay in NumPy string ufuncs
+        text = np.strings.strip(series.to_numpy(dtype=str))
+        if coerce_cells:
+            # _coerce_cell: every comma is a decimal separator
+            text = np.strings.replace(text, ",", ".")
+        else:
+            # parse_numeric string path: comma is decimal unless a dot is present (then thousands)
+            has_dot = np.strings.find(text, ".") >= 0
+            text = np.where(has_dot, np.strings.replace(text, ",", ""), np.strings.replace(text, ",", "."))
+        result = _strings_to_float(text)
+        # Strings were converted to float by _coerce_cell, so they get the range correction too
+        correct = np.full(len(result), coerce_cells)
+    else:
+        # Mixed cells (e.g. pandas records from Excel/CSV); .str yields NaN for non-string cells
+        text = series.str.strip()
+        if coerce_cells:
+            text = text.str.replace(',', '.', regex=False)
+        else:
+            has_dot = text.str.contains('.', regex=False, na=False).astype(bool)
+            text = text.where(~has_dot, text.str.replace(',', '', regex=False))
+            text = text.where(has_dot, text.str.replace(',', '.', regex=False))
+        is_text = text.notna().to_numpy()
+        from_text = pd.to_numeric(text, errors='coerce').to_numpy(dtype=float, copy=True)
+
+        from_number = pd.to_numeric(series.where(~is_text), errors='coerce').to_numpy(dtype=float, copy=True)
+        if coerce_cells:
+            # Falsy non-string cells (0, 0.0) fall back to the default like _coerce_cell
+            from_number[from_number == 0] = np.nan
+            correct = np.ones(len(series), dtype=bool)
+        else:
+            correct = ~is_text
+        result = np.where(is_text, from_text, from_number)
+
+    with np.errstate(invalid='ignore'):
+        over = (result > expected_max) & correct
+        if over.any():
+            corrected_100 = result / 100.0
+            corrected_10 = result / 10.0
+            corrected = np.where(
+                corrected_100 <= expected_max,
+                corrected_100,
+                np.where(corrected_10 <= expected_max, corrected_10, result)
+            )
+            result = np.where(over, corrected, result)
+    return result
+
+
+def _strings_to_float(text: np.ndarray) -> np.ndarray:
+    """String array ke float64 (NaN untuk cell kosong / non-numeric)"""
+    try:
+        return text.astype(float)
+    except ValueError:
+        return pd.to_numeric(text, errors='coerce').astype(float)
+
+
+def parse_reading_timestamp(value: Any, tz=DEFAULT_TZ) -> Optional[datetime]:
+    """
+    Parse timestamp dari sheet ke timezone-aware datetime
+
+    Args:
+        value: Timestamp string atau datetime
+        tz: Timezone untuk timestamp tanpa offset (default: Asia/Jakarta)
+
+    Returns:
+        Timezone-aware datetime atau None jika tidak bisa di-parse
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = str(value).strip()
+        parsed = None
+        for fmt in TIMESTAMP_FORMATS:
+            try:
+                parsed = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+        if parsed is None:
+            try:
+                parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+            except ValueError:
+                return None
+
+    if parsed.tzinfo is None:
+        return tz.localize(parsed)
+    return parsed
+
+
+def parse_timestamp_array(values: Sequence[Any] | pd.Series, tz=DEFAULT_TZ) -> pd.Series:
+    """
+    Vectorized parse_reading_timestamp untuk satu kolom
+
+    Returns:
+        datetime64 Series (timezone tz, NaT jika tidak bisa di-parse)
+    """
+    series = values.astype(object) if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    series = series.reset_index(drop=True)
+    result = pd.Series(pd.NaT, index=series.index, dtype=f"datetime64[ns, {tz.zone}]")
+    if series.empty:
+        return result
+
+    text = series.str.strip()
+    pending = text.notna() & (text != "")
+    for fmt in TIMESTAMP_FORMATS:
+        if not pending.any():
+            break
+        parsed = pd.to_datetime(text[pending], format=fmt, errors='coerce')
+        matched = parsed.notna()
+        if matched.any():
+            result[matched[matched].index] = parsed[matched].dt.tz_localize(tz.zone)
+            pending[matched[matched].index] = False
+
+    # ISO strings with offsets and datetime objects: rare, parse per cell
+    leftover = pending | (text.isna() & series.notna())
+    for index in leftover[leftover].index:
+        parsed_value = parse_reading_timestamp(series[index], tz=tz)
+        if parsed_value is not None:
+            result[index] = pd.Timestamp(parsed_value).tz_convert(tz.zone)
+    return result
+
+
+def a1_range(worksheet_name: str, cells: str | None = None) -> str:
+    """A1 notation dengan nama worksheet di-quote ('Sheet 1'!A2:F, atau seluruh worksheet)"""
+    quoted = "'" + worksheet_name.replace("'", "''") + "'"
+    return f"{quoted}!{cells}" if cells else quoted
+
+
+def _fill_gaps(values: List[List[str]]) -> List[List[str]]:
+    """Pad rows to the widest row (batchGet omits trailing empty cells, get_all_values does not)"""
+    width = max((len(row) for row in values), default=0)
+    return [row + [""] * (width - len(row)) if len(row) < width else row for row in values]
+
+
+class HeaderResolver:
+    """
+    Mapping canonical field -> kolom untuk satu header tuple.
+    Dibuat sekali per header (lihat compile_header_resolver), lalu setiap row
+    cukup di-project tanpa scan kolom.
+    """
+
+    __slots__ = ("columns", "field_columns", "positional", "pm10_secondary")
+
+    def __init__(self, columns: Tuple[Any, ...]):
+        self.columns = columns
+
+        # First column per lowercased header (same as a left-to-right scan)
+        lowered: Dict[str, Any] = {}
+        for column in columns:
+            lowered.setdefault(str(column).lower(), column)
+
+        self.field_columns: List[Tuple[_FieldSpec, Any]] = []
+        for spec in _FIELD_SPECS:
+            column = None
+            for variant in spec.variants:
+                if variant.lower() in lowered:
+                    column = lowered[variant.lower()]
+                    break
+            self.field_columns.append((spec, column))
+
+        # col_N positional fallback, resolved to column keys up front
+        self.positional: List[Tuple[str, Any, float | None]] = []
+        self.pm10_secondary = None
+        if all(str(k).startswith("col_") for k in columns):
+            for field, index, expected_max in _POSITIONAL_FALLBACK:
+                self.positional.append((field, self._column_at(index), expected_max))
+            self.pm10_secondary = self._column_at(_PM10_SECONDARY_INDEX)
+
+    def _column_at(self, index: int) -> Any:
+        if index < 0:
+            index = len(self.columns) + index
+        return self.columns[index] if 0 <= index < len(self.columns) else None
+
+    @property
+    def field_indexes(self) -> Dict[str, int | None]:
+        """Canonical field -> 0-based column index (None jika tidak ada)"""
+        position = {column: i for i, column in enumerate(self.columns)}
+        return {spec.field: position.get(column) if column is not None else None for spec, column in self.field_columns}
+
+    def project(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Project satu raw record ke format standar process_bmkg_data"""
+        processed: Dict[str, Any] = {}
+        for spec, column in self.field_columns:
+            if spec.numeric:
+                value = _coerce_cell(raw_data[column]) if column is not None else None
+                processed[spec.field] = parse_numeric(value, expected_max=spec.expected_max)
+            else:
+                processed[spec.field] = _coerce_cell(raw_data[column], spec.default) if column is not None else spec.default
+
+        if self.positional:
+            for field, column, expected_max in self.positional:
+                value = raw_data.get(column) if column is not None else None
+                if expected_max is not None:
+                    processed[field] = processed[field] or parse_numeric(value, expected_max=expected_max)
+                else:
+                    processed[field] = processed[field] or value
+                if field == 'pm10' and processed['pm10'] is None:
+                    secondary = raw_data.get(self.pm10_secondary) if self.pm10_secondary is not None else None
+                    processed['pm10'] = parse_numeric(secondary, expected_max=1000.0)
+
+        return processed
+
+    def project_frame(self, raw: pd.DataFrame) -> pd.DataFrame:
+        """
+        Vectorized project untuk seluruh snapshot (kolom raw sama dengan self.columns)
+
+        Returns:
+            DataFrame dengan numeric fields float64, timestamp datetime64 (Asia/Jakarta),
+            dan metadata (location, air_quality_level, device_id) sebagai string
+        """
+        size = len(raw)
+        empty = pd.Series([None] * size, dtype=object)
+
+        def text_column(column: Any, default: Any) -> pd.Series:
+            if column is None:
+                return pd.Series([default] * size, dtype=object)
+            values = raw[column].reset_index(drop=True).astype(object)
+            if pd.api.types.infer_dtype(values, skipna=False) == "string":
+                as_text = pd.Series(np.strings.strip(values.to_numpy(dtype=str)), dtype=object)
+            else:
+                as_text = values.where(values.isna(), values.astype(str).str.strip())
+            return as_text.where(as_text.notna() & (as_text != ""), default)
+
+        columns: Dict[str, Any] = {}
+        for spec, column in self.field_columns:
+            if spec.numeric:
+                columns[spec.field] = (
+                    parse_numeric_array(raw[column], expected_max=spec.expected_max)
+                    if column is not None else np.full(size, np.nan)
+                )
+            else:
+                columns[spec.field] = text_column(column, spec.default)
+
+        for field, column, expected_max in self.positional:
+            if expected_max is not None:
+                current = columns[field]
+                fallback = parse_numeric_array(
+                    raw[column] if column is not None else empty,
+                    expected_max=expected_max,
+                    coerce_cells=False
+                )
+                columns[field] = np.where(np.isnan(current) | (current == 0), fallback, current)
+            else:
+                current = columns[field]
+                fallback = text_column(column, None)
+                columns[field] = current.where(current.notna() & (current != ""), fallback)
+            if field == 'pm10' and self.pm10_secondary is not None:
+                secondary = parse_numeric_array(raw[self.pm10_secondary], expected_max=1000.0, coerce_cells=False)
+                columns['pm10'] = np.where(np.isnan(columns['pm10']), secondary, columns['pm10'])
+
+        columns['timestamp'] = parse_timestamp_array(columns['timestamp'])
+        frame = pd.DataFrame(columns)
+        frame.index = raw.index
+        return frame
+
+
+@lru_cache(maxsize=256)
+def compile_header_resolver(columns: Tuple[Any, ...]) -> HeaderResolver:
+    """Get (cached) resolver untuk header tuple"""
+    return HeaderResolver(columns)
+
 
 class SpreadsheetService:
     """Service untuk membaca dan memproses data cuaca dari spreadsheet atau Google Sheets"""
@@ -70,61 +482,57 @@ class SpreadsheetService:
         Returns:
             List of dictionaries dengan data cuaca
         """
-        try:
-            import gspread
-            from google.oauth2.service_account import Credentials
-        except ImportError:
-            raise ImportError(
-                "gspread and google-auth required for Google Sheets. "
-                "Install with: pip install gspread google-auth google-auth-oauthlib google-auth-httplib2"
-            )
+        # Authorized client + worksheet handle are pooled per process
+        all_values = get_sheets_client_pool().call_worksheet(
+            spreadsheet_id,
+            worksheet_name,
+            lambda worksheet: worksheet.get_all_values(),
+            credentials_path=credentials_path
+        )
+
+        return self._values_to_records(all_values)
+
+    def batch_read_ranges(
+        self,
+        ranges_by_spreadsheet: Dict[str, Iterable[str]],
+        credentials_path: str | None = None
+    ) -> Dict[Tuple[str, str], List[List[str]]]:
+        """
+        Read several worksheets/ranges dengan satu values.batchGet request per spreadsheet
 
-        # Get credentials
-        if credentials_path:
-            creds = Credentials.from_service_account_file(
-                credentials_path,
-                scopes=['https://www.googleapis.com/auth/spreadsheets.readonly']
+        Args:
+            ranges_by_spreadsheet: spreadsheet_id -> A1 ranges (lihat a1_range; nama worksheet saja = seluruh sheet)
+            credentials_path: Path ke Google credentials JSON (optional, bisa dari env)
+
+        Returns:
+            (spreadsheet_id, range) -> raw values (rows padded like get_all_values)
+        """
+        results: Dict[Tuple[str, str], List[List[str]]] = {}
+        pool = get_sheets_client_pool()
+        for spreadsheet_id, ranges in ranges_by_spreadsheet.items():
+            ranges = list(dict.fromkeys(ranges))
+            if not ranges:
+                continue
+            response = pool.call_spreadsheet(
+                spreadsheet_id,
+                lambda spreadsheet: spreadsheet.values_batch_get(ranges),
+                credentials_path=credentials_path
             )
-        else:
-            # Try to get from environment variable (JSON string)
-            creds_json = os.getenv("GOOGLE_SHEETS_CREDENTIALS_JSON")
-            creds_b64 = os.getenv("GOOGLE_SHEETS_CREDENTIALS_B64") or os.getenv("GOOGLE_CREDS_B64")
-            if creds_json:
-                creds_dict = json.loads(creds_json)
-                creds = Credentials.from_service_account_info(
-                    creds_dict,
-                    scopes=['https://www.googleapis.com/auth/spreadsheets.readonly']
-                )
-            elif creds_b64:
-                decoded = base64.b64decode(creds_b64).decode("utf-8")
-                creds_dict = json.loads(decoded)
-                creds = Credentials.from_service_account_info(
-                    creds_dict,
-                    scopes=['https://www.googleapis.com/auth/spreadsheets.readonly']
-                )
-            else:
-                # Try service account file from env
-                service_account_file = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE")
-                if service_account_file and os.path.exists(service_account_file):
-                    creds = Credentials.from_service_account_file(
-                        service_account_file,
-                        scopes=['https://www.googleapis.com/auth/spreadsheets.readonly']
-                    )
-                else:
-                    raise ValueError(
-                        "Google Sheets credentials not found. "
-                        "Set GOOGLE_SHEETS_CREDENTIALS_JSON, GOOGLE_SHEETS_CREDENTIALS_B64, "
-                        "or GOOGLE_SERVICE_ACCOUNT_FILE in .env"
-                    )
+            # valueRanges come back in request order
+            for range_name, value_range in zip(ranges, response.get("valueRanges", [])):
+                results[(spreadsheet_id, range_name)] = _fill_gaps(value_range.get("values", []))
+        return results
 
-        # Connect to Google Sheets
-        client = gspread.authorize(creds)
-        sheet = client.open_by_key(spreadsheet_id)
-        worksheet = sheet.worksheet(worksheet_name)
+    def _values_to_records(self, all_values: List[List[str]]) -> List[Dict[str, Any]]:
+        """
+        Convert raw sheet values (header row + data rows) ke list of records
 
-        # Get all values (raw data)
-        all_values = worksheet.get_all_values()
+        Args:
+            all_values: Values dari worksheet, baris pertama adalah header
 
+        Returns:
+            List of dictionaries dengan header yang sudah dibersihkan
+        """
         if not all_values or len(all_values) < 2:
             return []
 
@@ -191,136 +599,27 @@ class SpreadsheetService:
         else:
             raw_data = data
 
-        # Map columns sesuai dengan format BMKG/IoT (case-insensitive)
-        # Support berbagai variasi nama kolom termasuk format dari Google Sheets
-        def get_value(key_variants: List[str], default: Any = None) -> Any:
-            for variant in key_variants:
-                # Case-insensitive search
-                for col in raw_data.keys():
-                    if str(col).lower() == variant.lower():
-                        value = raw_data[col]
-                        # Handle comma as decimal separator (format Indonesia)
-                        if isinstance(value, str) and ',' in value:
-                            value = value.replace(',', '.')
-                        try:
-                            # Try to convert to float
-                            return float(value) if value else default
-                        except (ValueError, TypeError):
-                            return value
-            return default
-
-        # Process numeric values (handle comma as decimal separator)
-        def parse_numeric(value: Any, expected_max: float = 1000.0) -> float | None:
-            """
-            Parse numeric value, handling comma as decimal separator.
-            Google Sheets dengan format Indonesia (koma sebagai desimal)
-            sering dibaca sebagai integer oleh gspread.
-
-            Args:
-                value: Value to parse
-                expected_max: Maximum expected value (untuk detect jika perlu dibagi)
-            """
-            if value is None:
-                return None
-            if isinstance(value, (int, float)):
-                num_value = float(value)
-                # Jika nilai terlalu besar, kemungkinan koma dihilangkan
-                # Contoh: "56,82" dibaca sebagai 5682, harus jadi 56.82
-                if num_value > expected_max:
-                    # Coba bagi dengan 100 (untuk 2 decimal places)
-                    corrected_100 = num_value / 100.0
-                    if corrected_100 <= expected_max:
-                        return corrected_100
-                    # Jika masih terlalu besar, coba bagi dengan 10 (untuk 1 decimal place)
-                    corrected_10 = num_value / 10.0
-                    if corrected_10 <= expected_max:
-                        return corrected_10
-                return num_value
-            if isinstance(value, str):
-                # Remove any whitespace
-                value = value.strip()
-                # Handle comma as decimal separator (format Indonesia)
-                if ',' in value and '.' not in value:
-                    # Comma is decimal separator
-                    value = value.replace(',', '.')
-                elif ',' in value and '.' in value:
-                    # Both comma and dot - assume comma is thousands separator
-                    # Remove comma, keep dot as decimal
-                    value = value.replace(',', '')
-                try:
-                    return float(value)
-                except ValueError:
-                    return None
-            return None
+        # Column lookup is compiled once per distinct header and cached
+        resolver = compile_header_resolver(tuple(raw_data.keys()))
+        return resolver.project(raw_data)
 
-        processed = {
-            # PM2.5 - support berbagai format (expected max ~500 μg/m³)
-            'pm25': parse_numeric(get_value([
-                'PM2.5 density', 'PM2.5 raw', 'PM2.5', 'pm25', 'PM25',
-                'pm2.5', 'PM 2.5', 'PM2.5 density'
-            ]), expected_max=500.0),
-            # PM10 (expected max ~1000 μg/m³)
-            'pm10': parse_numeric(get_value([
-                'PM10 density', 'PM10 raw', 'PM10', 'pm10', 'PM 10'
-            ]), expected_max=1000.0),
-            # Other pollutants (optional)
-            'o3': parse_numeric(get_value(['O3', 'o3', 'Ozone', 'ozone']), expected_max=500.0),
-            'no2': parse_numeric(get_value(['NO2', 'no2', 'NO 2', 'Nitrogen Dioxide']), expected_max=500.0),
-            'so2': parse_numeric(get_value(['SO2', 'so2', 'SO 2', 'Sulfur Dioxide']), expected_max=500.0),
-            'co': parse_numeric(get_value(['CO', 'co', 'Carbon Monoxide']), expected_max=50.0),
-            # Weather data
-            'temperature': parse_numeric(get_value([
-                'Temperature', 'temperature', 'Temp', 'temp', 'Suhu', 'suhu'
-            ]), expected_max=50.0),  # Max temperature ~50°C
-            'humidity': parse_numeric(get_value([
-                'Humidity', 'humidity', 'Hum', 'hum', 'Kelembaban', 'kelembaban'
-            ]), expected_max=100.0),  # Max humidity 100%
-            'pressure': parse_numeric(get_value([
-                'Pressure', 'pressure', 'Tekanan', 'tekanan'
-            ])),
-            # Metadata
-            'location': get_value([
-                'Location', 'location', 'Lokasi', 'lokasi', 'Kota', 'kota',
-                'Device ID', 'device_id'
-            ], 'Bandung'),
-            'timestamp': get_value([
-                'Timestamp', 'timestamp', 'Date', 'date', 'Tanggal', 'tanggal',
-                'Waktu', 'waktu', 'Time', 'time'
-            ]),
-            'air_quality_level': get_value([
-                'Air quality level', 'air_quality_level', 'Air Quality Level',
-                'Status', 'status', 'Kualitas Udara', 'kualitas_udara'
-            ]),
-            'device_id': get_value(['Device ID', 'device_id', 'Device', 'device']),
-        }
-
-        # Fallback: jika header generik (col_1, col_2, ...) gunakan urutan kolom bawaan
-        # Contoh data (dari debug):
-        # col_1=id, col_2=timestamp, col_3=pm25, col_4=pm10, col_5=pm10/ozone,
-        # col_6=status, col_7=temp, col_8=humidity, col_9=pressure, col_10=?, col_11=device,
-        # col_12=lat, col_13=lon, col_14=location
-        if all(str(k).startswith("col_") for k in raw_data.keys()):
-            cols = list(raw_data.keys())
-
-            def value_at(idx: int):
-                if 0 <= idx < len(cols):
-                    return raw_data.get(cols[idx])
-                return None
+    def to_frame(self, records: Sequence[Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Parse seluruh snapshot ke typed columns (vectorized, aturan sama dengan process_bmkg_data)
 
-            processed['pm25'] = processed['pm25'] or parse_numeric(value_at(2), expected_max=500.0)
-            processed['pm10'] = processed['pm10'] or parse_numeric(value_at(3), expected_max=1000.0)
-            # Jika kolom 4 (index 4) berisi polutan lain / AQI, gunakan sebagai pm10 bila belum ada
-            if processed['pm10'] is None:
-                processed['pm10'] = parse_numeric(value_at(4), expected_max=1000.0)
-            processed['air_quality_level'] = processed['air_quality_level'] or value_at(5)
-            processed['temperature'] = processed['temperature'] or parse_numeric(value_at(6), expected_max=50.0)
-            processed['humidity'] = processed['humidity'] or parse_numeric(value_at(7), expected_max=100.0)
-            processed['pressure'] = processed['pressure'] or parse_numeric(value_at(8))
-            processed['device_id'] = processed['device_id'] or value_at(10)
-            processed['timestamp'] = processed['timestamp'] or value_at(1)
-            processed['location'] = processed['location'] or value_at(len(cols) - 1)
+        Args:
+            records: Raw records dari spreadsheet (list of dicts atau SheetTable)
 
-        return processed
+        Returns:
+            DataFrame satu baris per record (index = posisi record), kolom:
+            pm25, pm10, o3, no2, so2, co, temperature, humidity, pressure (float64, NaN = kosong),
+            location, timestamp (datetime64 Asia/Jakarta), air_quality_level, device_id
+        """
+        if isinstance(records, SheetTable):
+            raw = records.to_dataframe()
+        else:
+            raw = pd.DataFrame.from_records(records) if records else pd.DataFrame()
+        return compile_header_resolver(tuple(raw.columns)).project_frame(raw)
 
     def validate_weather_data(self, data: Dict[str, Any]) -> bool:
         """
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Script untuk register IoT device (atau rotate key) untuk POST /iot/readings
+Usage: python scripts/create_iot_device.py --device-id HAZE-001 --name "Haze Detector Dago" --location Bandung
+       python scripts/create_iot_device.py --device-id HAZE-001 --rotate-key
+"""
+import sys
+import argparse
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from dotenv import load_dotenv
+load_dotenv(project_root / ".env")
+
+from sqlalchemy.orm import Session
+from app.db.postgres import get_db
+from app.db.models.iot_device import IoTDevice
+from app.core.security import generate_device_key, hash_device_key
+
+def create_iot_device(device_id: str, name: str | None = None, location: str | None = None, rotate_key: bool = False):
+    """Register IoT device dan print API key-nya (hanya sekali)"""
+    db: Session = next(get_db())
+
+    try:
+        device_key = generate_device_key()
+        device = db.query(IoTDevice).filter(IoTDevice.device_id == device_id).first()
+
+        if device and not rotate_key:
+            print(f"❌ Error: Device {device_id} already registered")
+            print("   Use --rotate-key to issue a new key")
+            return
+
+        if device:
+            device.api_key_hash = hash_device_key(device_key)
+            device.is_active = True
+            if name:
+                device.name = name
+            if location:
+                device.location = location
+        else:
+            device = IoTDevice(
+                device_id=device_id,
+                api_key_hash=hash_device_key(device_key),
+                name=name,
+                location=location,
+            )
+            db.add(device)
+
+        db.commit()
+        db.refresh(device)
+
+        print(f"\n✅ IoT device {'key rotated' if rotate_key else 'registered'} successfully!")
+        print(f"   Device ID: {device.device_id}")
+        print(f"   Name: {device.name or 'N/A'}")
+        print(f"   Location: {device.location or 'N/A'}")
+        print(f"\n🔑 Device key (store it in the firmware, it is not shown again):")
+        print(f"   {device_key}")
+        print(f"\n📝 Send readings with headers X-Device-Id and X-Device-Key to POST /iot/readings")
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error registering IoT device: {e}")
+        raise
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Register IoT device for direct ingest")
+    parser.add_argument("--device-id", required=True, help="Device ID (same as deviceID in the firmware)")
+    parser.add_argument("--name", help="Device name (optional)")
+    parser.add_argument("--location", help="Default location for readings (optional)")
+    parser.add_argument("--rotate-key", action="store_true", help="Issue a new key for an existing device")
+
+    args = parser.parse_args()
+
+    create_iot_device(
+        device_id=args.device_id,
+        name=args.name,
+        location=args.location,
+        rotate_key=args.rotate_key
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Migration script untuk create iot_devices table (direct IoT ingest)
+Jalankan: python scripts/migrate_add_iot_devices_table.py
+"""
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from dotenv import load_dotenv
+load_dotenv(project_root / ".env")
+
+from sqlalchemy import text
+from app.db.postgres import engine
+
+def run_migration():
+    """Create iot_devices table"""
+    with engine.connect() as conn:
+        try:
+            # Check if table already exists
+            check_sql = text("""
+                SELECT EXISTS (
+                    SELECT FROM information_schema.tables
+                    WHERE table_schema = 'public'
+                    AND table_name = 'iot_devices'
+                )
+            """)
+            result = conn.execute(check_sql)
+            exists = result.scalar()
+
+            if exists:
+                print("✓ Table 'iot_devices' already exists")
+            else:
+                print("Creating iot_devices table...")
+                conn.execute(text("""
+                    CREATE TABLE iot_devices (
+                        id SERIAL PRIMARY KEY,
+                        device_id VARCHAR(64) NOT NULL UNIQUE,
+                        api_key_hash VARCHAR(64) NOT NULL,
+                        name VARCHAR(100),
+                        location VARCHAR(100),
+                        is_active BOOLEAN NOT NULL DEFAULT TRUE,
+                        last_seen_at TIMESTAMP WITH TIME ZONE,
+                        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+                    )
+                """))
+                conn.commit()
+                print("✓ Created iot_devices table")
+
+                # Create indexes
+                print("Creating indexes...")
+                conn.execute(text("CREATE INDEX ix_iot_devices_id ON iot_devices(id)"))
+                conn.commit()
+                print("✓ Created indexes")
+
+            # Verify
+            verify_sql = text("""
+                SELECT column_name, data_type
+                FROM information_schema.columns
+                WHERE table_name = 'iot_devices'
+                ORDER BY ordinal_position
+            """)
+            result = conn.execute(verify_sql)
+            columns = result.fetchall()
+
+            print(f"\n✅ Table 'iot_devices' columns:")
+            for col_name, col_type in columns:
+                print(f"   - {col_name}: {col_type}")
+
+            print("\n✅ Migration completed!")
+
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            conn.rollback()
+            raise
+
+if __name__ == "__main__":
+    run_migration()
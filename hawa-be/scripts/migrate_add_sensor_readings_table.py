@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Migration script untuk create sensor_readings table (mirror IoT Google Sheet)
+Jalankan: python scripts/migrate_add_sensor_readings_table.py
+"""
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from dotenv import load_dotenv
+load_dotenv(project_root / ".env")
+
+from sqlalchemy import text
+from app.db.postgres import engine
+
+def run_migration():
+    """Create sensor_readings table"""
+    with engine.connect() as conn:
+        try:
+            # Check if table already exists
+            check_sql = text("""
+                SELECT EXISTS (
+                    SELECT FROM information_schema.tables
+                    WHERE table_schema = 'public'
+                    AND table_name = 'sensor_readings'
+                )
+            """)
+            result = conn.execute(check_sql)
+            exists = result.scalar()
+
+            if exists:
+                print("✓ Table 'sensor_readings' already exists")
+            else:
+                print("Creating sensor_readings table...")
+                conn.execute(text("""
+                    CREATE TABLE sensor_readings (
+                        id SERIAL PRIMARY KEY,
+                        device_id VARCHAR(64) NOT NULL,
+                        timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+                        pm25 DOUBLE PRECISION,
+                        pm10 DOUBLE PRECISION,
+                        o3 DOUBLE PRECISION,
+                        no2 DOUBLE PRECISION,
+                        so2 DOUBLE PRECISION,
+                        co DOUBLE PRECISION,
+                        temperature DOUBLE PRECISION,
+                        humidity DOUBLE PRECISION,
+                        pressure DOUBLE PRECISION,
+                        air_quality_level VARCHAR(50),
+                        location VARCHAR(100),
+                        source VARCHAR(100),
+                        source_row INTEGER,
+                        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+                        CONSTRAINT uq_sensor_readings_device_timestamp UNIQUE (device_id, timestamp)
+                    )
+                """))
+                conn.commit()
+                print("✓ Created sensor_readings table")
+
+                # Create indexes
+                print("Creating indexes...")
+                conn.execute(text("CREATE INDEX idx_sensor_readings_timestamp ON sensor_readings(timestamp)"))
+                conn.execute(text("CREATE INDEX idx_sensor_readings_source_timestamp ON sensor_readings(source, timestamp)"))
+                conn.commit()
+                print("✓ Created indexes")
+
+            # Verify
+            verify_sql = text("""
+                SELECT column_name, data_type
+                FROM information_schema.columns
+                WHERE table_name = 'sensor_readings'
+                ORDER BY ordinal_position
+            """)
+            result = conn.execute(verify_sql)
+            columns = result.fetchall()
+
+            print(f"\n✅ Table 'sensor_readings' columns:")
+            for col_name, col_type in columns:
+                print(f"   - {col_name}: {col_type}")
+
+            print("\n✅ Migration completed!")
+
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            conn.rollback()
+            raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -21,7 +21,9 @@ from app.db.models import (
     ComplianceRecord,
     CommunityFeedback,
     FeedbackVote,
-    WeatherKnowledge
+    WeatherKnowledge,
+    SensorReading,
+    IoTDevice
 )
 
 def enable_pgvector():
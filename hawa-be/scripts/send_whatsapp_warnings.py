@@ -18,6 +18,7 @@ from sqlalchemy.orm import Session
 from app.db.postgres import get_db
 from app.db.models.user import User
 from app.services.weather.recommendation_service import WeatherRecommendationService
+from app.services.weather.readings_store import ReadingsStore, sheets_source
 from app.services.weather.spreadsheet_service import SpreadsheetService
 from app.services.notification.whatsapp_service import WhatsAppService
 from app.core.config import get_settings
@@ -79,31 +80,35 @@ def check_and_send_warnings(
     
     try:
         spreadsheet_service = SpreadsheetService()
-        raw_data = spreadsheet_service.read_from_google_sheets(
-            spreadsheet_id=spreadsheet_id,
-            worksheet_name=worksheet_name
-        )
+        store = ReadingsStore(db)
+        
+        # Mirror baris baru dari sheet, lalu ambil reading terbaru dari database
+        sync_error = None
+        try:
+            store.sync_from_sheets(
+                spreadsheet_id=spreadsheet_id,
+                worksheet_name=worksheet_name
+            )
+        except Exception as e:
+            sync_error = e
         
-        if not raw_data:
+        latest = store.latest(limit=1, source=sheets_source(spreadsheet_id, worksheet_name))
+        if not latest:
+            if sync_error:
+                raise sync_error
             results["errors"].append("No data found in spreadsheet")
             return results
         
-        weather_data = spreadsheet_service.process_bmkg_data(raw_data)
+        weather_data = store.to_dict(latest[-1])
         
         if not spreadsheet_service.validate_weather_data(weather_data):
             # Tambahkan debug info agar mudah cek kolom/format
-            last_row = raw_data[-1] if isinstance(raw_data, list) and raw_data else raw_data
             results["errors"].append(
                 "Invalid weather data from spreadsheet (missing pm25/pm10). "
                 "See Spreadsheet Debug below."
             )
             print("\n--- Spreadsheet Debug ---")
-            # Tampilkan contoh header & row terakhir
-            if isinstance(raw_data, list) and raw_data:
-                headers = list(raw_data[-1].keys())
-                print(f"Headers (sample): {headers}")
-            print(f"Last row (raw): {last_row}")
-            print(f"Parsed data: {weather_data}")
+            print(f"Latest reading (source row {weather_data.get('source_row')}): {weather_data}")
             print("--- End Spreadsheet Debug ---\n")
             return results
         
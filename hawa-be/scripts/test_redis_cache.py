@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script untuk memverifikasi Redis cache backend (CACHE_BACKEND=redis) terhadap server lokal
+Jalankan: poetry run python scripts/test_redis_cache.py
+Contoh server lokal: docker run --rm -p 6379:6379 redis:7  (REDIS_URL default redis://localhost:6379/0)
+Keys ditulis di namespace "selftest" dan dihapus di akhir test.
+"""
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from dotenv import load_dotenv
+load_dotenv(project_root / ".env")
+
+from app.core.config import get_settings
+from app.services.weather.cache_backend import RedisCacheBackend
+
+
+def check(label: str, condition: bool) -> bool:
+    print(f"   [{'OK' if condition else 'FAILED'}] {label}")
+    return condition
+
+
+def test_redis_cache():
+    """Test RedisCacheBackend: get/set, memo, TTL, peer updates, lock, eviction, outage"""
+    print("=" * 60)
+    print("Redis Cache Backend Test")
+    print("=" * 60)
+
+    redis_url = get_settings().redis_url
+    print(f"\nREDIS_URL: {redis_url.split('@')[-1]}")
+    print()
+
+    backend = RedisCacheBackend(redis_url, "selftest", max_size=3)
+    peer = RedisCacheBackend(redis_url, "selftest", max_size=3)  # another worker
+    results = []
+
+    try:
+        print("[1/6] Testing connection...")
+        if backend._execute("PING") != "PONG":
+            print("   [ERROR] Unexpected PING reply")
+            return False
+        print("   [OK] Connected")
+        backend.clear()
+
+        print("\n[2/6] Testing set/get...")
+        rows = [{"timestamp": "2025-01-01 10:00:00", "pm25": "12"}]
+        backend.set("sheet", rows, ttl_seconds=60, stored_at=1000.0)
+        entry = backend.get("sheet")
+        results.append(check("value round-trips", entry is not None and entry.value == rows))
+        results.append(check("stored_at kept", entry is not None and entry.stored_at == 1000.0))
+        results.append(check("decoded value memoized", backend.get("sheet").value is entry.value))
+        results.append(check("missing key is a miss", backend.get("missing") is None))
+
+        print("\n[3/6] Testing peer updates and TTL...")
+        peer.set("sheet", [{"pm25": "40"}], ttl_seconds=60, stored_at=2000.0)
+        results.append(check("peer write seen (memo invalidated)", backend.get("sheet").value == [{"pm25": "40"}]))
+        backend.set("short", "x", ttl_seconds=0.2)
+        time.sleep(0.3)
+        results.append(check("entry expires after TTL", backend.get("short") is None))
+        peer.delete("sheet")
+        results.append(check("peer delete seen", backend.get("sheet") is None))
+
+        print("\n[4/6] Testing fetch lock...")
+        results.append(check("first worker gets the lock", backend.acquire_lock("sheet", 5)))
+        results.append(check("second worker waits", not peer.acquire_lock("sheet", 5)))
+        backend.release_lock("sheet")
+        results.append(check("lock released", peer.acquire_lock("sheet", 5)))
+        peer.release_lock("sheet")
+
+        print("\n[5/6] Testing max_size eviction and stats...")
+        backend.clear()
+        for i in range(5):
+            backend.set(f"k{i}", i, ttl_seconds=60, stored_at=3000.0 + i)
+        results.append(check("oldest entries evicted", sorted(backend.entries()) == ["k2", "k3", "k4"]))
+        results.append(check("entry sizes reported", len(backend.entry_sizes()) == 3))
+        results.append(check("stats count entries", backend.get_stats().get("entries") == 3))
+
+        print("\n[6/6] Testing degraded mode (server unreachable)...")
+        offline = RedisCacheBackend("redis://127.0.0.1:1/0", "selftest", timeout=0.5)
+        offline.set("sheet", rows, ttl_seconds=60)
+        results.append(check("get is a miss", offline.get("sheet") is None))
+        results.append(check("lock granted (fetch locally)", offline.acquire_lock("sheet", 5)))
+        results.append(check("entries empty", offline.entries() == {}))
+    except Exception as e:
+        print(f"\n[ERROR] Redis cache test failed: {e}")
+        print("\nTroubleshooting tips:")
+        print("   1. Start a local server (docker run --rm -p 6379:6379 redis:7)")
+        print("   2. Verify REDIS_URL (redis://[user:password@]host:port/db)")
+        return False
+    finally:
+        backend.clear()
+
+    passed = all(results)
+    print("\n" + "=" * 60)
+    print(f"[{'OK' if passed else 'ERROR'}] {sum(results)}/{len(results)} checks passed")
+    print("=" * 60)
+    return passed
+
+
+if __name__ == "__main__":
+    success = test_redis_cache()
+    sys.exit(0 if success else 1)